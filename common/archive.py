@@ -0,0 +1,214 @@
+"""
+冷数据归档
+1. Archiver：按索引分批把超过保留期的记录搬到归档表，同一事务内写归档、删在线表，在线表只保留热数据
+2. 归档表分区（MySQL）：按 created_at 月份 RANGE COLUMNS 分区，主键扩展为 (主键, created_at)；
+   p_old 存放 2024 年之前的数据，p_future 为 MAXVALUE 兜底，ensure_partitions 定期从 p_future 拆出未来月份
+
+在线表不分区：InnoDB 分区表不支持外键，且每个唯一索引都必须包含分区列，
+与订单项/支付尝试/退款的外键及 *_uuid 唯一约束冲突；在线表的规模由归档控制
+"""
+import datetime
+import logging
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from common.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PARTITION_START = datetime.date(2024, 1, 1)
+PARTITION_MONTHS_AHEAD = 3
+
+
+class Archiver:
+    """分批归档器
+
+    - eligible(now): 可归档条件 Q 对象，需能命中索引
+    - to_archive(objs, now): 由在线记录生成归档实例（可包含多个归档模型的实例）
+    - before_delete(pks, using): 删除在线记录前清理不会级联删除的关联数据（如 PROTECT 外键、无约束的附表）
+    - after_archive(objs): 每批提交后调用一次（如清理其他库中的索引）
+    - select_related/prefetch_related: 生成归档实例时需要的关联数据
+    """
+
+    def __init__(self, name, model, eligible, to_archive, before_delete=None, after_archive=None,
+                 select_related=(), prefetch_related=(), batch_size=500, max_batches=None, pause=0.0,
+                 using='default'):
+        self.name = name
+        self.model = model
+        self.eligible = eligible
+        self.to_archive = to_archive
+        self.before_delete = before_delete
+        self.after_archive = after_archive
+        self.select_related = tuple(select_related)
+        self.prefetch_related = tuple(prefetch_related)
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.pause = pause
+        self.using = using
+
+    def backlog(self, now=None):
+        """当前可归档的记录数"""
+        now = now or timezone.now()
+        count = self.model.objects.using(self.using).filter(self.eligible(now)).count()
+        metrics.set_gauge(f'{self.name}.backlog', count)
+        return count
+
+    def archive_batch(self, now):
+        """归档一批记录，返回已归档的在线记录"""
+        pk_name = self.model._meta.pk.name
+        manager = self.model.objects.using(self.using)
+        with transaction.atomic(using=self.using):
+            # 锁定本批记录，跳过其他实例正在处理的行
+            objs = list(
+                manager.filter(self.eligible(now))
+                .select_for_update(skip_locked=True, of=('self',))
+                .select_related(*self.select_related)
+                .prefetch_related(*self.prefetch_related)
+                .order_by(pk_name)[:self.batch_size]
+            )
+            if not objs:
+                return []
+            by_model = {}
+            for instance in self.to_archive(objs, now):
+                by_model.setdefault(type(instance), []).append(instance)
+            for archive_model, rows in by_model.items():
+                archive_model.objects.using(self.using).bulk_create(rows, ignore_conflicts=True)
+            pks = [obj.pk for obj in objs]
+            if self.before_delete:
+                self.before_delete(pks, self.using)
+            manager.filter(pk__in=pks).delete()
+        return objs
+
+    def run_once(self, batch_size=None, max_batches=None, pause=None):
+        """执行一轮归档，返回本轮统计"""
+        if batch_size is not None:
+            self.batch_size = batch_size
+        max_batches = self.max_batches if max_batches is None else max_batches
+        pause = self.pause if pause is None else pause
+
+        started = time.monotonic()
+        archived = batches = 0
+        while not max_batches or batches < max_batches:
+            objs = self.archive_batch(timezone.now())
+            if not objs:
+                break
+            batches += 1
+            archived += len(objs)
+            metrics.inc(f'{self.name}.archived', len(objs))
+            if self.after_archive:
+                try:
+                    self.after_archive(objs)
+                except Exception as e:
+                    logger.warning(f"归档后处理失败 [{self.name}]: {e}")
+            if len(objs) < self.batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+        duration = time.monotonic() - started
+        metrics.set_gauge(f'{self.name}.last_run_seconds', round(duration, 3))
+        metrics.set_gauge(f'{self.name}.last_run_archived', archived)
+        return {
+            'archived': archived,
+            'batches': batches,
+            'remaining': self.backlog(),
+            'duration': round(duration, 3),
+        }
+
+
+def copy_to(archive_model, instance, **extra):
+    """按字段名把在线记录复制为归档实例（归档模型中在线记录没有的字段由 extra 提供）"""
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in archive_model._meta.concrete_fields
+        if field.attname not in extra and hasattr(instance, field.attname)
+    }
+    return archive_model(**values, **extra)
+
+
+# ##### 归档表分区（MySQL） #####
+
+def _month_start(value):
+    return datetime.date(value.year, value.month, 1)
+
+
+def _next_month(value):
+    return datetime.date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def _month_partitions(start, end):
+    """[start, end) 内每月一个分区的定义"""
+    parts = []
+    month = start
+    while month < end:
+        upper = _next_month(month)
+        parts.append(f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{upper:%Y-%m-%d}')")
+        month = upper
+    return parts
+
+
+def _partition_horizon(months_ahead):
+    horizon = _month_start(timezone.now().date())
+    for _ in range(months_ahead + 1):
+        horizon = _next_month(horizon)
+    return horizon
+
+
+def partition_by_month(connection, table, pk_column, months_ahead=PARTITION_MONTHS_AHEAD):
+    """将表改为按 created_at 月份分区，主键扩展为 (主键, created_at)；非 MySQL 数据库不处理"""
+    if connection.vendor != 'mysql':
+        return
+    qn = connection.ops.quote_name
+    parts = (
+        [f"PARTITION p_old VALUES LESS THAN ('{PARTITION_START:%Y-%m-%d}')"]
+        + _month_partitions(PARTITION_START, _partition_horizon(months_ahead))
+        + ["PARTITION p_future VALUES LESS THAN (MAXVALUE)"]
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} DROP PRIMARY KEY, ADD PRIMARY KEY ({qn(pk_column)}, {qn('created_at')})"
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} PARTITION BY RANGE COLUMNS({qn('created_at')}) ({', '.join(parts)})"
+        )
+
+
+def remove_partitioning(connection, table, pk_column):
+    """partition_by_month 的逆操作"""
+    if connection.vendor != 'mysql':
+        return
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(table)} REMOVE PARTITIONING")
+        cursor.execute(f"ALTER TABLE {qn(table)} DROP PRIMARY KEY, ADD PRIMARY KEY ({qn(pk_column)})")
+
+
+def ensure_partitions(connection, table, months_ahead=PARTITION_MONTHS_AHEAD):
+    """从 p_future 拆出未来 months_ahead 个月的分区，返回新增分区数；表未分区或非 MySQL 时返回 0"""
+    if connection.vendor != 'mysql':
+        return 0
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL",
+            [table]
+        )
+        bounds = [
+            datetime.datetime.strptime(description.strip("'")[:10], '%Y-%m-%d').date()
+            for (description,) in cursor.fetchall()
+            if description and description != 'MAXVALUE'
+        ]
+        if not bounds:
+            return 0
+        parts = _month_partitions(max(bounds), _partition_horizon(months_ahead))
+        if not parts:
+            return 0
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} REORGANIZE PARTITION p_future INTO "
+            f"({', '.join(parts)}, PARTITION p_future VALUES LESS THAN (MAXVALUE))"
+        )
+    logger.info(f"归档表 {table} 新增 {len(parts)} 个分区")
+    return len(parts)
@@ -0,0 +1,94 @@
+"""
+客户端微批
+把短时间内的多次单条调用合并为一次批量调用，减少跨服务请求数
+"""
+import collections
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class BatchQueueFull(Exception):
+    """待发送队列已满"""
+
+
+class MicroBatcher:
+    """微批发送器
+
+    1. submit 只入队并返回 Future，不阻塞调用方
+    2. 后台线程从第一条开始累积，累积满 max_items 条或等待 max_delay 秒后调用一次 flush(items)
+    3. flush 返回与 items 等长、顺序一致的逐条结果，分别设置到各自的 Future；flush 抛出异常时所有 Future 收到该异常
+    4. 队列有上限，已满时 submit 返回的 Future 直接携带 BatchQueueFull
+    """
+
+    def __init__(self, name, flush, max_items=100, max_delay=0.01, maxsize=10000):
+        self.name = name
+        self._flush = flush
+        self.max_items = max(1, int(max_items))
+        self.max_delay = max_delay
+        self._queue = queue.Queue(maxsize=max(1, int(maxsize)))
+        self._thread = None
+        self._lock = threading.Lock()
+        self.counters = collections.Counter()
+
+    def submit(self, item):
+        """提交一条，返回 Future（结果为 flush 返回的对应条目）"""
+        self._ensure_worker()
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            self.counters['rejected'] += 1
+            logger.warning(f"微批队列已满: {self.name}")
+            future.set_exception(BatchQueueFull(self.name))
+        return future
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'queued': self._queue.qsize(),
+            **self.counters,
+        }
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name=f"{self.name}-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        """阻塞等待第一条，然后在 max_delay 内继续累积至多 max_items 条"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_items:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            self.counters['batches'] += 1
+            self.counters['items'] += len(items)
+            try:
+                results = self._flush(items)
+                if len(results) != len(items):
+                    raise ValueError(f"批量结果条数不一致: {len(results)} != {len(items)}")
+            except Exception as e:
+                self.counters['failed_batches'] += 1
+                logger.error(f"微批发送失败 [{self.name}]: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -114,6 +114,57 @@ DATABASE_CONFIG = {
     }
 }
 
+
+# 连接池 - 见 common/db_backends/mysql_pool/base.py（默认关闭，DB_POOL_ENABLED=true 时启用）
+# 启用后 CONN_MAX_AGE 置 0：请求结束即把连接归还连接池，由连接池负责复用
+DB_POOL_ENABLED = os.getenv('DB_POOL_ENABLED', 'false').lower() == 'true'
+if DB_POOL_ENABLED:
+    for _db_config in DATABASE_CONFIG.values():
+        _db_config['ENGINE'] = 'common.db_backends.mysql_pool'
+        _db_config['CONN_MAX_AGE'] = 0
+        _db_config['POOL'] = {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 20)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),  # 池满时等待秒数
+            'MAX_IDLE': float(os.getenv('DB_POOL_MAX_IDLE', 300)),  # 空闲回收秒数
+            'MAX_LIFETIME': float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),  # 应小于 MySQL wait_timeout
+            'CHECK_AFTER': float(os.getenv('DB_POOL_CHECK_AFTER', 1)),  # 空闲超过该秒数取用前 ping
+        }
+
+
+def replica_configs(primary, env_prefix):
+    """只读副本配置：<env_prefix>_REPLICA_HOSTS 为逗号分隔的 host[:port]，账号默认与主库相同"""
+    replicas = []
+    for address in os.getenv(f'{env_prefix}_REPLICA_HOSTS', '').split(','):
+        address = address.strip()
+        if not address:
+            continue
+        host, _, port = address.partition(':')
+        replicas.append({
+            **primary,
+            'HOST': host,
+            'PORT': port or primary['PORT'],
+            'USER': os.getenv(f'{env_prefix}_REPLICA_USER', primary['USER']),
+            'PASSWORD': os.getenv(f'{env_prefix}_REPLICA_PASSWORD', primary['PASSWORD']),
+        })
+    return replicas
+
+
+def replica_databases(primary_alias, replicas):
+    """生成副本的 DATABASES 条目 {<主库别名>_replica_<n>: 配置}，测试时副本镜像主库"""
+    return {
+        f'{primary_alias}_replica_{index}': {**replica, 'TEST': {'MIRROR': primary_alias}}
+        for index, replica in enumerate(replicas, start=1)
+    }
+
+
+# 只读副本配置 - 见 common/db_router.py
+DATABASE_REPLICA_CONFIG = {
+    'ORDER_DB': replica_configs(DATABASE_CONFIG['ORDER_DB'], 'ORDER_DB'),
+    'PAYMENT_DB': replica_configs(DATABASE_CONFIG['PAYMENT_DB'], 'PAYMENT_DB'),
+    'NOTIFICATION_DB': replica_configs(DATABASE_CONFIG['NOTIFICATION_DB'], 'NOTIFICATION_DB'),
+}
+
 # 通用常量
 ORDER_STATUS_CHOICES = (
     (0, 'pending_payment'),  # 待支付
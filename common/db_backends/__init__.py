@@ -0,0 +1,3 @@
+"""
+自定义数据库后端
+"""
@@ -0,0 +1,3 @@
+"""
+带连接池的 MySQL 后端，ENGINE 配置为 'common.db_backends.mysql_pool'
+"""
@@ -0,0 +1,124 @@
+"""
+带连接池的 MySQL 后端
+
+Django 自带的 MySQL 后端每个线程持有自己的连接（CONN_MAX_AGE 控制复用时长），线程多时连接数随之膨胀，
+新线程首次查询还要完成握手和 init_command。本后端将物理连接放入进程级连接池：
+
+- Django 的 connect/close 改为从池中取出/归还，init_command 只在建立物理连接时执行一次
+- 配合 CONN_MAX_AGE=0，每个请求结束即归还连接，N 个线程共享至多 POOL['MAX_SIZE'] 个连接
+- 归还前回滚未提交的事务；发生过数据库错误的连接直接关闭
+- ASGI 部署中 ORM 调用在 sync_to_async 线程中执行，同样通过本连接池取用连接
+
+配置（settings_dict['POOL']，均可省略）：
+    MIN_SIZE 保留的最少空闲连接数，MAX_SIZE 最大连接数，TIMEOUT 池满时等待秒数，
+    MAX_IDLE 空闲回收秒数，MAX_LIFETIME 连接最大存活秒数（应小于 MySQL wait_timeout），
+    CHECK_AFTER 空闲超过该秒数的连接取用前执行 ping
+"""
+import logging
+import threading
+import time
+
+from django.db import OperationalError
+from django.db.backends.mysql import base as mysql_base
+
+from common.metrics import metrics
+from .pool import ConnectionPool, PoolTimeout
+
+logger = logging.getLogger(__name__)
+
+POOL_DEFAULTS = {
+    'MIN_SIZE': 1,
+    'MAX_SIZE': 10,
+    'TIMEOUT': 10,
+    'MAX_IDLE': 300,
+    'MAX_LIFETIME': 3600,
+    'CHECK_AFTER': 1,
+}
+REAP_INTERVAL = 60
+
+_pools = {}
+_pools_lock = threading.Lock()
+_reaper = None
+
+
+def get_pool(alias, settings_dict, conn_params):
+    """每个数据库别名一个连接池（进程内共享）"""
+    pool = _pools.get(alias)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            options = {**POOL_DEFAULTS, **(settings_dict.get('POOL') or {})}
+            pool = ConnectionPool(
+                alias,
+                connect=lambda: _connect(conn_params),
+                ping=lambda conn: conn.ping(),
+                close=lambda conn: conn.close(),
+                min_size=options['MIN_SIZE'],
+                max_size=options['MAX_SIZE'],
+                timeout=options['TIMEOUT'],
+                max_idle=options['MAX_IDLE'],
+                max_lifetime=options['MAX_LIFETIME'],
+                check_after=options['CHECK_AFTER'],
+            )
+            metrics.register_collector(f'db-pool.{alias}', pool.stats)
+            _pools[alias] = pool
+            _start_reaper()
+    pool.warm()
+    return pool
+
+
+def _connect(conn_params):
+    connection = mysql_base.Database.connect(**conn_params)
+    # 与 Django MySQL 后端 get_new_connection 相同的处理
+    if connection.encoders.get(bytes) is bytes:
+        connection.encoders.pop(bytes)
+    return connection
+
+
+def _start_reaper():
+    """定时回收各连接池的空闲连接（无请求时也能释放连接）"""
+    global _reaper
+    if _reaper is not None and _reaper.is_alive():
+        return
+
+    def loop():
+        while True:
+            time.sleep(REAP_INTERVAL)
+            for pool in list(_pools.values()):
+                try:
+                    pool.reap()
+                except Exception as e:
+                    logger.warning(f"连接池回收失败 [{pool.name}]: {e}")
+
+    _reaper = threading.Thread(target=loop, name='db-pool-reaper', daemon=True)
+    _reaper.start()
+
+
+class DatabaseWrapper(mysql_base.DatabaseWrapper):
+    """MySQL 后端，物理连接来自连接池"""
+
+    def get_new_connection(self, conn_params):
+        pool = get_pool(self.alias, self.settings_dict, conn_params)
+        try:
+            return pool.acquire()
+        except PoolTimeout as e:
+            raise OperationalError(str(e)) from e
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = _pools.get(self.alias)
+        if pool is None:
+            return super()._close()
+        discard = self.errors_occurred
+        if not discard:
+            try:
+                # 归还前结束未提交的事务，下一个使用者从干净状态开始
+                if not self.connection.get_autocommit():
+                    self.connection.rollback()
+                    self.connection.autocommit(True)
+            except mysql_base.Database.Error:
+                discard = True
+        pool.release(self.connection, discard=discard)
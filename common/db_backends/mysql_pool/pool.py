@@ -0,0 +1,212 @@
+"""
+线程安全的数据库连接池
+与具体驱动无关：由调用方提供建立连接、健康检查和关闭连接的函数
+"""
+import collections
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """连接池已满且在等待时间内没有连接归还"""
+
+
+class ConnectionPool:
+    """有上下限的连接池
+
+    1. 取用时优先复用最近归还的空闲连接（LIFO），空闲超过 check_after 秒的连接先做健康检查
+    2. 连接数达到 max_size 时等待归还，超过 timeout 秒抛出 PoolTimeout
+    3. 空闲超过 max_idle 秒的连接在取用/归还时回收，但保留 min_size 个；存活超过 max_lifetime 的连接归还时关闭
+    4. 进程 fork 后自动丢弃继承自父进程的连接
+    """
+
+    def __init__(self, name, connect, ping, close, min_size=0, max_size=10, timeout=10.0,
+                 max_idle=300.0, max_lifetime=3600.0, check_after=0.0):
+        self.name = name
+        self._connect = connect
+        self._ping = ping
+        self._close_conn = close
+        self.min_size = max(0, int(min_size))
+        self.max_size = max(1, int(max_size))
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.check_after = check_after
+
+        self._cond = threading.Condition()
+        self._idle = collections.deque()  # [(连接, 归还时间)]
+        self._created = {}  # {id(连接): 建立时间}
+        self._size = 0
+        self._waiting = 0
+        self._pid = os.getpid()
+        self.counters = collections.Counter()
+
+    # ##### 取用与归还 #####
+
+    def acquire(self):
+        """取出一个可用连接"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn, idle_since, create = self._reserve(deadline)
+            if create:
+                return self._open()
+            if self._is_healthy(conn, idle_since):
+                self.counters['checkouts'] += 1
+                return conn
+            self._discard(conn)
+            self.counters['health_check_failures'] += 1
+
+    def release(self, conn, discard=False):
+        """归还连接；discard=True 或超过最大存活时间时直接关闭"""
+        if self._pid != os.getpid():
+            return
+        created_at = self._created.get(id(conn))
+        if discard or created_at is None or time.monotonic() - created_at > self.max_lifetime:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        self._reap()
+
+    def _reserve(self, deadline):
+        """在锁内预留一个空闲连接或一个新建名额，返回 (连接, 归还时间, 是否新建)"""
+        with self._cond:
+            self._check_fork()
+            waited = False
+            while True:
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    return conn, idle_since, False
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, None, True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters['timeouts'] += 1
+                    raise PoolTimeout(
+                        f"数据库连接池已满 [{self.name}]: {self._size}/{self.max_size}，等待 {self.timeout}s 超时"
+                    )
+                if not waited:
+                    self.counters['waits'] += 1
+                    waited = True
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def _open(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        self._created[id(conn)] = time.monotonic()
+        self.counters['created'] += 1
+        self.counters['checkouts'] += 1
+        return conn
+
+    def _is_healthy(self, conn, idle_since):
+        if time.monotonic() - idle_since < self.check_after:
+            return True
+        try:
+            self._ping(conn)
+            return True
+        except Exception as e:
+            logger.info(f"连接池健康检查失败 [{self.name}]: {e}")
+            return False
+
+    def _discard(self, conn):
+        self._created.pop(id(conn), None)
+        try:
+            self._close_conn(conn)
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self.counters['closed'] += 1
+
+    # ##### 回收 #####
+
+    def _reap(self):
+        """关闭空闲过久的连接，保留 min_size 个"""
+        now = time.monotonic()
+        expired = []
+        with self._cond:
+            # 空闲队列左侧为最早归还的连接
+            while self._idle and self._size - len(expired) > self.min_size:
+                conn, idle_since = self._idle[0]
+                if now - idle_since <= self.max_idle:
+                    break
+                self._idle.popleft()
+                expired.append(conn)
+        for conn in expired:
+            self._discard(conn)
+        if expired:
+            self.counters['reaped'] += len(expired)
+
+    def reap(self):
+        """供定时任务调用的回收入口"""
+        self._reap()
+
+    def warm(self):
+        """预先建立 min_size 个连接，失败时只记录日志"""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._open()
+            except Exception as e:
+                logger.warning(f"连接池预热失败 [{self.name}]: {e}")
+                return
+            self.counters['checkouts'] -= 1
+            self.release(conn)
+
+    def _check_fork(self):
+        """fork 后的子进程不能复用父进程的套接字，直接丢弃（不发送关闭报文）"""
+        if self._pid == os.getpid():
+            return
+        self._idle.clear()
+        self._created.clear()
+        self._size = 0
+        self._waiting = 0
+        self._pid = os.getpid()
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+        for conn in idle:
+            self._discard(conn)
+
+    # ##### 指标 #####
+
+    def stats(self):
+        """连接池指标：使用中/空闲/等待数及饱和度"""
+        with self._cond:
+            idle = len(self._idle)
+            size = self._size
+            waiting = self._waiting
+        in_use = size - idle
+        return {
+            'name': self.name,
+            'size': size,
+            'in_use': in_use,
+            'idle': idle,
+            'waiting': waiting,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'saturation': round(in_use / self.max_size, 3),
+            **self.counters,
+        }
@@ -0,0 +1,216 @@
+"""
+只读副本路由
+settings.DATABASE_REPLICAS 配置主库别名到副本别名列表的映射，例如 {'default': ['default_replica_1']}。
+只有标记了 @replica_reads 的只读视图（列表、统计、内部批量查询）才会读副本，其余查询仍走主库：
+
+1. 读己之写：用户的写请求成功后，在 DATABASE_REPLICA_PIN_SECONDS 内该用户的读请求固定走主库
+   （进程内记录 + Cookie，多实例部署时由 Cookie 保证）
+2. 延迟感知：定期检查副本复制延迟，超过 DATABASE_REPLICA_MAX_LAG 秒或复制中断的副本暂不使用，
+   全部不可用时回退主库
+3. 事务内和已显式指定数据库（.using()/实例所在库）的查询不改变路由
+
+分库的服务（如订单分片）通过 read_db(别名) 选择对应分片的副本
+"""
+import contextvars
+import functools
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from common.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'db_pinned'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_replica_enabled = contextvars.ContextVar('replica_reads', default=False)
+
+_pins = {}
+_pins_lock = threading.Lock()
+
+_health = {}  # {副本别名: (检查时间, 是否可用)}
+_health_lock = threading.Lock()
+
+
+def _replica_map():
+    return getattr(settings, 'DATABASE_REPLICAS', {})
+
+
+def primary_of(alias):
+    """副本别名对应的主库别名，非副本返回自身"""
+    for primary, replicas in _replica_map().items():
+        if alias in replicas:
+            return primary
+    return alias
+
+
+def replica_lag(alias):
+    """副本复制延迟（秒），复制中断时返回 None；非 MySQL 数据库视为无延迟"""
+    connection = connections[alias]
+    if connection.vendor != 'mysql':
+        return 0
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute('SHOW REPLICA STATUS')
+        except Exception:
+            # MySQL 8.0.22 之前的版本
+            cursor.execute('SHOW SLAVE STATUS')
+        row = cursor.fetchone()
+        columns = [column[0] for column in cursor.description or ()]
+    if row is None:
+        # 未配置复制（如开发环境直接指向主库）
+        return 0
+    status = dict(zip(columns, row))
+    return status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+
+
+def _is_healthy(alias):
+    """副本是否可用，检查结果缓存 DATABASE_REPLICA_CHECK_INTERVAL 秒"""
+    interval = getattr(settings, 'DATABASE_REPLICA_CHECK_INTERVAL', 5)
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (None, False))
+    if checked_at is not None and now - checked_at < interval:
+        return healthy
+    # 同一时刻只由一个线程检查，其他线程沿用上次结果
+    if not _health_lock.acquire(blocking=False):
+        return healthy
+    try:
+        try:
+            lag = replica_lag(alias)
+        except Exception as e:
+            logger.warning(f"检查副本延迟失败 [{alias}]: {e}")
+            lag = None
+        max_lag = getattr(settings, 'DATABASE_REPLICA_MAX_LAG', 2)
+        healthy = lag is not None and lag <= max_lag
+        _health[alias] = (now, healthy)
+        metrics.set_gauge(f'db.replica.{alias}.lag', lag if lag is not None else -1)
+        if not healthy:
+            logger.warning(f"副本暂不可用 [{alias}]: 延迟 {lag}")
+        return healthy
+    finally:
+        _health_lock.release()
+
+
+def read_db(alias='default'):
+    """当前上下文中读取 alias 数据应使用的数据库：允许读副本且有可用副本时返回副本，否则返回 alias"""
+    replicas = _replica_map().get(alias)
+    if not replicas or not _replica_enabled.get():
+        return alias
+    if connections[alias].in_atomic_block:
+        return alias
+    healthy = [replica for replica in replicas if _is_healthy(replica)]
+    if not healthy:
+        metrics.inc('db.replica_fallbacks')
+        return alias
+    metrics.inc('db.replica_reads')
+    return random.choice(healthy)
+
+
+def _user_key(request):
+    return request.headers.get('UUID')
+
+
+def pin_to_primary(request, response=None):
+    """写请求成功后将该用户的后续读请求固定到主库"""
+    seconds = getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 5)
+    user_key = _user_key(request)
+    if user_key:
+        now = time.monotonic()
+        with _pins_lock:
+            _pins[user_key] = now + seconds
+            # 顺带清理过期记录，避免无限增长
+            if len(_pins) > 10000:
+                for key, expires in list(_pins.items()):
+                    if expires <= now:
+                        del _pins[key]
+    if response is not None:
+        response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+
+
+def is_pinned(request):
+    """该请求的用户近期是否有写操作"""
+    if request.COOKIES.get(PIN_COOKIE):
+        return True
+    user_key = _user_key(request)
+    if not user_key:
+        return False
+    with _pins_lock:
+        expires = _pins.get(user_key)
+    return expires is not None and expires > time.monotonic()
+
+
+class use_replicas:
+    """在代码块内允许读副本（可作上下文管理器）"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._token = None
+
+    def __enter__(self):
+        self._token = _replica_enabled.set(self.enabled)
+        return self
+
+    def __exit__(self, *exc):
+        _replica_enabled.reset(self._token)
+        return False
+
+
+def replica_reads(view_method):
+    """视图方法装饰器：该方法内的查询允许读副本（用户近期有写操作时仍读主库）
+
+    只用于不写数据库的视图方法，如 list/get 或只读的内部批量查询
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        with use_replicas(not is_pinned(request)):
+            return view_method(self, request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """副本路由，需放在 DATABASE_ROUTERS 首位；分库的服务中放在分库路由之后，
+    分库模型的读由分库路由经 read_db() 选择对应库的副本，这里只处理其余模型
+
+    - 未指定数据库的读查询：允许读副本时路由到 default 的副本，否则交给后续路由
+    - 写查询不处理（交给后续路由，默认为主库）
+    - 副本与主库上的对象允许建立关联；副本不执行迁移
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return None
+        alias = read_db('default')
+        return alias if alias != 'default' else None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        db1, db2 = obj1._state.db, obj2._state.db
+        if db1 and db2 and db1 != db2 and primary_of(db1) == primary_of(db2):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if primary_of(db) != db:
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """写请求（非 GET/HEAD/OPTIONS）成功后固定该用户的读请求到主库"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and _replica_map():
+            pin_to_primary(request, response)
+        return response
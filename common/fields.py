@@ -0,0 +1,74 @@
+"""
+紧凑 UUID 字段
+MySQL 上 Django 的 UUIDField 为 char(32)，每个 UUID 占 32 字节且按字符集排序规则比较；
+CompactUUIDField 在 MySQL 上存储为 BINARY(16)，其他数据库与 UUIDField 保持一致。
+新生成的主标识使用 uuid7（时间有序），插入时追加到索引末尾，避免 B+ 树页分裂
+"""
+import os
+import threading
+import time
+import uuid
+
+from django.db import models
+
+_uuid7_lock = threading.Lock()
+_uuid7_last = [0, 0]  # [上次毫秒时间戳, 上次计数]
+
+
+def uuid7():
+    """生成时间有序的 UUID（RFC 9562 UUIDv7 布局）
+
+    前 48 位为毫秒时间戳，同一毫秒内用 12 位计数保证单进程内单调递增，其余为随机数
+    """
+    with _uuid7_lock:
+        timestamp = time.time_ns() // 1_000_000
+        if timestamp <= _uuid7_last[0]:
+            timestamp = _uuid7_last[0]
+            counter = _uuid7_last[1] + 1
+            if counter > 0xFFF:
+                # 计数溢出时借用下一毫秒
+                timestamp += 1
+                counter = 0
+        else:
+            counter = int.from_bytes(os.urandom(2), 'big') & 0x7FF
+        _uuid7_last[0] = timestamp
+        _uuid7_last[1] = counter
+
+    rand = int.from_bytes(os.urandom(8), 'big') & 0x3FFFFFFFFFFFFFFF
+    value = (timestamp & 0xFFFFFFFFFFFF) << 80
+    value |= 0x7 << 76  # 版本号
+    value |= counter << 64
+    value |= 0x2 << 62  # 变体
+    value |= rand
+    return uuid.UUID(int=value)
+
+
+class CompactUUIDField(models.UUIDField):
+    """MySQL 上以 BINARY(16) 存储的 UUIDField
+
+    Python 侧取值、序列化和查询方式与 UUIDField 相同
+    """
+
+    def db_type(self, connection):
+        if connection.vendor == 'mysql':
+            return 'binary(16)'
+        return super().db_type(connection)
+
+    def rel_db_type(self, connection):
+        return self.db_type(connection)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if connection.vendor != 'mysql':
+            return super().get_db_prep_value(value, connection, prepared)
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = self.to_python(value)
+        return value.bytes
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        if isinstance(value, (bytes, bytearray, memoryview)) and len(value) == 16:
+            return uuid.UUID(bytes=bytes(value))
+        return self.to_python(value)
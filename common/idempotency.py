@@ -0,0 +1,173 @@
+"""
+写接口幂等键支持
+客户端在超时重试时携带相同的 Idempotency-Key 请求头，服务端直接回放首次请求的响应，
+不再重复执行校验、写库和通知
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_TTL = int(os.getenv('IDEMPOTENCY_TTL', 86400))  # 幂等记录保留时长（秒）
+IDEMPOTENCY_WAIT = float(os.getenv('IDEMPOTENCY_WAIT', 5))  # 并发重复请求的最长等待时间（秒）
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv('IDEMPOTENCY_LOCK_SECONDS', 60))  # 处理中记录的租约（秒），应大于请求超时
+IDEMPOTENCY_POLL_INTERVAL = 0.1
+
+# 幂等记录状态（与各服务 IdempotencyRecord.status 一致）
+IDEMPOTENCY_PROCESSING = 0
+IDEMPOTENCY_COMPLETED = 1
+
+
+def _record_key(request, key):
+    """按 方法+路径+用户+幂等键 生成定长记录主键"""
+    user_uuid = request.headers.get('UUID', '')
+    raw = f"{request.method}:{request.path}:{user_uuid}:{key}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _request_hash(request):
+    """请求体摘要，用于识别复用幂等键但请求内容不同的情况"""
+    body = json.dumps(request.data, cls=DjangoJSONEncoder, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+def _acquire(model, record_key, request_hash):
+    """尝试占用幂等键
+
+    依赖主键唯一约束实现轻量锁：插入成功者执行请求，其余并发请求读取已有记录。
+    处理中的记录带有短租约 locked_until，持有者中断（进程重启、超时被杀）未能释放时，
+    租约过期后相同内容的重试以条件更新接管，不必等到记录过期
+    """
+    now = timezone.now()
+    model.objects.filter(key=record_key, expires_at__lte=now).delete()
+    locked_until = now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+    try:
+        with transaction.atomic():
+            record = model.objects.create(
+                key=record_key,
+                request_hash=request_hash,
+                status=IDEMPOTENCY_PROCESSING,
+                locked_until=locked_until,
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL)
+            )
+        return record, True
+    except IntegrityError:
+        pass
+
+    record = model.objects.filter(key=record_key).first()
+    if record is None or record.status != IDEMPOTENCY_PROCESSING or record.request_hash != request_hash:
+        return record, False
+    if record.locked_until is not None and record.locked_until > now:
+        return record, False
+    taken = model.objects.filter(
+        Q(locked_until__lte=now) | Q(locked_until__isnull=True),
+        key=record_key,
+        status=IDEMPOTENCY_PROCESSING
+    ).update(locked_until=locked_until)
+    if not taken:
+        return model.objects.filter(key=record_key).first(), False
+    logger.warning(f"幂等键租约已过期，由重试请求接管: {record_key}")
+    record.locked_until = locked_until
+    return record, True
+
+
+def _owned(model, record):
+    """当前请求仍持有的处理中记录（租约被接管后原请求不再写入或删除）"""
+    return model.objects.filter(key=record.key, status=IDEMPOTENCY_PROCESSING, locked_until=record.locked_until)
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _store(model, record, response):
+    """保存响应供重试回放；5xx 响应不缓存，释放幂等键允许重试"""
+    if response.status_code >= 500 or not hasattr(response, 'data'):
+        _owned(model, record).delete()
+        return
+    try:
+        body = json.loads(json.dumps(response.data, cls=DjangoJSONEncoder))
+    except (TypeError, ValueError) as e:
+        logger.warning(f"幂等响应无法序列化，放弃缓存: {e}")
+        _owned(model, record).delete()
+        return
+    _owned(model, record).update(
+        status=IDEMPOTENCY_COMPLETED,
+        response_status=response.status_code,
+        response_body=body
+    )
+
+
+def idempotent(model):
+    """视图方法装饰器：按 Idempotency-Key 请求头对写请求去重
+
+    model 为各服务自己的 IdempotencyRecord 模型。未携带请求头时按普通请求处理。
+    """
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return view_method(self, request, *args, **kwargs)
+            if len(key) > 255:
+                return Response({'error': '幂等键过长'}, status=status.HTTP_400_BAD_REQUEST)
+
+            record_key = _record_key(request, key)
+            request_hash = _request_hash(request)
+            deadline = time.monotonic() + IDEMPOTENCY_WAIT
+            while True:
+                record, created = _acquire(model, record_key, request_hash)
+                if created:
+                    break
+                if record is not None:
+                    if record.request_hash != request_hash:
+                        return Response({
+                            'error': '幂等键已被其他请求内容使用'
+                        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+                    if record.status == IDEMPOTENCY_COMPLETED:
+                        return _replay(record)
+                if time.monotonic() >= deadline:
+                    return Response({
+                        'error': '相同幂等键的请求正在处理中，请稍后重试'
+                    }, status=status.HTTP_409_CONFLICT)
+                time.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+            try:
+                response = view_method(self, request, *args, **kwargs)
+            except Exception:
+                _owned(model, record).delete()
+                raise
+            _store(model, record, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def purge_expired(model, batch_size=1000):
+    """分批删除过期的幂等记录，返回删除条数"""
+    deleted = 0
+    while True:
+        keys = list(
+            model.objects.filter(expires_at__lte=timezone.now())
+            .order_by('expires_at')
+            .values_list('key', flat=True)[:batch_size]
+        )
+        if not keys:
+            return deleted
+        count, _ = model.objects.filter(key__in=keys).delete()
+        deleted += count
@@ -0,0 +1,60 @@
+"""
+进程内运行指标
+提供计数器、仪表和采集函数注册，通过各服务的 /metrics/ 接口以 JSON 输出
+"""
+import threading
+import time
+
+from django.http import JsonResponse
+
+
+class MetricsRegistry:
+    """线程安全的简单指标注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._collectors = {}
+
+    def inc(self, name, value=1):
+        """计数器累加"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        """设置仪表当前值"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def register_collector(self, name, func):
+        """注册采集函数，输出指标时调用 func() 获取当前值（如队列长度、连接池状态）"""
+        with self._lock:
+            self._collectors[name] = func
+
+    def snapshot(self):
+        """当前所有指标"""
+        with self._lock:
+            data = {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+            }
+            collectors = dict(self._collectors)
+        collected = {}
+        for name, func in collectors.items():
+            try:
+                collected[name] = func()
+            except Exception as e:
+                collected[name] = {'error': str(e)}
+        data['collectors'] = collected
+        data['timestamp'] = time.time()
+        return data
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
+
+
+def metrics_view(_request):
+    """指标输出接口"""
+    return JsonResponse(metrics.snapshot())
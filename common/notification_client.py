@@ -0,0 +1,80 @@
+"""
+通知服务客户端
+各服务发送通知统一经过批量接口 /api/internal/notifications/bulk-create/：
+
+- send_notifications(items)：已有一批通知时同步发送（如超时订单清理、退款批处理）
+- notify(...)：请求处理中的单条通知，进入微批（默认累积 10ms 或 100 条）后合并发送，不阻塞请求
+
+两者都按请求顺序返回逐条结果 {'success': bool, 'id' | 'errors' | 'error'}，失败条目记录日志
+"""
+import logging
+
+from django.conf import settings
+
+from common.batcher import MicroBatcher
+from common.metrics import metrics
+from common.service_client import service_client
+
+logger = logging.getLogger(__name__)
+
+BULK_CREATE_PATH = '/api/internal/notifications/bulk-create/'
+BULK_CREATE_MAX = 500  # 与通知服务 NOTIFICATION_BULK_MAX 默认值一致
+
+
+def build_notification(user_uuid, title, content, type='transaction', related_id=None, related_data=None, digest=None):
+    """单条通知的请求数据；digest 为摘要分组名时通知服务定期汇总为一条通知，不逐条进入收件箱"""
+    data = {
+        'user_uuid': str(user_uuid),
+        'type': type,
+        'title': title,
+        'content': content,
+        'related_id': str(related_id) if related_id is not None else None,
+        'related_data': related_data or {},
+    }
+    if digest:
+        data['digest'] = digest
+    return data
+
+
+def send_notifications(items):
+    """同步批量发送通知，返回与 items 顺序一致的逐条结果"""
+    results = []
+    for start in range(0, len(items), BULK_CREATE_MAX):
+        chunk = items[start:start + BULK_CREATE_MAX]
+        try:
+            response = service_client.post('NotificationService', BULK_CREATE_PATH, {'notifications': chunk})
+        except Exception as e:
+            logger.warning(f"批量发送通知失败: {e}")
+            response = None
+        chunk_results = ((response or {}).get('data') or {}).get('results')
+        if not isinstance(chunk_results, list) or len(chunk_results) != len(chunk):
+            chunk_results = [{'success': False, 'error': '通知服务不可用'} for _ in chunk]
+        results.extend(chunk_results)
+
+    failed = [(item, result) for item, result in zip(items, results) if not result.get('success')]
+    metrics.inc('notification-client.sent', len(items) - len(failed))
+    if failed:
+        metrics.inc('notification-client.failed', len(failed))
+        for item, result in failed[:10]:
+            logger.warning(
+                f"发送通知失败: user={item.get('user_uuid')}, title={item.get('title')}, "
+                f"错误: {result.get('errors') or result.get('error')}"
+            )
+    return results
+
+
+notification_batcher = MicroBatcher(
+    'notification-client',
+    send_notifications,
+    max_items=getattr(settings, 'NOTIFICATION_CLIENT_BATCH_SIZE', 100),
+    max_delay=getattr(settings, 'NOTIFICATION_CLIENT_BATCH_DELAY_MS', 10) / 1000,
+    maxsize=getattr(settings, 'NOTIFICATION_CLIENT_QUEUE_SIZE', 10000)
+)
+metrics.register_collector('notification-client', notification_batcher.stats)
+
+
+def notify(user_uuid, title, content, type='transaction', related_id=None, related_data=None, digest=None):
+    """异步发送单条通知（合并到微批），返回 Future，结果为该条的发送结果"""
+    return notification_batcher.submit(
+        build_notification(user_uuid, title, content, type, related_id, related_data, digest)
+    )
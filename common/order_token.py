@@ -0,0 +1,86 @@
+"""
+订单快照签名令牌
+OrderService 调用 PaymentService 时附带 HMAC 签名的短期订单快照，
+PaymentService 本地验签后直接使用快照中的订单数据，无需回调 OrderService
+
+密钥 ORDER_TOKEN_SECRET 没有默认值：未配置时不签发也不接受令牌，
+PaymentService 回退为调用 OrderService 确认订单
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+
+# 各服务需配置相同的密钥
+ORDER_TOKEN_SECRET = os.getenv('ORDER_TOKEN_SECRET', '')
+ORDER_TOKEN_TTL = int(os.getenv('ORDER_TOKEN_TTL', 300))  # 令牌有效期（秒）
+
+
+class OrderTokenError(Exception):
+    """订单令牌无效或已过期"""
+    pass
+
+
+def order_token_enabled():
+    """是否已配置令牌密钥"""
+    return bool(ORDER_TOKEN_SECRET)
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    padding = '=' * (-len(text) % 4)
+    return base64.urlsafe_b64decode(text + padding)
+
+
+def _signature(payload_part):
+    if not ORDER_TOKEN_SECRET:
+        raise ImproperlyConfigured('未配置 ORDER_TOKEN_SECRET，订单快照令牌不可用')
+    digest = hmac.new(ORDER_TOKEN_SECRET.encode('utf-8'), payload_part.encode('ascii'), hashlib.sha256).digest()
+    return _b64encode(digest)
+
+
+def sign_order_snapshot(order_uuid, amount, status, version, buyer_uuid=None, ttl=None, order_id=None):
+    """生成订单快照令牌
+
+    令牌格式：base64url(JSON快照).base64url(HMAC-SHA256签名)
+    """
+    payload = {
+        'uuid': str(order_uuid),
+        'id': order_id,
+        'amount': str(amount),
+        'status': int(status),
+        'version': version,
+        'buyer': str(buyer_uuid) if buyer_uuid else None,
+        'exp': int(time.time()) + int(ttl or ORDER_TOKEN_TTL),
+    }
+    payload_part = _b64encode(json.dumps(payload, separators=(',', ':'), sort_keys=True).encode('utf-8'))
+    return f"{payload_part}.{_signature(payload_part)}"
+
+
+def verify_order_snapshot(token):
+    """校验订单快照令牌并返回快照数据
+
+    签名不匹配、格式错误或已过期时抛出 OrderTokenError
+    """
+    if not token or not isinstance(token, str) or token.count('.') != 1:
+        raise OrderTokenError('令牌格式错误')
+
+    payload_part, signature = token.split('.')
+    if not hmac.compare_digest(signature, _signature(payload_part)):
+        raise OrderTokenError('令牌签名无效')
+
+    try:
+        payload = json.loads(_b64decode(payload_part))
+    except (ValueError, TypeError):
+        raise OrderTokenError('令牌内容无法解析')
+
+    if int(payload.get('exp', 0)) < time.time():
+        raise OrderTokenError('令牌已过期')
+    return payload
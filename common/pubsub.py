@@ -0,0 +1,156 @@
+"""
+进程内发布/订阅总线
+用于把服务内事件（如新通知、未读数变化）推送给本进程中等待的 SSE/长轮询连接
+
+1. 每个订阅有独立的有界队列，发布方只做入队，不会被慢连接阻塞；队列满时丢弃最旧事件并标记溢出，
+   由订阅方通知客户端重新拉取（背压）
+2. 跨实例传输可插拔：发布先交给 transport，由 transport 把消息投递回各实例的 deliver。
+   默认 LocalTransport 直接在本进程内投递（单实例或开发环境）；多实例部署时可替换为基于消息中间件的实现，
+   只需提供 start(deliver) 和 publish(channel, message)，消息为可 JSON 序列化的 dict
+"""
+import collections
+import logging
+import threading
+import time
+
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class LocalTransport:
+    """进程内传输：发布即投递到本进程的订阅者"""
+    local_only = True
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, channel, message):
+        self._deliver(channel, message)
+
+
+class Subscription:
+    """一个连接的订阅，可订阅多个频道；作为上下文管理器使用时退出即取消订阅"""
+
+    def __init__(self, bus, channels, maxsize):
+        self._bus = bus
+        self.channels = tuple(channels)
+        self.maxsize = maxsize
+        self._events = collections.deque()
+        self._cond = threading.Condition()
+        self.overflowed = False
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, message):
+        with self._cond:
+            if self.closed:
+                return
+            if len(self._events) >= self.maxsize:
+                self._events.popleft()
+                self.dropped += 1
+                self.overflowed = True
+            self._events.append(message)
+            self._cond.notify()
+
+    def get(self, timeout):
+        """取出所有待处理事件，timeout 秒内没有事件时返回空列表"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not self._events and not self.closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+    def take_overflow(self):
+        """是否发生过丢弃（读取后清除标记）"""
+        with self._cond:
+            overflowed, self.overflowed = self.overflowed, False
+            return overflowed
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self._bus._unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class PubSub:
+    """发布/订阅总线"""
+
+    def __init__(self, name, transport=None, queue_size=100):
+        self.name = name
+        self.queue_size = queue_size
+        self._subscriptions = collections.defaultdict(set)  # {频道: {订阅}}
+        self._lock = threading.Lock()
+        self.counters = collections.Counter()
+        if isinstance(transport, str):
+            transport = import_string(transport)()
+        self.transport = transport or LocalTransport()
+        self.transport.start(self.deliver)
+
+    def subscribe(self, *channels):
+        subscription = Subscription(self, channels, self.queue_size)
+        with self._lock:
+            for channel in channels:
+                self._subscriptions[channel].add(subscription)
+        self.counters['subscribed'] += 1
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[channel]
+        self.counters['dropped'] += subscription.dropped
+
+    def has_listeners(self, channel):
+        """频道是否可能有订阅者（跨实例传输时总是 True），用于跳过构造代价较高的消息"""
+        if not getattr(self.transport, 'local_only', False):
+            return True
+        with self._lock:
+            return bool(self._subscriptions.get(channel))
+
+    def publish(self, channel, message):
+        """发布消息；传输失败只记录日志，不影响调用方"""
+        self.counters['published'] += 1
+        try:
+            self.transport.publish(channel, message)
+        except Exception as e:
+            self.counters['publish_failures'] += 1
+            logger.warning(f"事件发布失败 [{self.name}/{channel}]: {e}")
+
+    def deliver(self, channel, message):
+        """由 transport 调用：投递给本进程中订阅该频道的连接"""
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+        self.counters['delivered'] += len(subscribers)
+
+    def stats(self):
+        with self._lock:
+            channels = len(self._subscriptions)
+            subscriptions = len({s for subscribers in self._subscriptions.values() for s in subscribers})
+        return {
+            'name': self.name,
+            'channels': channels,
+            'subscriptions': subscriptions,
+            'transport': type(self.transport).__name__,
+            **self.counters,
+        }
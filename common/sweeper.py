@@ -0,0 +1,129 @@
+"""
+过期记录清理器
+按索引分批找出已过期的记录，以条件 UPDATE 完成状态迁移，并批量触发后续事件
+"""
+import logging
+import threading
+import time
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from common.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ExpirySweeper:
+    """分批过期清理器
+
+    - expired_filter(now): 返回过期条件 Q 对象，需能命中索引
+    - updates(now): 返回过期时写入的字段
+    - fields: 需要随批次返回的字段，供 on_expired 生成事件
+    - on_expired(rows): 每批提交后调用一次，用于批量发送事件
+    - pause: 批次间暂停秒数，限制对数据库的写入速率
+    - using: 数据库别名（分片部署时每个分片一个清理器）
+    """
+
+    def __init__(self, name, model, expired_filter, updates, fields=(), on_expired=None,
+                 batch_size=500, max_batches=None, pause=0.0, using='default'):
+        self.name = name
+        self.model = model
+        self.using = using
+        self.expired_filter = expired_filter
+        self.updates = updates
+        self.fields = tuple(fields)
+        self.on_expired = on_expired
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.pause = pause
+        self._thread = None
+
+    def backlog(self, now=None):
+        """当前积压的过期记录数"""
+        now = now or timezone.now()
+        count = self.model.objects.using(self.using).filter(self.expired_filter(now)).count()
+        metrics.set_gauge(f'{self.name}.backlog', count)
+        return count
+
+    def sweep_batch(self, now):
+        """处理一批过期记录，返回已迁移的行"""
+        pk_name = self.model._meta.pk.name
+        manager = self.model.objects.using(self.using)
+        with transaction.atomic(using=self.using):
+            # 锁定本批记录，跳过其他实例正在处理的行
+            rows = list(
+                manager.filter(self.expired_filter(now))
+                .select_for_update(skip_locked=True)
+                .order_by(pk_name)
+                .values(pk_name, *self.fields)[:self.batch_size]
+            )
+            if rows:
+                manager.filter(
+                    self.expired_filter(now),
+                    pk__in=[row[pk_name] for row in rows]
+                ).update(**self.updates(now))
+        return rows
+
+    def run_once(self, batch_size=None, max_batches=None, pause=None):
+        """执行一轮清理，返回本轮统计"""
+        if batch_size is not None:
+            self.batch_size = batch_size
+        max_batches = self.max_batches if max_batches is None else max_batches
+        pause = self.pause if pause is None else pause
+
+        started = time.monotonic()
+        backlog = self.backlog()
+        expired = batches = 0
+        while backlog and (not max_batches or batches < max_batches):
+            rows = self.sweep_batch(timezone.now())
+            if not rows:
+                break
+            batches += 1
+            expired += len(rows)
+            metrics.inc(f'{self.name}.expired', len(rows))
+            if self.on_expired:
+                try:
+                    self.on_expired(rows)
+                except Exception as e:
+                    logger.warning(f"过期事件发送失败 [{self.name}]: {e}")
+            if len(rows) < self.batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+        duration = time.monotonic() - started
+        metrics.set_gauge(f'{self.name}.last_run_seconds', round(duration, 3))
+        metrics.set_gauge(f'{self.name}.last_run_expired', expired)
+        remaining = self.backlog()
+        return {
+            'backlog': backlog,
+            'expired': expired,
+            'batches': batches,
+            'remaining': remaining,
+            'duration': round(duration, 3),
+        }
+
+    def start(self, interval):
+        """以守护线程方式定期运行（进程内调度）"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._loop,
+            args=(interval,),
+            name=f'{self.name}-sweeper',
+            daemon=True
+        )
+        self._thread.start()
+        logger.info(f"过期清理线程已启动: {self.name} (间隔 {interval}s)")
+
+    def _loop(self, interval):
+        while True:
+            close_old_connections()
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"过期清理失败 [{self.name}]: {e}")
+            finally:
+                close_old_connections()
+            time.sleep(interval)
@@ -0,0 +1,83 @@
+"""
+进程内后台任务队列
+用于把耗时的跨服务调用移出请求线程，避免工作线程被下游服务延迟拖住
+"""
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTaskQueue:
+    """有界后台任务队列
+
+    1. 固定数量的守护线程消费任务，首次提交时惰性启动
+    2. 队列有上限，队列满时 submit 返回 False，由调用方决定降级策略
+    3. 每个任务前后释放过期的数据库连接，避免线程持有失效连接
+    """
+
+    def __init__(self, name, workers=2, maxsize=1000):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self._queue = queue.Queue(maxsize=max(1, int(maxsize)))
+        self._threads = []
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, func, *args, **kwargs):
+        """提交任务，队列已满时返回 False"""
+        self._ensure_workers()
+        try:
+            self._queue.put_nowait((func, args, kwargs))
+            return True
+        except queue.Full:
+            self.rejected += 1
+            logger.warning(f"后台任务队列已满: {self.name}")
+            return False
+
+    def qsize(self):
+        """当前排队任务数"""
+        return self._queue.qsize()
+
+    def stats(self):
+        """队列运行指标"""
+        return {
+            'name': self.name,
+            'queued': self.qsize(),
+            'workers': len(self._threads),
+            'processed': self.processed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+        }
+
+    def _ensure_workers(self):
+        if len(self._threads) >= self.workers:
+            return
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"{self.name}-worker-{len(self._threads)}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self):
+        from django.db import close_old_connections
+
+        while True:
+            func, args, kwargs = self._queue.get()
+            close_old_connections()
+            try:
+                func(*args, **kwargs)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"后台任务执行失败 [{self.name}]: {e}")
+            finally:
+                close_old_connections()
+                self._queue.task_done()
@@ -0,0 +1,70 @@
+"""
+进程内 LRU + TTL 缓存
+用于缓存跨服务查询结果（如用户是否存在），减少同步 HTTP 调用；命中率通过 stats() 输出到 /metrics/
+"""
+import collections
+import threading
+import time
+
+MISSING = object()
+
+
+class TTLCache:
+    """线程安全的 LRU 缓存，每个条目有独立的过期时间
+
+    - 超过 maxsize 时淘汰最久未使用的条目
+    - set 可为单个条目指定 ttl（如“不存在”的结果用更短的 ttl 做负缓存）
+    - 未命中时 get 返回 MISSING（缓存值本身可以是 None）
+    """
+
+    def __init__(self, name, maxsize=10000, ttl=300):
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = ttl
+        self._data = collections.OrderedDict()  # {键: (过期时间, 值)}
+        self._lock = threading.Lock()
+        self.counters = collections.Counter()
+
+    def get(self, key, default=MISSING):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > now:
+                self._data.move_to_end(key)
+                self.counters['hits'] += 1
+                return entry[1]
+            if entry is not None:
+                del self._data[key]
+                self.counters['expired'] += 1
+            self.counters['misses'] += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.counters['evicted'] += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            size = len(self._data)
+            counters = dict(self.counters)
+        lookups = counters.get('hits', 0) + counters.get('misses', 0)
+        return {
+            'name': self.name,
+            'size': size,
+            'maxsize': self.maxsize,
+            'hit_ratio': round(counters.get('hits', 0) / lookups, 4) if lookups else None,
+            **counters,
+        }
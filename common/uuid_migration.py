@@ -0,0 +1,149 @@
+"""
+UUID 列在线转换为 BINARY(16)
+Django 的 AlterField 在 MySQL 上会直接 MODIFY 列类型，char(32) 的十六进制文本被截断为 16 字节，
+数据损坏且整表重建期间阻塞写入。ConvertUUIDToBinary 代替 AlterField，在 MySQL 上按以下步骤转换：
+
+1. 添加可空的影子列 <列名>__bin BINARY(16)
+2. 创建 INSERT/UPDATE 触发器，转换期间的新写入同步写入影子列
+3. 按主键分块回填 UNHEX(旧列)，每块单独提交，期间读写不受影响
+4. 删除触发器并补齐遗漏行，删除含旧列的索引，删除旧列并将影子列改名为原列名
+5. 按原定义重建索引（含唯一索引和函数索引）
+
+步骤 4、5 为 InnoDB 在线 DDL，建议在低峰期执行；需要 TRIGGER 权限（开启 binlog 时还需 log_bin_trust_function_creators）。
+其他数据库上与 AlterField 相同（CompactUUIDField 在非 MySQL 数据库上与 UUIDField 存储一致）
+"""
+import logging
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK_SIZE = 5000
+
+
+class ConvertUUIDToBinary(migrations.AlterField):
+    """将 UUIDField(char(32)) 在线转换为 CompactUUIDField(BINARY(16))，可逆"""
+
+    def __init__(self, model_name, name, field, preserve_default=True, chunk_size=BACKFILL_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        super().__init__(model_name, name, field, preserve_default)
+
+    def deconstruct(self):
+        name, args, kwargs = super().deconstruct()
+        if self.chunk_size != BACKFILL_CHUNK_SIZE:
+            kwargs['chunk_size'] = self.chunk_size
+        return name, args, kwargs
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'mysql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            self._convert(schema_editor, model, 'binary(16)', 'UNHEX({column})')
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'mysql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            self._convert(schema_editor, model, 'char(32)', 'LOWER(HEX({column}))')
+
+    def describe(self):
+        return f"Convert {self.model_name}.{self.name} to BINARY(16) online"
+
+    @property
+    def migration_name_fragment(self):
+        return f"convert_{self.model_name_lower}_{self.name_lower}_binary"
+
+    def _convert(self, schema_editor, model, target_type, convert_expr):
+        table = model._meta.db_table
+        field = model._meta.get_field(self.name)
+        column = field.column
+        shadow = f"{column}__bin"
+        pk_column = model._meta.pk.column
+        qn = schema_editor.quote_name
+        convert_sql = convert_expr.format(column=qn(column))
+        new_convert_sql = convert_expr.format(column=f"NEW.{qn(column)}")
+        insert_trigger = f"{table}_{column}_bin_ins"[:64]
+        update_trigger = f"{table}_{column}_bin_upd"[:64]
+
+        with schema_editor.connection.cursor() as cursor:
+            # 1. 影子列
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD COLUMN {qn(shadow)} {target_type} NULL")
+
+            # 2. 同步新写入
+            cursor.execute(
+                f"CREATE TRIGGER {qn(insert_trigger)} BEFORE INSERT ON {qn(table)} "
+                f"FOR EACH ROW SET NEW.{qn(shadow)} = {new_convert_sql}"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER {qn(update_trigger)} BEFORE UPDATE ON {qn(table)} "
+                f"FOR EACH ROW SET NEW.{qn(shadow)} = {new_convert_sql}"
+            )
+
+            # 3. 分块回填
+            cursor.execute(f"SELECT MIN({qn(pk_column)}), MAX({qn(pk_column)}) FROM {qn(table)}")
+            low, high = cursor.fetchone()
+            if low is not None:
+                start = low
+                while start <= high:
+                    end = start + self.chunk_size
+                    cursor.execute(
+                        f"UPDATE {qn(table)} SET {qn(shadow)} = {convert_sql} "
+                        f"WHERE {qn(pk_column)} >= %s AND {qn(pk_column)} < %s",
+                        [start, end]
+                    )
+                    if not schema_editor.connection.get_autocommit():
+                        schema_editor.connection.commit()
+                    start = end
+                logger.info(f"{table}.{column} 回填完成")
+
+            # 4. 切换
+            cursor.execute(f"DROP TRIGGER IF EXISTS {qn(insert_trigger)}")
+            cursor.execute(f"DROP TRIGGER IF EXISTS {qn(update_trigger)}")
+            cursor.execute(
+                f"UPDATE {qn(table)} SET {qn(shadow)} = {convert_sql} "
+                f"WHERE {qn(column)} IS NOT NULL AND {qn(shadow)} IS NULL"
+            )
+            indexes = self._indexes_on_column(cursor, table, column)
+            drops = [f"DROP INDEX {qn(name)}" for name in indexes]
+            null_sql = 'NULL' if field.null else 'NOT NULL'
+            cursor.execute(
+                f"ALTER TABLE {qn(table)} " + ", ".join(drops + [
+                    f"DROP COLUMN {qn(column)}",
+                    f"CHANGE COLUMN {qn(shadow)} {qn(column)} {target_type} {null_sql}",
+                ])
+            )
+
+            # 5. 重建索引
+            for name, (unique, parts) in indexes.items():
+                unique_sql = 'UNIQUE ' if unique else ''
+                cursor.execute(f"ALTER TABLE {qn(table)} ADD {unique_sql}INDEX {qn(name)} ({', '.join(parts)})")
+
+    def _indexes_on_column(self, cursor, table, column):
+        """读取包含该列（含函数索引表达式）的索引定义 {索引名: (是否唯一, [索引部分])}"""
+        cursor.execute(
+            "SELECT INDEX_NAME, NON_UNIQUE, SEQ_IN_INDEX, COLUMN_NAME, SUB_PART, EXPRESSION "
+            "FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s "
+            "ORDER BY INDEX_NAME, SEQ_IN_INDEX",
+            [table]
+        )
+        definitions = {}
+        for name, non_unique, _seq, column_name, sub_part, expression in cursor.fetchall():
+            if name == 'PRIMARY':
+                continue
+            unique, parts, uses_column = definitions.setdefault(name, [not non_unique, [], False])
+            if expression:
+                parts.append(f"({expression})")
+                if f"`{column}`" in expression:
+                    definitions[name][2] = True
+            else:
+                parts.append(f"`{column_name}`({sub_part})" if sub_part else f"`{column_name}`")
+                if column_name == column:
+                    definitions[name][2] = True
+        return {
+            name: (unique, parts)
+            for name, (unique, parts, uses_column) in definitions.items()
+            if uses_column
+        }
@@ -25,6 +25,9 @@ if not COMMON_DIR.exists():
     )
 
 sys.path.insert(0, str(COMMON_DIR))
+# 同时加入 common 的上级目录，使 common 可以按包导入（common.xxx）
+if str(COMMON_DIR.parent) not in sys.path:
+    sys.path.insert(0, str(COMMON_DIR.parent))
 
 # 导入公共配置（避免与当前config包冲突）
 import importlib.util
@@ -46,6 +49,7 @@ try:
     common_config = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(common_config)
     DATABASE_CONFIG = common_config.DATABASE_CONFIG
+    DATABASE_REPLICA_CONFIG = common_config.DATABASE_REPLICA_CONFIG
     NACOS_CONFIG = common_config.NACOS_CONFIG
     SERVICES = common_config.SERVICES
 except Exception as e:
@@ -86,6 +90,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'common.db_router.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -113,6 +118,17 @@ DATABASES = {
     'default': DATABASE_CONFIG['NOTIFICATION_DB']
 }
 
+# 只读副本：NOTIFICATION_DB_REPLICA_HOSTS 配置后，标记 @replica_reads 的只读接口读副本（common/db_router.py）
+DATABASE_REPLICAS = {}
+_replicas = common_config.replica_databases('default', DATABASE_REPLICA_CONFIG['NOTIFICATION_DB'])
+DATABASES.update(_replicas)
+DATABASE_REPLICAS['default'] = list(_replicas)
+DATABASE_REPLICA_MAX_LAG = int(os.getenv('DATABASE_REPLICA_MAX_LAG', 2))  # 秒，超过则回退主库
+DATABASE_REPLICA_CHECK_INTERVAL = int(os.getenv('DATABASE_REPLICA_CHECK_INTERVAL', 5))  # 延迟检查间隔（秒）
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DATABASE_REPLICA_PIN_SECONDS', 5))  # 写后读主库时长（秒）
+
+DATABASE_ROUTERS = ['common.db_router.ReplicaRouter']
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -178,6 +194,63 @@ NOTIFICATION_SERVICE = {
     'HOST': os.getenv('NOTIFICATION_HOST', '0.0.0.0'),
 }
 
+# 通知归档（python manage.py archive_notifications）
+NOTIFICATION_ARCHIVE_AFTER_DAYS = int(os.getenv('NOTIFICATION_ARCHIVE_AFTER_DAYS', 90))  # 已读通知保留在线表的天数
+NOTIFICATION_ARCHIVE_BATCH_SIZE = int(os.getenv('NOTIFICATION_ARCHIVE_BATCH_SIZE', 1000))  # 每批归档条数
+NOTIFICATION_ARCHIVE_BATCH_PAUSE = float(os.getenv('NOTIFICATION_ARCHIVE_BATCH_PAUSE', 0.2))  # 批次间暂停（秒）
+
+# 创建通知时的用户校验（UserService 查询结果缓存在进程内）
+NOTIFICATION_TRUST_INTERNAL_CALLERS = os.getenv('NOTIFICATION_TRUST_INTERNAL_CALLERS', 'False').lower() == 'true'  # 信任内部调用方传入的用户UUID，单条与批量创建都不再校验
+NOTIFICATION_USER_CACHE_SIZE = int(os.getenv('NOTIFICATION_USER_CACHE_SIZE', 10000))  # 最多缓存用户数
+NOTIFICATION_USER_CACHE_TTL = int(os.getenv('NOTIFICATION_USER_CACHE_TTL', 600))  # 用户存在的缓存时间（秒）
+NOTIFICATION_USER_NEGATIVE_TTL = int(os.getenv('NOTIFICATION_USER_NEGATIVE_TTL', 30))  # 用户不存在的缓存时间（秒）
+
+# 通知保留策略（purge_notifications 命令）
+NOTIFICATION_RETENTION_DAYS = {  # 按类型的最长保留天数，0 表示不按时间删除
+    'transaction': int(os.getenv('NOTIFICATION_RETENTION_DAYS_TRANSACTION', 0)),
+    'system': int(os.getenv('NOTIFICATION_RETENTION_DAYS_SYSTEM', 365)),
+    'promotion': int(os.getenv('NOTIFICATION_RETENTION_DAYS_PROMOTION', 30)),
+}
+NOTIFICATION_MAX_PER_USER = int(os.getenv('NOTIFICATION_MAX_PER_USER', 2000))  # 每用户最多保留的在线通知数，0 表示不限
+NOTIFICATION_PURGE_BATCH_SIZE = int(os.getenv('NOTIFICATION_PURGE_BATCH_SIZE', 500))  # 每批删除条数
+NOTIFICATION_PURGE_BATCH_PAUSE = float(os.getenv('NOTIFICATION_PURGE_BATCH_PAUSE', 0.1))  # 批次间暂停（秒）
+
+# 通知合并：同一用户、类型、related_id 在窗口（秒）内重复到达时 merge 合并到已有通知或 drop 丢弃，窗口为 0 不处理
+NOTIFICATION_COALESCE_RULES = {
+    'transaction': {
+        'window': int(os.getenv('NOTIFICATION_COALESCE_WINDOW_TRANSACTION', 60)),
+        'action': os.getenv('NOTIFICATION_COALESCE_ACTION_TRANSACTION', 'merge'),
+    },
+    'system': {
+        'window': int(os.getenv('NOTIFICATION_COALESCE_WINDOW_SYSTEM', 0)),
+        'action': os.getenv('NOTIFICATION_COALESCE_ACTION_SYSTEM', 'drop'),
+    },
+}
+
+# 通知摘要：携带 digest 分组或类型属于 NOTIFICATION_DIGEST_TYPES 的通知先暂存，由 flush_notification_digests 汇总
+NOTIFICATION_DIGEST_TYPES = [t for t in os.getenv('NOTIFICATION_DIGEST_TYPES', '').split(',') if t]  # 如 promotion
+NOTIFICATION_DIGEST_WINDOW = int(os.getenv('NOTIFICATION_DIGEST_WINDOW', 300))  # 分组最早事件超过该秒数后汇总
+NOTIFICATION_DIGEST_MAX_IDS = int(os.getenv('NOTIFICATION_DIGEST_MAX_IDS', 100))  # 汇总通知中最多记录的关联ID数
+
+# 已读标记：批量接口单次最多条数；写后缓冲按用户合并单条已读请求后定期批量写入
+NOTIFICATION_READ_BATCH_MAX = int(os.getenv('NOTIFICATION_READ_BATCH_MAX', 500))
+NOTIFICATION_READ_WRITE_BEHIND = os.getenv('NOTIFICATION_READ_WRITE_BEHIND', 'False').lower() == 'true'
+NOTIFICATION_READ_FLUSH_MS = int(os.getenv('NOTIFICATION_READ_FLUSH_MS', 500))  # 刷出周期（毫秒），需小于 DATABASE_REPLICA_PIN_SECONDS
+NOTIFICATION_READ_BUFFER_MAX = int(os.getenv('NOTIFICATION_READ_BUFFER_MAX', 1000))  # 缓冲超过该条数时立即刷出
+
+# 批量创建接口单次最多条数
+NOTIFICATION_BULK_MAX = int(os.getenv('NOTIFICATION_BULK_MAX', 500))
+
+# 实时推送（SSE /api/notifications/stream/，长轮询 /api/notifications/poll/）
+NOTIFICATION_PUSH_TRANSPORT = os.getenv('NOTIFICATION_PUSH_TRANSPORT', 'common.pubsub.LocalTransport')  # 跨实例传输实现
+NOTIFICATION_PUSH_MAX_CONNECTIONS = int(os.getenv('NOTIFICATION_PUSH_MAX_CONNECTIONS', 200))  # 每进程最多同时等待的推送连接
+NOTIFICATION_PUSH_QUEUE_SIZE = int(os.getenv('NOTIFICATION_PUSH_QUEUE_SIZE', 100))  # 每个连接积压事件上限，超过时丢弃最旧事件
+NOTIFICATION_PUSH_HEARTBEAT = int(os.getenv('NOTIFICATION_PUSH_HEARTBEAT', 15))  # SSE 保活间隔（秒）
+NOTIFICATION_PUSH_IDLE_TIMEOUT = int(os.getenv('NOTIFICATION_PUSH_IDLE_TIMEOUT', 120))  # 无事件时关闭 SSE 连接（秒）
+NOTIFICATION_PUSH_MAX_SECONDS = int(os.getenv('NOTIFICATION_PUSH_MAX_SECONDS', 300))  # SSE 连接最长时间（秒）
+NOTIFICATION_PUSH_RETRY_MS = int(os.getenv('NOTIFICATION_PUSH_RETRY_MS', 3000))  # 客户端重连间隔（毫秒）
+NOTIFICATION_PUSH_LONG_POLL_MAX = int(os.getenv('NOTIFICATION_PUSH_LONG_POLL_MAX', 25))  # 长轮询最长等待（秒）
+
 # Email settings (用于邮件通知)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
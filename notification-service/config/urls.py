@@ -5,6 +5,7 @@ URL configuration for notification service project.
 from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
+from common.metrics import metrics_view
 
 
 def health(_request):
@@ -13,6 +14,7 @@ def health(_request):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('health/', health),
+    path('metrics/', metrics_view),
     # 通知和安全策略接口 - 兼容原有 /api/notifications/ 和 /api/security/ 路径
     path('api/', include('notification.urls')),
 ]
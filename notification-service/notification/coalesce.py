@@ -0,0 +1,124 @@
+"""
+通知合并与去重
+同一用户、同一类型、同一 related_id 的通知在时间窗口内重复到达时（如订单状态频繁变更），
+按 NOTIFICATION_COALESCE_RULES 在写入前处理，不再逐条插入：
+
+- merge：更新窗口内已有的那条通知为最新标题/正文，related_data 合并并记录 merged_count，
+  重新置为未读并移到收件箱顶部（created_at 更新为当前时间）
+- drop：窗口内已有通知时丢弃新通知
+
+未配置规则的类型、没有 related_id 的通知照常写入。并发写入同一键时可能各自插入一条，属于可接受的漏合并
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from common.metrics import metrics
+from .counters import adjust_unread
+from .models import Notification, NotificationContent, get_notification_type_value
+
+logger = logging.getLogger(__name__)
+
+ACTIONS = ('merge', 'drop')
+
+
+def coalesce_rules():
+    """{类型值: (窗口秒数, 动作)}"""
+    rules = {}
+    for type_name, rule in (getattr(settings, 'NOTIFICATION_COALESCE_RULES', None) or {}).items():
+        type_value = get_notification_type_value(type_name)
+        window = int((rule or {}).get('window') or 0)
+        action = (rule or {}).get('action', 'merge')
+        if type_value is None or action not in ACTIONS:
+            logger.warning(f"无效的通知合并规则: {type_name}={rule}")
+            continue
+        if window > 0:
+            rules[type_value] = (window, action)
+    return rules
+
+
+class Coalescer:
+    """对同一事务中写入的一批通知做合并/去重（单条创建即只有一条的批）
+
+    apply(item) 返回 (通知, 动作)：动作为 None 时调用方照常插入，并调用 remember 登记新通知，
+    使同一批中后到的重复通知也能合并；动作为 merge/drop 时返回的是被合并的已有通知
+    """
+
+    def __init__(self, now=None):
+        self.now = now or timezone.now()
+        self.rules = coalesce_rules()
+        self._recent = {}  # {键: (通知, 待插入的数据 或 None)}
+
+    def key(self, item):
+        if item.get('type') not in self.rules or not item.get('related_id'):
+            return None
+        return (str(item['user_uuid']), item['type'], str(item['related_id']))
+
+    def remember(self, item, notification):
+        key = self.key(item)
+        if key is not None:
+            self._recent[key] = (notification, item)
+
+    def _find_recent(self, key):
+        window, _ = self.rules[key[1]]
+        return (
+            Notification.objects.select_for_update()
+            .filter(user_uuid=key[0], type=key[1], related_id=key[2], created_at__gte=self.now - timedelta(seconds=window))
+            .select_related('payload')
+            .order_by('-created_at', '-pk')
+            .first()
+        )
+
+    def apply(self, item):
+        key = self.key(item)
+        if key is None:
+            return None, None
+        if key in self._recent:
+            notification, pending = self._recent[key]
+        else:
+            notification, pending = self._find_recent(key), None
+        if notification is None:
+            return None, None
+
+        action = self.rules[key[1]][1]
+        if action == 'merge':
+            if pending is not None:
+                self._merge_pending(notification, pending, item)
+            else:
+                self._merge_existing(notification, item)
+                self._recent[key] = (notification, None)
+        metrics.inc(f'notification.coalesced.{action}')
+        return notification, action
+
+    @staticmethod
+    def _merged_data(old, item):
+        old = old or {}
+        return {**old, **(item.get('related_data') or {}), 'merged_count': old.get('merged_count', 1) + 1}
+
+    def _merge_pending(self, notification, pending, item):
+        """合并到本批尚未插入的通知"""
+        notification.title = item['title']
+        pending['title'] = item['title']
+        pending['content'] = item['content']
+        pending['related_data'] = self._merged_data(pending.get('related_data'), item)
+
+    def _merge_existing(self, notification, item):
+        """合并到已有通知（已被 select_for_update 锁定）"""
+        was_read = notification.read
+        notification.title = item['title']
+        notification.read = False
+        notification.read_at = None
+        notification.created_at = self.now
+        Notification.objects.filter(pk=notification.pk).update(
+            title=notification.title, read=False, read_at=None, created_at=self.now
+        )
+        payload = notification.get_payload()
+        related_data = self._merged_data(payload.related_data if payload else None, item)
+        notification.payload, _ = NotificationContent.objects.update_or_create(
+            notification_id=notification.pk,
+            defaults={'content': item['content'], 'related_data': related_data}
+        )
+        if was_read:
+            adjust_unread(notification.user_uuid, 1)
@@ -0,0 +1,88 @@
+"""
+个人通知未读计数
+
+未读角标是调用最频繁的接口，不再每次 COUNT(*)：UnreadCounter 每个用户一行，
+在创建、单条已读、全部已读、删除通知的同一事务中按变化量原子增减（UPDATE ... SET unread = unread + n）。
+
+- 计数行不存在（老用户首次访问或从未收到通知）时按 COUNT(*) 初始化；调用方在写入通知之后再调整计数，
+  初始化结果已包含本次变化
+- 增减只在计数行存在时生效，减到 0 为止；残余漂移由 repair_unread_counters 命令定期对账修复
+"""
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from common.metrics import metrics
+from .models import Notification, UnreadCounter
+
+logger = logging.getLogger(__name__)
+
+
+def _count_unread(user_uuid):
+    return Notification.objects.filter(user_uuid=user_uuid, read=False).count()
+
+
+def _initialize(user_uuid):
+    """按实际未读数创建计数行，返回未读数（并发初始化时以先写入者为准）"""
+    unread = _count_unread(user_uuid)
+    try:
+        with transaction.atomic():
+            UnreadCounter.objects.create(user_uuid=user_uuid, unread=unread)
+    except IntegrityError:
+        pass
+    metrics.inc('notification.unread_counter.initialized')
+    return unread
+
+
+def get_unread_count(user_uuid):
+    """用户个人通知未读数（主键查询）"""
+    unread = UnreadCounter.objects.filter(user_uuid=user_uuid).values_list('unread', flat=True).first()
+    if unread is None:
+        return _initialize(user_uuid)
+    return unread
+
+
+def adjust_unread(user_uuid, delta):
+    """按变化量调整未读数，需在通知写入之后调用（同一事务内）"""
+    if not delta:
+        return
+    updated = UnreadCounter.objects.filter(user_uuid=user_uuid).update(
+        unread=Greatest(F('unread') + delta, 0),
+        updated_at=timezone.now()
+    )
+    if not updated:
+        _initialize(user_uuid)
+
+
+def repair_unread_counters(chunk_size=1000):
+    """按主键分块核对计数与实际未读数，修复漂移的计数行，返回 (核对数, 修复数)"""
+    checked = repaired = 0
+    last_uuid = None
+    while True:
+        counters = UnreadCounter.objects.order_by('user_uuid')
+        if last_uuid is not None:
+            counters = counters.filter(user_uuid__gt=last_uuid)
+        rows = list(counters.values_list('user_uuid', 'unread')[:chunk_size])
+        if not rows:
+            break
+        last_uuid = rows[-1][0]
+        actual = dict(
+            Notification.objects.filter(user_uuid__in=[user_uuid for user_uuid, _ in rows], read=False)
+            .values('user_uuid').annotate(unread=Count('id')).values_list('user_uuid', 'unread')
+        )
+        for user_uuid, unread in rows:
+            expected = actual.get(user_uuid, 0)
+            if unread != expected:
+                # 条件更新：核对期间计数已被正常增减时不覆盖，留给下一轮
+                repaired += UnreadCounter.objects.filter(user_uuid=user_uuid, unread=unread).update(
+                    unread=expected,
+                    updated_at=timezone.now()
+                )
+        checked += len(rows)
+    metrics.inc('notification.unread_counter.repaired', repaired)
+    if repaired:
+        logger.info(f"未读计数对账: 核对 {checked} 个用户, 修复 {repaired} 个")
+    return checked, repaired
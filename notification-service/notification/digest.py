@@ -0,0 +1,137 @@
+"""
+通知摘要
+高频通知（如活跃卖家的每笔订单事件）不再逐条写入收件箱，而是先写入暂存表 DigestEntry，
+由 flush_notification_digests 定期按 (用户, 类型, 摘要分组) 汇总为一条通知：
+
+- 创建通知时携带 digest（摘要分组名），或类型属于 NOTIFICATION_DIGEST_TYPES 时进入摘要
+- 分组中最早的事件超过 NOTIFICATION_DIGEST_WINDOW 秒后汇总；related_data 记录条数、关联ID（最多
+  NOTIFICATION_DIGEST_MAX_IDS 个）和时间范围，汇总通知与暂存事件的删除在同一事务中
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from common.metrics import metrics
+from .models import DigestEntry, get_notification_type_value
+from . import realtime
+
+logger = logging.getLogger(__name__)
+
+TYPE_LABELS = {0: '交易', 1: '系统', 2: '促销'}
+PREVIEW_TITLES = 5
+
+
+def digest_types():
+    types = set()
+    for type_name in getattr(settings, 'NOTIFICATION_DIGEST_TYPES', None) or ():
+        type_value = get_notification_type_value(type_name)
+        if type_value is not None:
+            types.add(type_value)
+    return types
+
+
+def digest_key(item, types=None):
+    """通知的摘要分组；不进入摘要时返回 None"""
+    key = item.get('digest')
+    if key:
+        return key
+    if item.get('type') in (digest_types() if types is None else types):
+        return ''
+    return None
+
+
+def stage(items):
+    """写入暂存表（items 为 (数据, 摘要分组)），返回写入条数"""
+    entries = [
+        DigestEntry(
+            user_uuid=item['user_uuid'],
+            type=item['type'],
+            digest_key=key,
+            title=item['title'],
+            content=item['content'],
+            related_id=item.get('related_id')
+        )
+        for item, key in items
+    ]
+    DigestEntry.objects.bulk_create(entries)
+    metrics.inc('notification-digest.staged', len(entries))
+    return len(entries)
+
+
+def summarize(entries, max_ids):
+    """由一组暂存事件生成汇总通知的数据"""
+    first = entries[0]
+    count = len(entries)
+    titles = [entry.title for entry in entries]
+    related_ids = list(dict.fromkeys(entry.related_id for entry in entries if entry.related_id))
+    if count == 1:
+        title = first.title
+        content = first.content or first.title
+    else:
+        title = f"{TYPE_LABELS.get(first.type, '')}消息摘要：{count} 条新通知"
+        content = '；'.join(titles[:PREVIEW_TITLES]) + (f' 等 {count} 条' if count > PREVIEW_TITLES else '')
+    return {
+        'user_uuid': first.user_uuid,
+        'type': first.type,
+        'title': title[:100],
+        'content': content,
+        'related_id': None,
+        'related_data': {
+            'digest': first.digest_key,
+            'count': count,
+            'related_ids': related_ids[:max_ids],
+            'first_at': entries[0].created_at.isoformat(),
+            'last_at': entries[-1].created_at.isoformat(),
+        }
+    }
+
+
+def flush_group(user_uuid, type_value, key, max_ids):
+    """汇总一个分组，返回 (汇总通知, 事件数)；分组正被其他实例处理时返回 (None, 0)"""
+    from .serializers import create_notifications
+    with transaction.atomic():
+        entries = list(
+            DigestEntry.objects.select_for_update(skip_locked=True)
+            .filter(user_uuid=user_uuid, type=type_value, digest_key=key)
+            .order_by('id')
+        )
+        if not entries:
+            return None, 0
+        (notification, _), = create_notifications([summarize(entries, max_ids)])
+        DigestEntry.objects.filter(pk__in=[entry.pk for entry in entries]).delete()
+        realtime.publish_notification(notification)
+        realtime.publish_unread(notification.user_uuid)
+    return notification, len(entries)
+
+
+def flush_digests(now=None, window=None, max_ids=None, max_groups=None):
+    """汇总最早事件已超过窗口的分组，返回统计"""
+    now = now or timezone.now()
+    window = getattr(settings, 'NOTIFICATION_DIGEST_WINDOW', 300) if window is None else window
+    max_ids = max_ids or getattr(settings, 'NOTIFICATION_DIGEST_MAX_IDS', 100)
+    started = time.monotonic()
+    groups = (
+        DigestEntry.objects.filter(created_at__lte=now - timedelta(seconds=window))
+        .values_list('user_uuid', 'type', 'digest_key').distinct()
+    )
+    if max_groups:
+        groups = groups[:max_groups]
+    stats = {'groups': 0, 'entries': 0}
+    for user_uuid, type_value, key in list(groups):
+        try:
+            notification, count = flush_group(user_uuid, type_value, key, max_ids)
+        except Exception as e:
+            logger.error(f"通知摘要汇总失败: user={user_uuid}, type={type_value}, digest={key}: {e}")
+            continue
+        if notification is not None:
+            stats['groups'] += 1
+            stats['entries'] += count
+    metrics.inc('notification-digest.flushed_groups', stats['groups'])
+    metrics.inc('notification-digest.flushed_entries', stats['entries'])
+    metrics.set_gauge('notification-digest.pending', DigestEntry.objects.count())
+    stats['duration'] = round(time.monotonic() - started, 3)
+    return stats
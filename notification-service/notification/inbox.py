@@ -0,0 +1,135 @@
+"""
+收件箱：个人通知与广播通知在读取时合并
+
+广播通知只存一行（BroadcastNotification），不为每个用户复制；用户的广播已读状态由
+已读水位（BroadcastReadMark.last_read_id，全部已读时推进到最新广播）加水位之上的单条已读回执
+（BroadcastReceipt）表示。发送一条全站通知只需一次插入，列表、未读数和全部已读在读取时合并两部分
+"""
+import heapq
+import itertools
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import BroadcastNotification, BroadcastReadMark, BroadcastReceipt
+
+
+def active_broadcasts(now=None):
+    """未过期的广播通知"""
+    now = now or timezone.now()
+    return BroadcastNotification.objects.filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now))
+
+
+class BroadcastReadState:
+    """用户的广播已读状态：水位 + 水位之上的已读回执"""
+
+    def __init__(self, user_uuid):
+        self.user_uuid = user_uuid
+        self.last_read_id = BroadcastReadMark.objects.filter(
+            user_uuid=user_uuid
+        ).values_list('last_read_id', flat=True).first() or 0
+        self.receipts = dict(
+            BroadcastReceipt.objects.filter(
+                user_uuid=user_uuid,
+                broadcast_id__gt=self.last_read_id
+            ).values_list('broadcast_id', 'read_at')
+        )
+
+    def is_read(self, broadcast_id):
+        return broadcast_id <= self.last_read_id or broadcast_id in self.receipts
+
+    def filter(self, queryset, read):
+        """按已读状态筛选广播查询集"""
+        unread = Q(id__gt=self.last_read_id) & ~Q(id__in=list(self.receipts))
+        return queryset.exclude(unread) if read else queryset.filter(unread)
+
+    def unread_count(self):
+        return self.filter(active_broadcasts(), read=False).count()
+
+    def annotate(self, broadcasts):
+        """为广播实例补充当前用户视角的 user_uuid/read/read_at，便于与个人通知统一序列化"""
+        for broadcast in broadcasts:
+            broadcast.user_uuid = self.user_uuid
+            broadcast.read = self.is_read(broadcast.id)
+            broadcast.read_at = self.receipts.get(broadcast.id)
+        return broadcasts
+
+
+def mark_broadcast_read(user_uuid, broadcast_id):
+    """单条广播标记已读（水位之下的无需记录），返回是否新标记"""
+    last_read_id = BroadcastReadMark.objects.filter(
+        user_uuid=user_uuid
+    ).values_list('last_read_id', flat=True).first() or 0
+    if broadcast_id <= last_read_id:
+        return False
+    _, created = BroadcastReceipt.objects.get_or_create(user_uuid=user_uuid, broadcast_id=broadcast_id)
+    return created
+
+
+def mark_all_broadcasts_read(user_uuid):
+    """推进已读水位到最新广播并清理水位之下的回执，返回新标记已读的广播数"""
+    read_state = BroadcastReadState(user_uuid)
+    newly_read = read_state.unread_count()
+    latest_id = BroadcastNotification.objects.order_by('-id').values_list('id', flat=True).first()
+    if latest_id is None or latest_id <= read_state.last_read_id:
+        return newly_read
+    # 条件更新，并发请求不会把水位往回推
+    updated = BroadcastReadMark.objects.filter(
+        user_uuid=user_uuid,
+        last_read_id__lt=latest_id
+    ).update(last_read_id=latest_id, updated_at=timezone.now())
+    if not updated:
+        BroadcastReadMark.objects.bulk_create(
+            [BroadcastReadMark(user_uuid=user_uuid, last_read_id=latest_id)],
+            ignore_conflicts=True
+        )
+    BroadcastReceipt.objects.filter(user_uuid=user_uuid, broadcast_id__lte=latest_id).delete()
+    return newly_read
+
+
+class Inbox:
+    """按 created_at 倒序合并个人通知与广播通知的只读序列，供分页器使用
+
+    读取 [start:stop] 时两边各只取前 stop 条的 (created_at, id) 排序键归并，
+    定位出本页条目后再按主键加载这一页的个人通知（含正文）和广播，深分页不再读取前面各页的正文
+    """
+
+    def __init__(self, personal, broadcasts, read_state):
+        self.personal = personal
+        self.broadcasts = broadcasts
+        self.read_state = read_state
+
+    def count(self):
+        return self.personal.count() + self.broadcasts.count()
+
+    def __len__(self):
+        return self.count()
+
+    @staticmethod
+    def _keys(queryset, stop, source):
+        keys = queryset.order_by('-created_at', '-id').values_list('created_at', 'id')
+        if stop is not None:
+            keys = keys[:stop]
+        return [(created_at, pk, source) for created_at, pk in keys]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        merged = heapq.merge(
+            self._keys(self.personal, stop, 'personal'),
+            self._keys(self.broadcasts, stop, 'broadcast'),
+            key=lambda key: key[:2],
+            reverse=True
+        )
+        page = list(itertools.islice(merged, start, stop))
+
+        personal_ids = [pk for _, pk, source in page if source == 'personal']
+        broadcast_ids = [pk for _, pk, source in page if source == 'broadcast']
+        rows = {}
+        if personal_ids:
+            rows.update((('personal', item.pk), item) for item in self.personal.filter(pk__in=personal_ids))
+        if broadcast_ids:
+            broadcasts = self.read_state.annotate(list(self.broadcasts.filter(pk__in=broadcast_ids)))
+            rows.update((('broadcast', item.pk), item) for item in broadcasts)
+        return [rows[(source, pk)] for _, pk, source in page if (source, pk) in rows]
@@ -0,0 +1,35 @@
+"""
+归档已读且超过保留期的通知
+用法: python manage.py archive_notifications [--batch-size 1000] [--max-batches N] [--pause 0.2] [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from common.archive import ensure_partitions
+from notification.tasks import notification_archiver
+
+
+class Command(BaseCommand):
+    help = '分批将超过保留期的已读通知移入归档表（NOTIFICATION_ARCHIVE_AFTER_DAYS），并补齐归档表的未来分区'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='每批归档条数')
+        parser.add_argument('--max-batches', type=int, default=None, help='最多归档批数')
+        parser.add_argument('--pause', type=float, default=None, help='批次间暂停秒数（限速）')
+        parser.add_argument('--dry-run', action='store_true', help='只输出可归档数量，不做修改')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f'可归档通知: {notification_archiver.backlog()} 条')
+            return
+
+        ensure_partitions(connection, 'notification_archive')
+        stats = notification_archiver.run_once(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            pause=options['pause']
+        )
+        self.stdout.write(
+            f"通知归档完成: 归档 {stats['archived']} 条, 批次 {stats['batches']}, "
+            f"剩余 {stats['remaining']} 条, 耗时 {stats['duration']}s"
+        )
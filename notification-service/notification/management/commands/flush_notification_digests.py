@@ -0,0 +1,27 @@
+"""
+汇总摘要模式的通知
+用法: python manage.py flush_notification_digests [--window 300] [--max-groups N] [--loop --interval 60]
+"""
+import time
+from django.core.management.base import BaseCommand
+from notification.digest import flush_digests
+
+
+class Command(BaseCommand):
+    help = '将最早事件超过窗口（NOTIFICATION_DIGEST_WINDOW）的摘要分组汇总为一条通知'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window', type=int, default=None, help='汇总窗口（秒），0 表示立即汇总所有分组')
+        parser.add_argument('--max-groups', type=int, default=None, help='每轮最多汇总的分组数')
+        parser.add_argument('--loop', action='store_true', help='常驻运行')
+        parser.add_argument('--interval', type=int, default=60, help='常驻运行时的间隔（秒）')
+
+    def handle(self, *args, **options):
+        while True:
+            stats = flush_digests(window=options['window'], max_groups=options['max_groups'])
+            self.stdout.write(self.style.SUCCESS(
+                f"通知摘要汇总完成: 分组 {stats['groups']} 个, 事件 {stats['entries']} 条, 耗时 {stats['duration']}s"
+            ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,37 @@
+"""
+按保留策略清理通知（按类型的最长保留天数、每用户最多条数）
+用法: python manage.py purge_notifications [--batch-size 500] [--max-batches N] [--pause 0.1] [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+
+from notification.retention import NotificationPurger
+
+
+class Command(BaseCommand):
+    help = '按 NOTIFICATION_RETENTION_DAYS 和 NOTIFICATION_MAX_PER_USER 分批删除通知'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='每批删除条数')
+        parser.add_argument('--max-batches', type=int, default=None, help='最多删除批数')
+        parser.add_argument('--pause', type=float, default=None, help='批次间暂停秒数（限速）')
+        parser.add_argument('--dry-run', action='store_true', help='只输出待删除数量，不做修改')
+
+    def handle(self, *args, **options):
+        purger = NotificationPurger(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            pause=options['pause']
+        )
+        if options['dry_run']:
+            backlog = purger.backlog()
+            self.stdout.write(
+                f"待清理通知: 超期 {backlog['expired']} 条, 超出每用户上限 {backlog['over_cap']} 条, "
+                f"归档表超期 {backlog['archive_expired']} 条"
+            )
+            return
+
+        stats = purger.run_once()
+        self.stdout.write(
+            f"通知清理完成: 超期 {stats['expired']} 条, 超出每用户上限 {stats['over_cap']} 条, "
+            f"归档表超期 {stats['archive_expired']} 条, 批次 {stats['batches']}, 耗时 {stats['duration']}s"
+        )
@@ -0,0 +1,24 @@
+"""
+核对并修复未读计数
+用法: python manage.py repair_unread_counters [--chunk-size 1000] [--loop --interval 3600]
+"""
+import time
+from django.core.management.base import BaseCommand
+from notification.counters import repair_unread_counters
+
+
+class Command(BaseCommand):
+    help = '按实际未读通知数修复漂移的未读计数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='每批核对的用户数')
+        parser.add_argument('--loop', action='store_true', help='常驻运行')
+        parser.add_argument('--interval', type=int, default=3600, help='常驻运行时的间隔（秒）')
+
+    def handle(self, *args, **options):
+        while True:
+            checked, repaired = repair_unread_counters(chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f'未读计数对账完成: 核对 {checked} 个用户, 修复 {repaired} 个'))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,63 @@
+# Generated by Django 5.2 on 2026-10-19 16:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def backfill_notification_content(apps, schema_editor):
+    """按主键分块将正文复制到正文表；已存在的正文行跳过，中断后可重复执行"""
+    Notification = apps.get_model('notification', 'Notification')
+    NotificationContent = apps.get_model('notification', 'NotificationContent')
+    last_id = 0
+    while True:
+        rows = list(
+            Notification.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'content', 'related_data')[:BACKFILL_CHUNK_SIZE]
+        )
+        if not rows:
+            return
+        NotificationContent.objects.bulk_create([
+            NotificationContent(
+                notification_id=notification_id,
+                content=content,
+                related_data=related_data or {}
+            )
+            for notification_id, content, related_data in rows
+        ], ignore_conflicts=True)
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    # 分块回填逐块提交，避免大表回填时长事务
+    atomic = False
+
+    dependencies = [
+        ('notification', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationContent',
+            fields=[
+                ('notification', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payload', serialize=False, to='notification.notification')),
+                ('content', models.TextField()),
+                ('related_data', models.JSONField(blank=True, default=dict, null=True)),
+            ],
+            options={
+                'db_table': 'notification_content',
+            },
+        ),
+        migrations.RunPython(backfill_notification_content, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='notification',
+            name='content',
+        ),
+        migrations.RemoveField(
+            model_name='notification',
+            name='related_data',
+        ),
+    ]
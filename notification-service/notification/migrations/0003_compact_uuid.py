@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-19 16:10
+
+import common.fields
+import common.uuid_migration
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # UUID 列在线转换为 BINARY(16)，分块回填逐块提交
+    atomic = False
+
+    dependencies = [
+        ('notification', '0002_notification_content'),
+    ]
+
+    operations = [
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='notification',
+            name='notification_uuid',
+            field=common.fields.CompactUUIDField(default=common.fields.uuid7, editable=False, unique=True),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='notification',
+            name='user_uuid',
+            field=common.fields.CompactUUIDField(),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='riskassessment',
+            name='assessment_uuid',
+            field=common.fields.CompactUUIDField(default=common.fields.uuid7, editable=False, unique=True),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='riskassessment',
+            name='order_uuid',
+            field=common.fields.CompactUUIDField(blank=True, null=True),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='riskassessment',
+            name='user_uuid',
+            field=common.fields.CompactUUIDField(),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='securitypolicy',
+            name='policy_uuid',
+            field=common.fields.CompactUUIDField(default=common.fields.uuid7, editable=False, unique=True),
+        ),
+    ]
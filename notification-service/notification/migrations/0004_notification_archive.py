@@ -0,0 +1,55 @@
+# Generated by Django 5.2 on 2026-10-19 16:26
+
+import common.fields
+from django.db import migrations, models
+
+from common.archive import partition_by_month, remove_partitioning
+
+
+def partition_archive_table(apps, schema_editor):
+    """归档表按 created_at 月份分区（仅 MySQL）"""
+    partition_by_month(schema_editor.connection, 'notification_archive', 'id')
+
+
+def unpartition_archive_table(apps, schema_editor):
+    remove_partitioning(schema_editor.connection, 'notification_archive', 'id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0003_compact_uuid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('notification_uuid', common.fields.CompactUUIDField(db_index=True)),
+                ('user_uuid', common.fields.CompactUUIDField()),
+                ('type', models.SmallIntegerField(choices=[(0, 'transaction'), (1, 'system'), (2, 'promotion')])),
+                ('title', models.CharField(max_length=100)),
+                ('read', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField()),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('related_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('content', models.TextField()),
+                ('related_data', models.JSONField(blank=True, default=dict, null=True)),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'notification_archive',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['read', 'created_at'], name='notification_read_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationarchive',
+            index=models.Index(fields=['user_uuid', 'created_at'], name='notification_archive_user_idx'),
+        ),
+        migrations.RunPython(partition_archive_table, unpartition_archive_table),
+    ]
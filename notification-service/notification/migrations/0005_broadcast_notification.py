@@ -0,0 +1,57 @@
+# Generated by Django 5.2 on 2026-10-19 16:27
+
+import common.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0004_notification_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastNotification',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('notification_uuid', common.fields.CompactUUIDField(default=common.fields.uuid7, editable=False, unique=True)),
+                ('type', models.SmallIntegerField(choices=[(0, 'transaction'), (1, 'system'), (2, 'promotion')])),
+                ('title', models.CharField(max_length=100)),
+                ('content', models.TextField()),
+                ('related_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('related_data', models.JSONField(blank=True, default=dict, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'notification_broadcast',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BroadcastReadMark',
+            fields=[
+                ('user_uuid', common.fields.CompactUUIDField(primary_key=True, serialize=False)),
+                ('last_read_id', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'notification_broadcast_read_mark',
+            },
+        ),
+        migrations.CreateModel(
+            name='BroadcastReceipt',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('user_uuid', common.fields.CompactUUIDField()),
+                ('read_at', models.DateTimeField(auto_now_add=True)),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='notification.broadcastnotification')),
+            ],
+            options={
+                'db_table': 'notification_broadcast_receipt',
+                'constraints': [models.UniqueConstraint(fields=('user_uuid', 'broadcast'), name='uniq_broadcast_receipt')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-19 16:29
+
+import common.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0005_broadcast_notification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnreadCounter',
+            fields=[
+                ('user_uuid', common.fields.CompactUUIDField(primary_key=True, serialize=False)),
+                ('unread', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'notification_unread_counter',
+            },
+        ),
+    ]
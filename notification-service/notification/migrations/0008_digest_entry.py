@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-19 16:39
+
+import common.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notification', '0007_notification_retention_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('user_uuid', common.fields.CompactUUIDField()),
+                ('type', models.SmallIntegerField(choices=[(0, 'transaction'), (1, 'system'), (2, 'promotion')])),
+                ('digest_key', models.CharField(default='', max_length=50)),
+                ('title', models.CharField(max_length=100)),
+                ('content', models.TextField(blank=True, default='')),
+                ('related_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'notification_digest_entry',
+                'indexes': [models.Index(fields=['user_uuid', 'type', 'digest_key', 'id'], name='notif_digest_group_idx'), models.Index(fields=['created_at'], name='notif_digest_created_idx')],
+            },
+        ),
+    ]
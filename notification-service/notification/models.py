@@ -2,7 +2,8 @@
 通知服务模型
 """
 from django.db import models
-import uuid
+
+from common.fields import CompactUUIDField, uuid7
 
 
 # 通知类型常量
@@ -40,34 +41,180 @@ def get_notification_type_value(type_input):
 class Notification(models.Model):
     """通知"""
     id = models.AutoField(primary_key=True)
-    notification_uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    notification_uuid = CompactUUIDField(default=uuid7, unique=True, editable=False)
 
     # 解耦改造：使用UUID替代外键
-    user_uuid = models.UUIDField()  # 用户UUID
+    user_uuid = CompactUUIDField()  # 用户UUID
 
     type = models.SmallIntegerField(choices=NOTIFICATION_TYPE_CHOICES)
     title = models.CharField(max_length=100)
-    content = models.TextField()
     read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     read_at = models.DateTimeField(null=True, blank=True)
 
     # 关联数据
     related_id = models.CharField(max_length=50, null=True, blank=True)  # 关联的订单ID、支付ID等
-    related_data = models.JSONField(default=dict, null=True, blank=True)  # 附加数据
+
+    # 正文和附加数据拆分到 NotificationContent（related_name='payload'），
+    # 收件箱扫描、未读计数只读取窄行
 
     def __str__(self):
         return self.title
 
+    @property
+    def content(self):
+        payload = self.get_payload()
+        return payload.content if payload else ''
+
+    @property
+    def related_data(self):
+        payload = self.get_payload()
+        return payload.related_data if payload else {}
+
+    def get_payload(self):
+        """通知正文（按需加载，列表查询可 select_related('payload') 预取）"""
+        try:
+            return self.payload
+        except NotificationContent.DoesNotExist:
+            return None
+
     class Meta:
         db_table = "notification"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['read', 'created_at'], name='notification_read_created_idx'),  # 归档扫描
+            models.Index(fields=['user_uuid', 'created_at'], name='notification_user_created_idx'),  # 收件箱、每用户上限
+            models.Index(fields=['type', 'created_at'], name='notification_type_created_idx'),  # 按类型保留期清理
+        ]
+
+
+class NotificationContent(models.Model):
+    """通知正文 - 从 notification 表垂直拆分出的大字段，按通知ID一对一"""
+    notification = models.OneToOneField(
+        Notification,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='payload',
+        db_constraint=False  # 与主表同时写入，不建外键约束
+    )
+    content = models.TextField()
+    related_data = models.JSONField(default=dict, null=True, blank=True)  # 附加数据
+
+    def __str__(self):
+        return f"NotificationContent {self.notification_id}"
+
+    class Meta:
+        db_table = "notification_content"
+
+
+class UnreadCounter(models.Model):
+    """用户个人通知未读数 - 创建/已读/删除时与通知在同一事务中增减（见 counters.py），
+    未读角标直接读取本表；行不存在时按 COUNT(*) 初始化，漂移由 repair_unread_counters 命令修复"""
+    user_uuid = CompactUUIDField(primary_key=True)
+    unread = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "notification_unread_counter"
+
+
+class NotificationArchive(models.Model):
+    """已归档通知 - 已读且超过保留期的通知（见 archive_notifications 命令）
+
+    正文内联；MySQL 上按 created_at 月份分区，主键为 (id, created_at)
+    """
+    id = models.IntegerField(primary_key=True)
+    notification_uuid = CompactUUIDField(db_index=True)
+    user_uuid = CompactUUIDField()
+    type = models.SmallIntegerField(choices=NOTIFICATION_TYPE_CHOICES)
+    title = models.CharField(max_length=100)
+    read = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    read_at = models.DateTimeField(null=True, blank=True)
+    related_id = models.CharField(max_length=50, null=True, blank=True)
+    content = models.TextField()
+    related_data = models.JSONField(default=dict, null=True, blank=True)
+    archived_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.title
+
+    class Meta:
+        db_table = "notification_archive"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user_uuid', 'created_at'], name='notification_archive_user_idx'),
+        ]
+
+
+class BroadcastNotification(models.Model):
+    """广播通知 - 全站系统/促销通知只写一行，读取时与个人通知合并（见 inbox.py）"""
+    id = models.AutoField(primary_key=True)
+    notification_uuid = CompactUUIDField(default=uuid7, unique=True, editable=False)
+    type = models.SmallIntegerField(choices=NOTIFICATION_TYPE_CHOICES)
+    title = models.CharField(max_length=100)
+    content = models.TextField()
+    related_id = models.CharField(max_length=50, null=True, blank=True)
+    related_data = models.JSONField(default=dict, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(null=True, blank=True)  # 过期后不再展示
+
+    def __str__(self):
+        return self.title
+
+    class Meta:
+        db_table = "notification_broadcast"
+        ordering = ['-created_at']
+
+
+class BroadcastReadMark(models.Model):
+    """用户的广播已读水位 - ID 不大于 last_read_id 的广播视为已读（全部已读时推进）"""
+    user_uuid = CompactUUIDField(primary_key=True)
+    last_read_id = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "notification_broadcast_read_mark"
+
+
+class BroadcastReceipt(models.Model):
+    """水位之上单条标记已读的广播，推进水位时清理"""
+    id = models.BigAutoField(primary_key=True)
+    broadcast = models.ForeignKey(BroadcastNotification, on_delete=models.CASCADE, related_name='receipts')
+    user_uuid = CompactUUIDField()
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "notification_broadcast_receipt"
+        constraints = [
+            models.UniqueConstraint(fields=['user_uuid', 'broadcast'], name='uniq_broadcast_receipt'),
+        ]
+
+
+class DigestEntry(models.Model):
+    """待汇总的通知事件 - 摘要模式的通知先写入本表，由 flush_notification_digests 按用户、类型、摘要分组
+    汇总为一条通知后删除（见 digest.py）"""
+    id = models.BigAutoField(primary_key=True)
+    user_uuid = CompactUUIDField()
+    type = models.SmallIntegerField(choices=NOTIFICATION_TYPE_CHOICES)
+    digest_key = models.CharField(max_length=50, default='')  # 摘要分组，如 seller-orders
+    title = models.CharField(max_length=100)
+    content = models.TextField(blank=True, default='')  # 分组只有一条事件时原样作为通知正文
+    related_id = models.CharField(max_length=50, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "notification_digest_entry"
+        indexes = [
+            models.Index(fields=['user_uuid', 'type', 'digest_key', 'id'], name='notif_digest_group_idx'),
+            models.Index(fields=['created_at'], name='notif_digest_created_idx'),
+        ]
 
 
 class SecurityPolicy(models.Model):
     """安全策略"""
     policy_id = models.IntegerField(primary_key=True)
-    policy_uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    policy_uuid = CompactUUIDField(default=uuid7, unique=True, editable=False)
     policy_name = models.CharField(max_length=100)
     policy_description = models.TextField()
     is_enabled = models.BooleanField(default=True)
@@ -92,10 +239,10 @@ class SecurityPolicy(models.Model):
 class RiskAssessment(models.Model):
     """风险评估记录"""
     assessment_id = models.AutoField(primary_key=True)
-    assessment_uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    assessment_uuid = CompactUUIDField(default=uuid7, unique=True, editable=False)
 
-    user_uuid = models.UUIDField()  # 被评估的用户
-    order_uuid = models.UUIDField(null=True, blank=True)  # 相关订单
+    user_uuid = CompactUUIDField()  # 被评估的用户
+    order_uuid = CompactUUIDField(null=True, blank=True)  # 相关订单
 
     risk_score = models.FloatField()  # 风险评分 0-100
     risk_level = models.CharField(max_length=20, choices=(
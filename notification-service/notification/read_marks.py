@@ -0,0 +1,151 @@
+"""
+通知已读标记
+1. mark_read：一批通知ID一次条件 UPDATE（只更新本人的未读通知），按实际更新行数扣减未读计数
+2. 写后缓冲（NOTIFICATION_READ_WRITE_BEHIND）：浏览收件箱时逐条打开产生的大量单条已读请求先在进程内
+   按用户合并，每隔 NOTIFICATION_READ_FLUSH_MS 毫秒（或累积超过 NOTIFICATION_READ_BUFFER_MAX 条）
+   每个用户执行一次 mark_read
+
+未读数与列表的正确性：读取某用户的未读数、通知列表前先同步刷出该用户的缓冲（flush_user），
+缓冲只存在于本进程，标记已读的写请求会把该用户后续读请求固定到主库（ReplicaPinningMiddleware），
+刷出周期小于固定时长，其他实例读到的计数最多滞后一个刷出周期；进程退出时刷出剩余标记
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from common.metrics import metrics
+from .counters import adjust_unread
+from .models import Notification
+from . import realtime
+
+logger = logging.getLogger(__name__)
+
+
+def mark_read(user_uuid, notification_ids):
+    """将用户的一批通知标记为已读，返回实际更新条数（已读或不属于该用户的ID忽略）"""
+    notification_ids = list(notification_ids)
+    if not notification_ids:
+        return 0
+    with transaction.atomic():
+        updated = Notification.objects.filter(
+            user_uuid=user_uuid,
+            id__in=notification_ids,
+            read=False
+        ).update(
+            read=True,
+            read_at=timezone.now()
+        )
+        if updated:
+            adjust_unread(user_uuid, -updated)
+            realtime.publish_unread(user_uuid)
+    metrics.inc('notification.read_marks.updated', updated)
+    return updated
+
+
+class ReadMarkBuffer:
+    """按用户合并已读标记的写后缓冲"""
+
+    def __init__(self, name, interval=0.5, max_pending=1000):
+        self.name = name
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending = {}  # {用户UUID: {通知ID}}
+        self._size = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self.counters = {'queued': 0, 'flushed_users': 0, 'updated': 0, 'failures': 0}
+
+    def add(self, user_uuid, notification_ids):
+        key = str(user_uuid)
+        with self._cond:
+            ids = self._pending.setdefault(key, set())
+            before = len(ids)
+            ids.update(int(value) for value in notification_ids)
+            self._size += len(ids) - before
+            self.counters['queued'] += len(ids) - before
+            if self._size >= self.max_pending:
+                self._cond.notify()
+        self._ensure_worker()
+
+    def pending(self, user_uuid):
+        with self._cond:
+            return set(self._pending.get(str(user_uuid), ()))
+
+    def flush_user(self, user_uuid):
+        """同步刷出一个用户的缓冲，返回更新条数"""
+        with self._cond:
+            ids = self._pending.pop(str(user_uuid), None)
+            if ids:
+                self._size -= len(ids)
+        return self._apply(str(user_uuid), ids) if ids else 0
+
+    def flush(self):
+        """刷出所有用户的缓冲，返回更新条数"""
+        with self._cond:
+            pending, self._pending, self._size = self._pending, {}, 0
+        return sum(self._apply(user_uuid, ids) for user_uuid, ids in pending.items())
+
+    def _apply(self, user_uuid, ids):
+        try:
+            updated = mark_read(user_uuid, ids)
+        except Exception as e:
+            self.counters['failures'] += 1
+            logger.error(f"已读标记写入失败 [{self.name}]: user={user_uuid}, {len(ids)} 条: {e}")
+            return 0
+        self.counters['flushed_users'] += 1
+        self.counters['updated'] += updated
+        return updated
+
+    def stats(self):
+        with self._cond:
+            users, size = len(self._pending), self._size
+        return {'name': self.name, 'pending_users': users, 'pending': size, **self.counters}
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name=f"{self.name}-flusher", daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait(self.interval)
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+read_buffer = ReadMarkBuffer(
+    'notification-read-marks',
+    interval=getattr(settings, 'NOTIFICATION_READ_FLUSH_MS', 500) / 1000,
+    max_pending=getattr(settings, 'NOTIFICATION_READ_BUFFER_MAX', 1000)
+)
+metrics.register_collector('notification-read-marks', read_buffer.stats)
+atexit.register(read_buffer.flush)
+
+
+def write_behind_enabled():
+    return getattr(settings, 'NOTIFICATION_READ_WRITE_BEHIND', False)
+
+
+def submit_read(user_uuid, notification_ids):
+    """标记已读：启用写后缓冲时只入缓冲并返回 None，否则立即写入并返回更新条数"""
+    if write_behind_enabled():
+        read_buffer.add(user_uuid, notification_ids)
+        return None
+    return mark_read(user_uuid, notification_ids)
+
+
+def flush_pending_reads(user_uuid):
+    """读取未读数/列表前刷出该用户缓冲中的已读标记"""
+    if write_behind_enabled():
+        read_buffer.flush_user(user_uuid)
@@ -0,0 +1,143 @@
+"""
+通知实时推送
+新通知、广播通知和未读数变化在事务提交后发布到进程内总线（common/pubsub.py），
+由 SSE 流和长轮询接口推送给在线客户端，客户端不再需要定时轮询列表和未读数接口
+
+频道：user:<用户UUID> 个人通知与未读数，broadcast 广播通知
+事件：{'event': 'notification' | 'unread', 'id': 事件游标, 'data': {...}}
+
+个人通知的事件游标为 "<created_at 微秒时间戳>-<通知ID>"（SSE 的 Last-Event-ID、长轮询的 cursor）：
+合并重复通知时原通知的ID不变、created_at 更新为合并时间，按 (created_at, id) 补发才能让
+游标已越过该ID的客户端收到合并后的标题/正文和重新置为未读的状态
+"""
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from common.pubsub import PubSub
+from common.metrics import metrics
+from .models import NOTIFICATION_TYPE_CHOICES
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_CHANNEL = 'broadcast'
+TYPE_NAMES = dict(NOTIFICATION_TYPE_CHOICES)
+
+bus = PubSub(
+    'notification-push',
+    transport=getattr(settings, 'NOTIFICATION_PUSH_TRANSPORT', None),
+    queue_size=getattr(settings, 'NOTIFICATION_PUSH_QUEUE_SIZE', 100)
+)
+
+_slots = threading.BoundedSemaphore(getattr(settings, 'NOTIFICATION_PUSH_MAX_CONNECTIONS', 200))
+_active = {'connections': 0}
+_active_lock = threading.Lock()
+
+
+def _stats():
+    return {**bus.stats(), 'connections': _active['connections']}
+
+
+metrics.register_collector('notification-push', _stats)
+
+
+def user_channel(user_uuid):
+    return f"user:{uuid.UUID(str(user_uuid))}"
+
+
+def acquire_connection():
+    """占用一个推送连接名额（每个 SSE/长轮询连接占用一个工作线程），已满时返回 False"""
+    if not _slots.acquire(blocking=False):
+        metrics.inc('notification.push.rejected')
+        return False
+    with _active_lock:
+        _active['connections'] += 1
+    return True
+
+
+def release_connection():
+    with _active_lock:
+        _active['connections'] -= 1
+    _slots.release()
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def event_cursor(notification):
+    """个人通知的事件游标：created_at 微秒时间戳-通知ID"""
+    delta = notification.created_at - _EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    return f"{micros}-{notification.id}"
+
+
+def parse_cursor(value):
+    """解析事件游标，返回 (created_at, 通知ID)；旧客户端的纯数字通知ID返回 (None, ID)，格式错误返回 None"""
+    if value is None:
+        return None
+    micros, sep, notification_id = str(value).strip().partition('-')
+    try:
+        if not sep:
+            return None, int(micros)
+        return _EPOCH + timedelta(microseconds=int(micros)), int(notification_id)
+    except (ValueError, OverflowError):
+        return None
+
+
+def notification_event(notification, broadcast=False):
+    """推送给客户端的通知数据（不含需要跨服务查询的用户信息）"""
+    data = {
+        'id': notification.id,
+        'notification_uuid': str(notification.notification_uuid),
+        'type': notification.type,
+        'type_display': TYPE_NAMES.get(notification.type),
+        'title': notification.title,
+        'content': notification.content,
+        'read': False,
+        'created_at': notification.created_at.isoformat(),
+        'related_id': notification.related_id,
+        'related_data': notification.related_data,
+    }
+    if broadcast:
+        # 广播不携带事件ID：SSE 的 Last-Event-ID 只用于补发个人通知
+        data['broadcast'] = True
+        return {'event': 'notification', 'data': data}
+    return {'event': 'notification', 'id': event_cursor(notification), 'data': data}
+
+
+def publish_notification(notification):
+    """新个人通知（事务提交后发布）"""
+    channel = user_channel(notification.user_uuid)
+    message = notification_event(notification)
+    transaction.on_commit(lambda: bus.publish(channel, message))
+
+
+def publish_broadcast(broadcast):
+    """新广播通知（事务提交后发布）"""
+    message = notification_event(broadcast, broadcast=True)
+    transaction.on_commit(lambda: bus.publish(BROADCAST_CHANNEL, message))
+
+
+def total_unread(user_uuid):
+    """个人通知未读数 + 广播未读数"""
+    from .counters import get_unread_count
+    from .inbox import BroadcastReadState
+    return get_unread_count(user_uuid) + BroadcastReadState(user_uuid).unread_count()
+
+
+def publish_unread(user_uuid):
+    """未读数变化（事务提交后读取最新值并发布）"""
+    def publish():
+        if not bus.has_listeners(user_channel(user_uuid)):
+            return
+        try:
+            unread = total_unread(user_uuid)
+        except Exception as e:
+            logger.warning(f"读取未读数失败: {e}")
+            return
+        bus.publish(user_channel(user_uuid), {'event': 'unread', 'data': {'unread_count': unread}})
+    transaction.on_commit(publish)
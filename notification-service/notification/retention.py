@@ -0,0 +1,162 @@
+"""
+通知保留策略
+通知表（及归档表）不再无限增长，purge_notifications 命令按以下规则分批删除：
+
+1. 按类型的最长保留天数 NOTIFICATION_RETENTION_DAYS（如促销 30 天），超期的通知无论是否已读都删除，
+   归档表同样适用；未配置或为 0 的类型不按时间删除
+2. 每个用户最多保留 NOTIFICATION_MAX_PER_USER 条在线通知，超出的最旧通知删除；0 表示不限
+
+每批按主键顺序取至多 batch_size 条，在独立的短事务中删除（正文随 CASCADE 删除），并扣减被删未读通知的未读计数，
+批次间可暂停限速，避免长时间持锁和复制延迟
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from common.metrics import metrics
+from .counters import adjust_unread
+from .models import Notification, NotificationArchive, get_notification_type_value
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = 'notification-retention'
+
+
+def retention_rules():
+    """[(类型值, 保留天数)]，忽略无效类型和不限期的类型"""
+    rules = []
+    for type_name, days in (getattr(settings, 'NOTIFICATION_RETENTION_DAYS', None) or {}).items():
+        type_value = get_notification_type_value(type_name)
+        if type_value is None:
+            logger.warning(f"无效的通知保留规则类型: {type_name}")
+            continue
+        if days:
+            rules.append((type_value, int(days)))
+    return rules
+
+
+def max_per_user():
+    return int(getattr(settings, 'NOTIFICATION_MAX_PER_USER', 0) or 0)
+
+
+class NotificationPurger:
+    """按保留规则分批删除通知"""
+
+    def __init__(self, batch_size=None, max_batches=None, pause=None):
+        self.batch_size = batch_size or getattr(settings, 'NOTIFICATION_PURGE_BATCH_SIZE', 500)
+        self.max_batches = max_batches
+        self.pause = getattr(settings, 'NOTIFICATION_PURGE_BATCH_PAUSE', 0.1) if pause is None else pause
+        self.batches = 0
+        self.stats = {'expired': 0, 'over_cap': 0, 'archive_expired': 0}
+
+    def _budget_left(self):
+        return not self.max_batches or self.batches < self.max_batches
+
+    def _delete_batch(self, pks):
+        """删除一批在线通知，同一事务中扣减未读计数"""
+        with transaction.atomic():
+            unread = (
+                Notification.objects.filter(pk__in=pks, read=False)
+                .values('user_uuid').annotate(count=Count('id')).values_list('user_uuid', 'count')
+            )
+            unread = list(unread)
+            deleted = Notification.objects.filter(pk__in=pks).delete()[1].get(Notification._meta.label, 0)
+            for user_uuid, count in unread:
+                adjust_unread(user_uuid, -count)
+        return deleted
+
+    def _drain(self, key, next_pks, delete):
+        """反复取下一批主键并删除，直到没有待删记录或批数用尽"""
+        while self._budget_left():
+            pks = next_pks()
+            if not pks:
+                return
+            deleted = delete(pks)
+            self.batches += 1
+            self.stats[key] += deleted
+            metrics.inc(f'{METRIC_PREFIX}.{key}', deleted)
+            if self.batches % 100 == 0:
+                logger.info(f"通知清理进行中: 批次 {self.batches}, {self.stats}")
+            if len(pks) < self.batch_size:
+                return
+            if self.pause:
+                time.sleep(self.pause)
+
+    def purge_expired(self, now):
+        """按类型保留天数删除在线表和归档表中的超期通知"""
+        for type_value, days in retention_rules():
+            cutoff = now - timedelta(days=days)
+            self._drain(
+                'expired',
+                lambda: list(
+                    Notification.objects.filter(type=type_value, created_at__lt=cutoff)
+                    .order_by('pk').values_list('pk', flat=True)[:self.batch_size]
+                ),
+                self._delete_batch
+            )
+            self._drain(
+                'archive_expired',
+                lambda: list(
+                    NotificationArchive.objects.filter(type=type_value, created_at__lt=cutoff)
+                    .order_by('pk').values_list('pk', flat=True)[:self.batch_size]
+                ),
+                lambda pks: NotificationArchive.objects.filter(pk__in=pks).delete()[0]
+            )
+
+    def users_over_cap(self, limit):
+        """在线通知数超过上限的用户 {user_uuid: 通知数}"""
+        return dict(
+            Notification.objects.values('user_uuid').annotate(count=Count('id'))
+            .filter(count__gt=limit).values_list('user_uuid', 'count')
+        )
+
+    def purge_over_cap(self):
+        """每个用户只保留最新的 NOTIFICATION_MAX_PER_USER 条通知（命中 user_uuid+created_at 索引）"""
+        limit = max_per_user()
+        if not limit:
+            return
+        for user_uuid, count in self.users_over_cap(limit).items():
+            if not self._budget_left():
+                return
+            newest = Notification.objects.filter(user_uuid=user_uuid).order_by('-created_at', '-pk')
+            cutoff = newest.values_list('created_at', 'pk')[limit - 1:limit].first()
+            if cutoff is None:
+                continue
+            # 比第 limit 条更旧的通知（同一时间戳时按主键区分）
+            older = Notification.objects.filter(user_uuid=user_uuid, created_at__lte=cutoff[0]).exclude(
+                created_at=cutoff[0], pk__gte=cutoff[1]
+            )
+            self._drain(
+                'over_cap',
+                lambda: list(older.order_by('pk').values_list('pk', flat=True)[:self.batch_size]),
+                self._delete_batch
+            )
+
+    def backlog(self, now=None):
+        """待删除数量（dry-run），不做修改"""
+        now = now or timezone.now()
+        expired = archive_expired = 0
+        for type_value, days in retention_rules():
+            cutoff = now - timedelta(days=days)
+            expired += Notification.objects.filter(type=type_value, created_at__lt=cutoff).count()
+            archive_expired += NotificationArchive.objects.filter(type=type_value, created_at__lt=cutoff).count()
+        limit = max_per_user()
+        over_cap = sum(count - limit for count in self.users_over_cap(limit).values()) if limit else 0
+        metrics.set_gauge(f'{METRIC_PREFIX}.backlog', expired + archive_expired + over_cap)
+        # 超期与超量可能重叠，over_cap 为上限估计
+        return {'expired': expired, 'over_cap': over_cap, 'archive_expired': archive_expired}
+
+    def run_once(self):
+        """执行一轮清理，返回本轮统计"""
+        started = time.monotonic()
+        self.purge_expired(timezone.now())
+        self.purge_over_cap()
+        duration = round(time.monotonic() - started, 3)
+        metrics.set_gauge(f'{METRIC_PREFIX}.last_run_seconds', duration)
+        metrics.set_gauge(f'{METRIC_PREFIX}.last_run_deleted', sum(self.stats.values()))
+        return {**self.stats, 'batches': self.batches, 'duration': duration}
@@ -1,8 +1,10 @@
 """
 通知服务序列化器
 """
+from collections import Counter
+from django.db import transaction
 from rest_framework import serializers
-from .models import Notification, SecurityPolicy, RiskAssessment, NOTIFICATION_TYPE_CHOICES, get_notification_type_value
+from .models import Notification, NotificationContent, BroadcastNotification, SecurityPolicy, RiskAssessment, NOTIFICATION_TYPE_CHOICES, get_notification_type_value
 import sys
 import os
 
@@ -29,6 +31,9 @@ if PARENT_DIR not in sys.path:
     sys.path.insert(0, PARENT_DIR)
 
 from common.service_client import service_client
+from .coalesce import Coalescer
+from .counters import adjust_unread
+from .users import fetch_user
 
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -45,21 +50,18 @@ class NotificationSerializer(serializers.ModelSerializer):
         ]
 
     def get_user_info(self, obj):
-        """获取用户信息：调用 UserService API /api/v1/user/
+        """获取用户信息：调用 UserService API /api/v1/user/（结果缓存在进程内，见 users.py）
 
-        兼容策略：若失败，返回最小占位信息。
+        上下文 user_info_map 中已有该用户时直接使用；兼容策略：若失败，返回最小占位信息。
         """
         user_uuid = str(obj.user_uuid)
-        try:
-            resp = service_client.get('UserService', f'/api/v1/user/{user_uuid}/')
-            data = (resp or {}).get('data') or None
-            if data:
-                return {
-                    'user_id': data.get('user_id') or data.get('id') or user_uuid,
-                    'username': data.get('username') or data.get('name') or '用户'
-                }
-        except Exception as e:
-            print(f"获取用户信息失败: {e}")
+        user_info_map = self.context.get('user_info_map') or {}
+        data = user_info_map[user_uuid] if user_uuid in user_info_map else fetch_user(user_uuid)
+        if data:
+            return {
+                'user_id': data.get('user_id') or data.get('id') or user_uuid,
+                'username': data.get('username') or data.get('name') or '用户'
+            }
 
         # 兜底占位（避免前端空指针）
         return {
@@ -69,15 +71,44 @@ class NotificationSerializer(serializers.ModelSerializer):
 
 
 class CreateNotificationSerializer(serializers.ModelSerializer):
-    """创建通知序列化器"""
+    """创建通知序列化器
+
+    正文和附加数据写入 NotificationContent，与通知主表在同一事务中创建
+    """
+    type = serializers.CharField()  # 接受 transaction/system/promotion 或数字，由 validate_type 转换
+    content = serializers.CharField()
+    related_data = serializers.JSONField(required=False, allow_null=True)
+    digest = serializers.CharField(required=False, allow_blank=True, max_length=50, write_only=True)  # 摘要分组，见 digest.py
 
     class Meta:
         model = Notification
         fields = [
             'user_uuid', 'type', 'title', 'content',
-            'related_id', 'related_data'
+            'related_id', 'related_data', 'digest'
         ]
 
+    def create(self, validated_data):
+        with transaction.atomic():
+            # 时间窗口内的重复通知合并到已有通知或丢弃（见 coalesce.py），返回的通知带 coalesced 标记
+            notification, action = Coalescer().apply(validated_data)
+            if notification is not None:
+                notification.coalesced = action
+                return notification
+            validated_data.pop('digest', None)
+            content = validated_data.pop('content')
+            related_data = validated_data.pop('related_data', None)
+            if related_data is None:
+                related_data = {}
+            notification = Notification.objects.create(**validated_data)
+            NotificationContent.objects.create(
+                notification=notification,
+                content=content,
+                related_data=related_data
+            )
+            if not notification.read:
+                adjust_unread(notification.user_uuid, 1)
+        return notification
+
     def validate_type(self, value):
         """验证并转换通知类型"""
         converted_type = get_notification_type_value(value)
@@ -86,6 +117,86 @@ class CreateNotificationSerializer(serializers.ModelSerializer):
         return converted_type
 
 
+def create_notifications(items):
+    """批量创建通知（items 为 CreateNotificationSerializer 校验后的数据），返回与 items 一一对应的 (通知, 合并动作)
+
+    时间窗口内的重复通知（包括同一批中的）先合并或丢弃（见 coalesce.py），对应位置返回被合并的通知和 merge/drop；
+    其余通知主表与正文表各一次 bulk_create；通知UUID在应用侧生成，插入后按UUID取回自增ID（MySQL 批量插入不返回ID）
+    """
+    if not items:
+        return []
+    results = []
+    pending = []  # [(通知, 数据)]
+    with transaction.atomic():
+        coalescer = Coalescer()
+        for item in items:
+            notification, action = coalescer.apply(item)
+            if notification is None:
+                notification = Notification(
+                    **{key: value for key, value in item.items() if key not in ('content', 'related_data', 'digest')}
+                )
+                pending.append((notification, item))
+                coalescer.remember(item, notification)
+            results.append((notification, action))
+        if not pending:
+            return results
+
+        notifications = [notification for notification, _ in pending]
+        Notification.objects.bulk_create(notifications)
+        ids = dict(
+            Notification.objects.filter(
+                notification_uuid__in=[notification.notification_uuid for notification in notifications]
+            ).values_list('notification_uuid', 'id')
+        )
+        for notification in notifications:
+            notification.id = ids[notification.notification_uuid]
+        NotificationContent.objects.bulk_create([
+            NotificationContent(
+                notification_id=notification.id,
+                content=item['content'],
+                related_data=item.get('related_data') or {}
+            )
+            for notification, item in pending
+        ])
+        unread = Counter(notification.user_uuid for notification in notifications if not notification.read)
+        for user_uuid, count in unread.items():
+            adjust_unread(user_uuid, count)
+    return results
+
+
+class BroadcastNotificationSerializer(NotificationSerializer):
+    """广播通知序列化器 - 与个人通知格式一致，user_uuid/read/read_at 为当前用户视角（见 BroadcastReadState.annotate）"""
+    user_uuid = serializers.UUIDField(read_only=True)
+    read = serializers.BooleanField(read_only=True)
+    read_at = serializers.DateTimeField(read_only=True)
+    broadcast = serializers.SerializerMethodField(read_only=True)
+
+    class Meta:
+        model = BroadcastNotification
+        fields = NotificationSerializer.Meta.fields + ['broadcast']
+
+    def get_broadcast(self, obj):
+        return True
+
+
+class CreateBroadcastNotificationSerializer(serializers.ModelSerializer):
+    """创建广播通知序列化器 - 仅支持系统通知和促销通知"""
+    type = serializers.CharField()  # 接受 system/promotion 或数字，由 validate_type 转换
+
+    class Meta:
+        model = BroadcastNotification
+        fields = ['type', 'title', 'content', 'related_id', 'related_data', 'expires_at']
+
+    def validate_type(self, value):
+        converted_type = get_notification_type_value(value)
+        if converted_type not in (1, 2):
+            raise serializers.ValidationError(f"无效的广播通知类型: {value}. 支持的类型: system, promotion 或 1, 2")
+        return converted_type
+
+    def validate_related_data(self, value):
+        return value if value is not None else {}
+
+
 class SecurityPolicySerializer(serializers.ModelSerializer):
     """安全策略序列化器"""
 
@@ -0,0 +1,42 @@
+"""
+通知服务后台任务
+1. 通知归档：已读且超过保留期的通知分批移入归档表，收件箱表只保留近期通知
+"""
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from .models import Notification, NotificationArchive
+
+from common.archive import Archiver, copy_to
+
+logger = logging.getLogger(__name__)
+
+
+def _archivable_notification_filter(now):
+    """可归档通知：已读且创建时间早于保留期（命中 read+created_at 索引）"""
+    retention = timedelta(days=getattr(settings, 'NOTIFICATION_ARCHIVE_AFTER_DAYS', 90))
+    return Q(read=True, created_at__lt=now - retention)
+
+
+def _notification_archive_rows(notifications, now):
+    """正文内联到归档记录；正文表随通知级联删除"""
+    for notification in notifications:
+        yield copy_to(
+            NotificationArchive,
+            notification,
+            content=notification.content,
+            related_data=notification.related_data,
+            archived_at=now
+        )
+
+
+notification_archiver = Archiver(
+    'notification-archive',
+    Notification,
+    eligible=_archivable_notification_filter,
+    to_archive=_notification_archive_rows,
+    select_related=('payload',),
+    batch_size=getattr(settings, 'NOTIFICATION_ARCHIVE_BATCH_SIZE', 1000),
+    pause=getattr(settings, 'NOTIFICATION_ARCHIVE_BATCH_PAUSE', 0.2)
+)
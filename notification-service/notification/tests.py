@@ -0,0 +1,368 @@
+"""
+通知服务测试
+1. 实时推送补发：合并更新的通知按 (created_at, id) 游标补发
+2. 批量创建的用户校验：不信任调用方时一批用户去重后各查询一次，不存在的用户对应条目失败
+3. 收件箱：个人通知与广播按 (created_at, id) 倒序归并，深分页与逐页读取一致；并发全部已读不回退水位
+4. 通知合并/去重与未读计数；写后缓冲的已读标记在读取未读数、列表前刷出
+"""
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from common.service_client import service_client
+from notification import inbox as inbox_module
+from notification import read_marks, realtime
+from notification.counters import get_unread_count
+from notification.inbox import BroadcastReadState, Inbox, mark_all_broadcasts_read, mark_broadcast_read
+from notification.models import BroadcastNotification, BroadcastReadMark, BroadcastReceipt, Notification
+from notification.serializers import create_notifications
+from notification.users import user_cache
+
+MERGE_TRANSACTIONS = {'transaction': {'window': 300, 'action': 'merge'}}
+
+
+def notification_data(user_uuid, title, related_id=None, type=0):
+    return {
+        'user_uuid': user_uuid,
+        'type': type,
+        'title': title,
+        'content': f'{title} 正文',
+        'related_id': related_id,
+        'related_data': {},
+    }
+
+
+@override_settings(NOTIFICATION_COALESCE_RULES=MERGE_TRANSACTIONS)
+class NotificationReplayTests(TestCase):
+    """长轮询/SSE 重连补发"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user_uuid = uuid.uuid4()
+
+    def _poll(self, since):
+        response = self.client.get(
+            '/api/notifications/poll/', {'since': since, 'timeout': 0}, HTTP_UUID=str(self.user_uuid)
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_merged_notification_is_replayed_after_cursor(self):
+        (merged, _), = create_notifications([notification_data(self.user_uuid, '订单已发货', related_id='1001')])
+        (latest, _), = create_notifications([notification_data(self.user_uuid, '系统通知', type=1)])
+        cursor = realtime.event_cursor(latest)
+        self.assertEqual(self._poll(cursor)['notifications'], [])
+
+        # 合并保留原通知ID（小于游标中的ID），但 created_at 更新为合并时间
+        (notification, action), = create_notifications([notification_data(self.user_uuid, '订单已签收', related_id='1001')])
+        self.assertEqual((notification.id, action), (merged.id, 'merge'))
+        self.assertLess(merged.id, latest.id)
+
+        data = self._poll(cursor)
+        self.assertEqual([(item['id'], item['title'], item['read']) for item in data['notifications']],
+                         [(merged.id, '订单已签收', False)])
+        self.assertEqual(realtime.parse_cursor(data['cursor'])[1], merged.id)
+        self.assertEqual(self._poll(data['cursor'])['notifications'], [])
+
+    def test_legacy_numeric_cursor(self):
+        (first, _), = create_notifications([notification_data(self.user_uuid, 'a')])
+        (second, _), = create_notifications([notification_data(self.user_uuid, 'b')])
+        data = self._poll(str(first.id))
+        self.assertEqual([item['id'] for item in data['notifications']], [second.id])
+        self.assertEqual(realtime.parse_cursor(data['cursor']), (second.created_at, second.id))
+
+
+@override_settings(NOTIFICATION_TRUST_INTERNAL_CALLERS=False, NOTIFICATION_COALESCE_RULES={})
+class NotificationBulkCreateUserCheckTests(TestCase):
+    """NotificationBulkCreateAPIView 的用户校验"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user_uuid = uuid.uuid4()
+        self.missing_uuid = uuid.uuid4()
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+
+    def _fake_get(self, service, path, *args, **kwargs):
+        if str(self.user_uuid) in path:
+            return {'success': True, 'data': {'id': str(self.user_uuid), 'username': 'buyer'}}
+        return None
+
+    def _bulk(self, notifications):
+        response = self.client.post('/api/internal/notifications/bulk-create/', {'notifications': notifications}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['data']
+
+    def test_unknown_users_fail_and_users_are_fetched_once(self):
+        items = [
+            notification_data(str(self.user_uuid), 'a'),
+            notification_data(str(self.missing_uuid), 'b'),
+            notification_data(str(self.user_uuid), 'c'),
+        ]
+        with mock.patch.object(service_client, 'get', side_effect=self._fake_get) as get:
+            data = self._bulk(items)
+        self.assertEqual(get.call_count, 2)
+        self.assertEqual([item['success'] for item in data['results']], [True, False, True])
+        self.assertIn('user_uuid', data['results'][1]['errors'])
+        self.assertEqual(Notification.objects.filter(user_uuid=self.user_uuid).count(), 2)
+        self.assertFalse(Notification.objects.filter(user_uuid=self.missing_uuid).exists())
+
+    @override_settings(NOTIFICATION_TRUST_INTERNAL_CALLERS=True)
+    def test_trusted_callers_skip_user_service(self):
+        with mock.patch.object(service_client, 'get') as get:
+            data = self._bulk([notification_data(str(self.missing_uuid), 'a')])
+        get.assert_not_called()
+        self.assertTrue(data['results'][0]['success'])
+
+
+def create_broadcast(title, created_at=None):
+    broadcast = BroadcastNotification.objects.create(type=1, title=title, content=f'{title} 正文')
+    if created_at is not None:
+        BroadcastNotification.objects.filter(pk=broadcast.pk).update(created_at=created_at)
+    return broadcast
+
+
+class InboxTests(TestCase):
+    """Inbox 归并分页"""
+
+    def setUp(self):
+        self.user_uuid = uuid.uuid4()
+        base = timezone.now() - timedelta(hours=1)
+        # 个人通知每分钟一条，第 3、4 条 created_at 相同（按ID倒序）；广播穿插在个人通知之间
+        personal = [notification for notification, _ in create_notifications(
+            [notification_data(self.user_uuid, f'个人{i}', type=1) for i in range(8)]
+        )]
+        for i, notification in enumerate(personal):
+            minute = 3 if i == 4 else i
+            Notification.objects.filter(pk=notification.pk).update(created_at=base + timedelta(minutes=minute))
+        for i in range(5):
+            create_broadcast(f'广播{i}', base + timedelta(minutes=i * 2, seconds=30))
+        # 另一用户的通知不出现在收件箱中
+        create_notifications([notification_data(uuid.uuid4(), '他人', type=1)])
+
+        self.expected = sorted(
+            [(created_at, pk, 'personal') for pk, created_at in
+             Notification.objects.filter(user_uuid=self.user_uuid).values_list('id', 'created_at')] +
+            [(created_at, pk, 'broadcast') for pk, created_at in
+             BroadcastNotification.objects.values_list('id', 'created_at')],
+            key=lambda key: key[:2],
+            reverse=True
+        )
+
+    def _inbox(self):
+        read_state = BroadcastReadState(self.user_uuid)
+        personal = Notification.objects.filter(user_uuid=self.user_uuid).select_related('payload')
+        return Inbox(personal, BroadcastNotification.objects.all(), read_state)
+
+    @staticmethod
+    def _keys(items):
+        return [
+            (item.created_at, item.pk, 'broadcast' if isinstance(item, BroadcastNotification) else 'personal')
+            for item in items
+        ]
+
+    def test_merged_order(self):
+        inbox = self._inbox()
+        self.assertEqual(len(inbox), 13)
+        self.assertEqual(self._keys(inbox[0:13]), self.expected)
+        self.assertEqual(self._keys([inbox[5]]), self.expected[5:6])
+
+    def test_deep_page_matches_sequential_pages(self):
+        inbox = self._inbox()
+        pages = []
+        for start in range(0, 13, 4):
+            pages.extend(self._keys(inbox[start:start + 4]))
+        self.assertEqual(pages, self.expected)
+
+        # 深分页：两条排序键查询 + 本页个人通知（含正文）、广播各一次主键查询
+        with self.assertNumQueries(4):
+            page = inbox[8:12]
+            self.assertTrue(all(item.content for item in page))
+        self.assertEqual(self._keys(page), self.expected[8:12])
+        self.assertEqual(inbox[20:24], [])
+
+    def test_broadcast_read_state_is_annotated(self):
+        broadcast = BroadcastNotification.objects.order_by('id').first()
+        mark_broadcast_read(self.user_uuid, broadcast.id)
+        items = self._inbox()[0:13]
+        read = {item.pk: item.read for item in items if isinstance(item, BroadcastNotification)}
+        self.assertEqual(read, {pk: pk == broadcast.id for pk in read})
+
+
+class MarkAllBroadcastsReadTests(TestCase):
+    """mark_all_broadcasts_read 与并发请求"""
+
+    def setUp(self):
+        self.user_uuid = uuid.uuid4()
+        self.broadcasts = [create_broadcast(f'广播{i}') for i in range(3)]
+
+    def _interleave(self, concurrent):
+        """在第一个请求读出最新广播ID之后、推进水位之前执行另一个请求，模拟两个请求交错
+
+        该请求第一次取当前时间在 active_broadcasts() 中，第二次在推进水位的 UPDATE 中
+        """
+        now = timezone.now
+        calls = []
+
+        def fake_now():
+            calls.append(None)
+            if len(calls) == 2:
+                concurrent()
+            return now()
+
+        return mock.patch.object(inbox_module.timezone, 'now', side_effect=fake_now)
+
+    def _watermark(self):
+        return BroadcastReadMark.objects.get(user_uuid=self.user_uuid).last_read_id
+
+    def test_concurrent_first_marks_create_one_row(self):
+        mark_broadcast_read(self.user_uuid, self.broadcasts[1].id)
+        results = []
+        with self._interleave(lambda: results.append(mark_all_broadcasts_read(self.user_uuid))):
+            results.append(mark_all_broadcasts_read(self.user_uuid))
+        self.assertEqual(BroadcastReadMark.objects.filter(user_uuid=self.user_uuid).count(), 1)
+        self.assertEqual(self._watermark(), self.broadcasts[-1].id)
+        self.assertFalse(BroadcastReceipt.objects.filter(user_uuid=self.user_uuid).exists())
+        self.assertEqual(BroadcastReadState(self.user_uuid).unread_count(), 0)
+
+    def test_stale_request_does_not_move_watermark_back(self):
+        def newer_request():
+            self.broadcasts.append(create_broadcast('新广播'))
+            mark_all_broadcasts_read(self.user_uuid)
+
+        with self._interleave(newer_request):
+            # 该请求读到的最新广播是第 3 条
+            self.assertEqual(mark_all_broadcasts_read(self.user_uuid), 3)
+        self.assertEqual(self._watermark(), self.broadcasts[-1].id)
+        self.assertEqual(BroadcastReadState(self.user_uuid).unread_count(), 0)
+
+        create_broadcast('更新的广播')
+        self.assertEqual(mark_all_broadcasts_read(self.user_uuid), 1)
+        self.assertEqual(mark_all_broadcasts_read(self.user_uuid), 0)
+
+
+class CoalescerTests(TestCase):
+    """通知合并/去重与未读计数"""
+
+    def setUp(self):
+        self.user_uuid = uuid.uuid4()
+
+    def _create(self, *titles, related_id='1001'):
+        return create_notifications([notification_data(self.user_uuid, title, related_id=related_id) for title in titles])
+
+    def _assert_unread(self, expected):
+        self.assertEqual(get_unread_count(self.user_uuid), expected)
+        self.assertEqual(Notification.objects.filter(user_uuid=self.user_uuid, read=False).count(), expected)
+
+    @override_settings(NOTIFICATION_COALESCE_RULES=MERGE_TRANSACTIONS)
+    def test_merge_into_read_notification_restores_unread(self):
+        (notification, _), = self._create('订单已支付')
+        self._assert_unread(1)
+        read_marks.mark_read(self.user_uuid, [notification.id])
+        self._assert_unread(0)
+
+        (merged, action), = self._create('订单已发货')
+        self.assertEqual((merged.id, action), (notification.id, 'merge'))
+        merged = Notification.objects.select_related('payload').get(pk=notification.id)
+        self.assertEqual((merged.title, merged.read, merged.read_at), ('订单已发货', False, None))
+        self.assertEqual(merged.content, '订单已发货 正文')
+        self.assertEqual(merged.related_data['merged_count'], 2)
+        self._assert_unread(1)
+
+        # 未读通知再次合并不重复计数
+        self._create('订单已签收')
+        self._assert_unread(1)
+        self.assertEqual(Notification.objects.get(pk=notification.id).related_data['merged_count'], 3)
+
+    @override_settings(NOTIFICATION_COALESCE_RULES=MERGE_TRANSACTIONS)
+    def test_merge_within_batch(self):
+        results = self._create('订单已支付', '订单已发货')
+        self.assertEqual([action for _, action in results], [None, 'merge'])
+        notification = Notification.objects.get(user_uuid=self.user_uuid)
+        self.assertEqual(notification.title, '订单已发货')
+        self.assertEqual(notification.related_data['merged_count'], 2)
+        self._assert_unread(1)
+
+    @override_settings(NOTIFICATION_COALESCE_RULES={'transaction': {'window': 300, 'action': 'drop'}})
+    def test_drop_keeps_existing(self):
+        (notification, _), = self._create('订单已支付')
+        (dropped, action), = self._create('订单已发货')
+        self.assertEqual((dropped.id, action), (notification.id, 'drop'))
+        self.assertEqual(Notification.objects.get(user_uuid=self.user_uuid).title, '订单已支付')
+        self._assert_unread(1)
+
+    @override_settings(NOTIFICATION_COALESCE_RULES=MERGE_TRANSACTIONS)
+    def test_outside_window_or_other_key_inserts(self):
+        (notification, _), = self._create('订单已支付')
+        Notification.objects.filter(pk=notification.pk).update(created_at=timezone.now() - timedelta(seconds=301))
+        self._create('订单已发货')
+        self._create('另一订单', related_id='1002')
+        self._create('无关联', related_id=None)
+        self.assertEqual(Notification.objects.filter(user_uuid=self.user_uuid).count(), 4)
+        self._assert_unread(4)
+
+
+@override_settings(NOTIFICATION_READ_WRITE_BEHIND=True)
+class ReadMarkBufferTests(TestCase):
+    """写后缓冲的已读标记"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user_uuid = uuid.uuid4()
+        self.notifications = [
+            notification for notification, _ in
+            create_notifications([notification_data(self.user_uuid, f'通知{i}', type=1) for i in range(3)])
+        ]
+        # 不启动后台刷出线程，只验证读取前的同步刷出
+        self.buffer = read_marks.ReadMarkBuffer('test-read-marks', interval=3600)
+        patcher = mock.patch.object(read_marks, 'read_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(self.buffer, '_ensure_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get(self, path):
+        response = self.client.get(path, HTTP_UUID=str(self.user_uuid))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def _read(self, notification_ids):
+        response = self.client.post(
+            '/api/notifications/read/', {'ids': notification_ids}, format='json', HTTP_UUID=str(self.user_uuid)
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_unread_count_flushes_user_buffer(self):
+        ids = [notification.id for notification in self.notifications[:2]]
+        self.assertEqual(self._read(ids + ids[:1])['data'], {'queued': 2})
+        self.assertEqual(self.buffer.pending(self.user_uuid), set(ids))
+        self.assertEqual(Notification.objects.filter(user_uuid=self.user_uuid, read=False).count(), 3)
+
+        self.assertEqual(self._get('/api/notifications/unread-count/')['unread_count'], 1)
+        self.assertEqual(self.buffer.pending(self.user_uuid), set())
+        self.assertEqual(get_unread_count(self.user_uuid), 1)
+
+    def test_list_flushes_user_buffer(self):
+        other_uuid = uuid.uuid4()
+        (other, _), = create_notifications([notification_data(other_uuid, '他人', type=1)])
+        self.buffer.add(other_uuid, [other.id])
+        self._read([self.notifications[0].id])
+
+        with mock.patch.object(service_client, 'get', return_value=None):
+            data = self._get('/api/notifications/')
+        read = {item['id']: item['read'] for item in data['results']}
+        self.assertEqual(read, {notification.id: notification is self.notifications[0] for notification in self.notifications})
+        # 只刷出当前用户，其他用户的标记留在缓冲中
+        self.assertEqual(self.buffer.pending(other_uuid), {other.id})
+        self.assertFalse(Notification.objects.get(pk=other.id).read)
+
+    def test_marks_for_other_users_are_ignored(self):
+        self.buffer.add(uuid.uuid4(), [self.notifications[0].id])
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self._get('/api/notifications/unread-count/')['unread_count'], 3)
@@ -9,8 +9,12 @@ notification_urlpatterns = [
     path('', views.NotificationListAPIView.as_view(), name='notification-list'),  # GET /api/notifications/
     path('<int:notification_id>/', views.NotificationDetailAPIView.as_view(), name='notification-detail'),  # GET/DELETE /api/notifications/{notification_id}/
     path('<int:notification_id>/read/', views.NotificationMarkReadAPIView.as_view(), name='notification-mark-read'),  # PUT /api/notifications/{notification_id}/read/
+    path('read/', views.NotificationBatchMarkReadAPIView.as_view(), name='notification-batch-read'),  # POST /api/notifications/read/ {"ids": [...]}
     path('read-all/', views.NotificationMarkAllReadAPIView.as_view(), name='notification-read-all'),  # PUT /api/notifications/read-all/
     path('unread-count/', views.NotificationUnreadCountAPIView.as_view(), name='notification-unread-count'),  # GET /api/notifications/unread-count/
+    path('stream/', views.NotificationStreamAPIView.as_view(), name='notification-stream'),  # GET /api/notifications/stream/ (SSE)
+    path('poll/', views.NotificationPollAPIView.as_view(), name='notification-poll'),  # GET /api/notifications/poll/?since=&timeout=
+    path('broadcasts/<int:broadcast_id>/read/', views.BroadcastMarkReadAPIView.as_view(), name='notification-broadcast-mark-read'),  # POST /api/notifications/broadcasts/{broadcast_id}/read/
 ]
 
 
@@ -20,4 +24,6 @@ urlpatterns = [
 
     # 内部微服务通信接口
     path('internal/notifications/create/', views.NotificationCreateAPIView.as_view(), name='notification-create-internal'),
+    path('internal/notifications/bulk-create/', views.NotificationBulkCreateAPIView.as_view(), name='notification-bulk-create-internal'),
+    path('internal/notifications/broadcast/', views.BroadcastNotificationCreateAPIView.as_view(), name='notification-broadcast-internal'),
 ]
@@ -0,0 +1,71 @@
+"""
+用户信息查询
+通知写入前的用户校验和列表中的用户信息都来自 UserService /api/v1/user/<uuid>/，
+查询结果缓存在进程内（common/ttl_cache.py）：存在的用户缓存较长时间，不存在的用户短时间负缓存
+"""
+import logging
+import uuid
+
+from django.conf import settings
+
+from common.metrics import metrics
+from common.service_client import service_client
+from common.ttl_cache import MISSING, TTLCache
+
+logger = logging.getLogger(__name__)
+
+user_cache = TTLCache(
+    'notification-user-cache',
+    maxsize=getattr(settings, 'NOTIFICATION_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'NOTIFICATION_USER_CACHE_TTL', 600)
+)
+metrics.register_collector('notification-user-cache', user_cache.stats)
+
+
+def _key(user_uuid):
+    return str(uuid.UUID(str(user_uuid)))
+
+
+def fetch_user(user_uuid):
+    """用户数据 dict，用户不存在或 UserService 不可用时返回 None"""
+    key = _key(user_uuid)
+    cached = user_cache.get(key)
+    if cached is not MISSING:
+        return cached
+    try:
+        resp = service_client.get('UserService', f'/api/v1/user/{key}/')
+    except Exception as e:
+        logger.warning(f"查询用户失败: {e}")
+        resp = None
+    if resp:
+        data = resp.get('data') or {}
+        user_cache.set(key, data)
+        return data
+    # service_client 对 4xx 和不可用都返回 None，负缓存时间较短，避免 UserService 故障恢复后仍长期拒绝
+    user_cache.set(key, None, ttl=getattr(settings, 'NOTIFICATION_USER_NEGATIVE_TTL', 30))
+    return None
+
+
+def fetch_users(user_uuids):
+    """一页通知涉及的用户信息 {user_uuid: 用户数据或 None}，去重后每个用户查询一次（优先读缓存）"""
+    return {key: fetch_user(key) for key in dict.fromkeys(_key(value) for value in user_uuids)}
+
+
+def user_exists(user_uuid):
+    """创建通知前校验用户；NOTIFICATION_TRUST_INTERNAL_CALLERS 为 True 时信任调用方传入的用户UUID"""
+    if getattr(settings, 'NOTIFICATION_TRUST_INTERNAL_CALLERS', False):
+        metrics.inc('notification.user_check.trusted')
+        return True
+    return fetch_user(user_uuid) is not None
+
+
+def existing_users(user_uuids):
+    """批量校验用户，返回存在的用户UUID集合（规范化字符串）；去重后每个用户查询一次（优先读缓存）
+
+    NOTIFICATION_TRUST_INTERNAL_CALLERS 为 True 时信任调用方，全部视为存在
+    """
+    keys = list(dict.fromkeys(_key(value) for value in user_uuids))
+    if getattr(settings, 'NOTIFICATION_TRUST_INTERNAL_CALLERS', False):
+        metrics.inc('notification.user_check.trusted', len(keys))
+        return set(keys)
+    return {key for key, data in fetch_users(keys).items() if data is not None}
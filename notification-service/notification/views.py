@@ -2,16 +2,30 @@
 通知服务视图 - 微服务版本
 使用Spring Cloud Gateway解析的用户UUID，避免调用UserService
 """
+import json
+import time
 import uuid
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.generics import ListAPIView, GenericAPIView, UpdateAPIView, CreateAPIView
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from django.shortcuts import get_object_or_404
+from django.http import StreamingHttpResponse
+from django.conf import settings
 from django.utils import timezone
+from django.db import transaction, connections
 from django.db.models import Q
-from .models import Notification, SecurityPolicy, RiskAssessment, get_notification_type_value
+from .models import (
+    Notification, NotificationArchive, BroadcastNotification, SecurityPolicy, RiskAssessment, get_notification_type_value
+)
+from .inbox import BroadcastReadState, Inbox, active_broadcasts, mark_broadcast_read, mark_all_broadcasts_read
+from .counters import adjust_unread, get_unread_count
+from .users import existing_users, fetch_users, user_exists
+from .digest import digest_key, digest_types, stage
+from .read_marks import flush_pending_reads, submit_read
+from . import realtime
 
 # 添加公共模块路径 - 必须在导入 serializers 之前
 import sys
@@ -40,10 +54,12 @@ if PARENT_DIR not in sys.path:
 # 现在可以安全地导入依赖 common 模块的 serializers
 from .serializers import (
     NotificationSerializer, SecurityPolicySerializer,
-    RiskAssessmentSerializer, CreateNotificationSerializer
+    RiskAssessmentSerializer, CreateNotificationSerializer,
+    BroadcastNotificationSerializer, CreateBroadcastNotificationSerializer, create_notifications
 )
 from common.service_client import service_client
 from common.microservice_base import MicroserviceBaseView
+from common.db_router import replica_reads
 import logging
 
 logger = logging.getLogger(__name__)
@@ -57,7 +73,7 @@ class StandardPagination(PageNumberPagination):
 
 
 class NotificationListAPIView(ListAPIView, MicroserviceBaseView):
-    """通知列表
+    """通知列表 - 个人通知与广播通知按创建时间合并分页
 
     微服务通信点：验证用户身份，获取用户相关通知
     """
@@ -91,7 +107,44 @@ class NotificationListAPIView(ListAPIView, MicroserviceBaseView):
         elif read_status == 'false':
             queryset = queryset.filter(read=False)
 
-        return queryset.order_by('-created_at')
+        # 正文只为当前页的通知关联读取
+        return queryset.select_related('payload').order_by('-created_at')
+
+    def get_broadcast_queryset(self, read_state):
+        """与个人通知相同的类型/已读筛选条件下的广播通知"""
+        query_params = getattr(self.request, 'query_params', self.request.GET)
+        queryset = active_broadcasts()
+        notification_type = query_params.get('type')
+        if notification_type:
+            type_value = get_notification_type_value(notification_type)
+            if type_value is None:
+                return BroadcastNotification.objects.none()
+            queryset = queryset.filter(type=type_value)
+
+        read_status = query_params.get('read')
+        if read_status in ('true', 'false'):
+            queryset = read_state.filter(queryset, read=read_status == 'true')
+        return queryset
+
+    @replica_reads
+    def list(self, request, *args, **kwargs):
+        user_uuid = self.get_user_uuid_from_request()
+        if not user_uuid:
+            return super().list(request, *args, **kwargs)
+
+        flush_pending_reads(user_uuid)
+        read_state = BroadcastReadState(user_uuid)
+        inbox = Inbox(self.get_queryset(), self.get_broadcast_queryset(read_state), read_state)
+        page = self.paginate_queryset(inbox)
+        # 用户信息按页去重查询一次，通过上下文共享给每条通知的序列化
+        context = {**self.get_serializer_context(), 'user_info_map': fetch_users(item.user_uuid for item in page)}
+        data = [
+            (BroadcastNotificationSerializer if isinstance(item, BroadcastNotification) else NotificationSerializer)(
+                item, context=context
+            ).data
+            for item in page
+        ]
+        return self.get_paginated_response(data)
 
 
 class NotificationCreateAPIView(CreateAPIView):
@@ -107,33 +160,133 @@ class NotificationCreateAPIView(CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        # 验证用户UUID是否有效（可选）
-        user_uuid = serializer.validated_data.get('user_uuid')
-        try:
-            user_data = service_client.get('UserService', f'/api/v1/user/{user_uuid}/')
-            if not user_data:
-                return Response({'error': '用户不存在'}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception:
-            # 外部服务不可用时，降级为跳过校验
-            pass
+        # 验证用户UUID是否有效（结果缓存在进程内，见 users.py）
+        if not user_exists(serializer.validated_data.get('user_uuid')):
+            return Response({'error': '用户不存在'}, status=status.HTTP_400_BAD_REQUEST)
 
-        notification = serializer.save()
+        # 摘要模式：写入暂存表，由 flush_notification_digests 定期汇总为一条通知
+        key = digest_key(serializer.validated_data)
+        if key is not None:
+            stage([(serializer.validated_data, key)])
+            return Response({
+                'code': '200',
+                'message': '通知已加入摘要',
+                'data': {'digest': key}
+            }, status=status.HTTP_202_ACCEPTED)
 
-        # TODO: 如果启用实时推送，可在此处调用推送服务
-        # self._send_real_time_notification(notification)
+        notification = serializer.save()
+        coalesced = getattr(notification, 'coalesced', None)
+        if coalesced != 'drop':
+            self._send_real_time_notification(notification)
 
         response_serializer = NotificationSerializer(notification)
         return Response({
             'code': '200',
-            'message': '通知创建成功',
+            'message': {'merge': '通知已合并', 'drop': '重复通知已忽略'}.get(coalesced, '通知创建成功'),
             'data': response_serializer.data
         }, status=status.HTTP_201_CREATED)
 
     def _send_real_time_notification(self, notification):
-        """发送实时通知（WebSocket、推送等）"""
-        # TODO: 实现实时通知推送逻辑
-        logger.info(f"发送实时通知: {notification.title} to {notification.user_uuid}")
-        pass
+        """推送给在线客户端（SSE/长轮询），事务提交后发布"""
+        realtime.publish_notification(notification)
+        realtime.publish_unread(notification.user_uuid)
+
+
+class NotificationBulkCreateAPIView(GenericAPIView):
+    """批量创建通知（供其他微服务调用）POST /api/internal/notifications/bulk-create/
+
+    请求 {"notifications": [...]}，每项格式与单条创建接口相同；逐条校验，合法的一次性批量写入。
+    只要请求格式正确就返回 200，逐条结果 results 与请求顺序一致：{index, success, id, coalesced | digest | errors}，
+    coalesced 为 merge/drop 时 id 是被合并的已有通知；进入摘要的通知 id 为 None
+    与单条创建接口相同按 NOTIFICATION_TRUST_INTERNAL_CALLERS 校验用户：一批中的用户去重后各查询一次（优先读缓存），
+    不存在的用户对应条目失败
+    """
+    # permission_classes = [AllowAny]  # 内部微服务调用，暂不需要用户认证
+
+    def post(self, request):
+        items = request.data.get('notifications') if isinstance(request.data, dict) else None
+        max_items = getattr(settings, 'NOTIFICATION_BULK_MAX', 500)
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'notifications 必须为非空列表'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > max_items:
+            return Response({'error': f'单次最多创建 {max_items} 条通知'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(items)
+        checked = []
+        for index, item in enumerate(items):
+            serializer = CreateNotificationSerializer(data=item)
+            if not serializer.is_valid():
+                results[index] = {'index': index, 'success': False, 'errors': serializer.errors}
+                continue
+            checked.append((index, serializer.validated_data))
+
+        users = existing_users(data['user_uuid'] for _, data in checked)
+        valid = []
+        staged = []
+        types = digest_types()
+        for index, data in checked:
+            if str(data['user_uuid']) not in users:
+                results[index] = {'index': index, 'success': False, 'errors': {'user_uuid': ['用户不存在']}}
+                continue
+            key = digest_key(data, types)
+            if key is not None:
+                staged.append((data, key))
+                results[index] = {'index': index, 'success': True, 'id': None, 'digest': key}
+            else:
+                valid.append((index, data))
+        if staged:
+            stage(staged)
+
+        created = create_notifications([data for _, data in valid])
+        changed = {}  # 新建或被合并的通知，同一条只推送一次
+        for (index, _), (notification, action) in zip(valid, created):
+            results[index] = {
+                'index': index,
+                'success': True,
+                'id': notification.id,
+                'notification_uuid': str(notification.notification_uuid),
+                'coalesced': action
+            }
+            if action != 'drop':
+                changed[notification.id] = notification
+        for notification in changed.values():
+            realtime.publish_notification(notification)
+        for user_uuid in {notification.user_uuid for notification in changed.values()}:
+            realtime.publish_unread(user_uuid)
+
+        coalesced = sum(1 for _, action in created if action)
+        return Response({
+            'code': '200',
+            'message': f'已创建 {len(created) - coalesced} 条通知',
+            'data': {
+                'created': len(created) - coalesced,
+                'coalesced': coalesced,
+                'digested': len(staged),
+                'failed': len(items) - len(created) - len(staged),
+                'results': results
+            }
+        })
+
+
+class BroadcastNotificationCreateAPIView(CreateAPIView):
+    """创建广播通知（供其他微服务调用）- 全站系统/促销通知只写一行，不按用户复制"""
+    serializer_class = CreateBroadcastNotificationSerializer
+    # permission_classes = [AllowAny]  # 内部微服务调用，暂不需要用户认证
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        broadcast = serializer.save()
+        realtime.publish_broadcast(broadcast)
+        return Response({
+            'code': '200',
+            'message': '广播通知创建成功',
+            'data': {
+                'id': broadcast.id,
+                'notification_uuid': str(broadcast.notification_uuid),
+                'created_at': broadcast.created_at
+            }
+        }, status=status.HTTP_201_CREATED)
 
 
 class NotificationMarkReadAPIView(GenericAPIView, MicroserviceBaseView):
@@ -146,17 +299,53 @@ class NotificationMarkReadAPIView(GenericAPIView, MicroserviceBaseView):
         if not user_uuid:
             return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        notification = get_object_or_404(
-            Notification,
-            id=notification_id,
-            user_uuid=user_uuid
-        )
+        # 条件更新（不先读出整行），并发重复标记时只扣减一次未读数；启用写后缓冲时合并后批量写入
+        updated = submit_read(user_uuid, [notification_id])
+        if updated == 0:
+            # 未更新时区分已读和不存在
+            get_object_or_404(Notification.objects.only('id'), id=notification_id, user_uuid=user_uuid)
+
+        return Response({'message': '已标记为已读'})
+
+
+class NotificationBatchMarkReadAPIView(GenericAPIView, MicroserviceBaseView):
+    """批量标记通知为已读 POST /api/notifications/read/ {"ids": [...]}
+
+    一次条件 UPDATE，不属于当前用户或已读的ID忽略；启用写后缓冲时只入缓冲
+    """
+    # permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        user_uuid = self.get_user_uuid_from_request()
+        if not user_uuid:
+            return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        max_ids = getattr(settings, 'NOTIFICATION_READ_BATCH_MAX', 500)
+        if not isinstance(ids, list) or not ids or len(ids) > max_ids:
+            return Response({'error': f'ids 必须为非空列表且不超过 {max_ids} 条'}, status=status.HTTP_400_BAD_REQUEST)
+        notification_ids = [_parse_int(value, None) for value in ids]
+        if None in notification_ids:
+            return Response({'error': '通知ID格式错误'}, status=status.HTTP_400_BAD_REQUEST)
+
+        updated = submit_read(user_uuid, set(notification_ids))
+        if updated is None:
+            return Response({'message': '已提交已读标记', 'data': {'queued': len(set(notification_ids))}})
+        return Response({'message': f'已标记{updated}条通知为已读', 'data': {'updated': updated}})
+
 
-        if not notification.read:
-            notification.read = True
-            notification.read_at = timezone.now()
-            notification.save()
+class BroadcastMarkReadAPIView(GenericAPIView, MicroserviceBaseView):
+    """标记广播通知为已读"""
+    # permission_classes = [IsAuthenticated]
 
+    def post(self, request, broadcast_id):
+        user_uuid = self.get_user_uuid_from_request()
+        if not user_uuid:
+            return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        get_object_or_404(BroadcastNotification, id=broadcast_id)
+        if mark_broadcast_read(user_uuid, broadcast_id):
+            realtime.publish_unread(user_uuid)
         return Response({'message': '已标记为已读'})
 
 
@@ -170,16 +359,17 @@ class NotificationMarkAllReadAPIView(GenericAPIView, MicroserviceBaseView):
         if not user_uuid:
             return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        unread_notifications = Notification.objects.filter(
-            user_uuid=user_uuid,
-            read=False
-        )
-
-        count = unread_notifications.count()
-        unread_notifications.update(
-            read=True,
-            read_at=timezone.now()
-        )
+        with transaction.atomic():
+            count = Notification.objects.filter(
+                user_uuid=user_uuid,
+                read=False
+            ).update(
+                read=True,
+                read_at=timezone.now()
+            )
+            adjust_unread(user_uuid, -count)
+        count += mark_all_broadcasts_read(user_uuid)
+        realtime.publish_unread(user_uuid)
 
         return Response({'message': f'已标记{count}条通知为已读'})
 
@@ -188,20 +378,186 @@ class NotificationUnreadCountAPIView(GenericAPIView, MicroserviceBaseView):
     """获取未读通知数量"""
     # permission_classes = [IsAuthenticated]
 
+    @replica_reads
     def get(self, request):
     # 从Spring Cloud Gateway获取用户UUID
         user_uuid = self.get_user_uuid_from_request()
         if not user_uuid:
             return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        unread_count = Notification.objects.filter(
-            user_uuid=user_uuid,
-            read=False
-        ).count()
+        flush_pending_reads(user_uuid)
+        unread_count = get_unread_count(user_uuid) + BroadcastReadState(user_uuid).unread_count()
 
         return Response({'unread_count': unread_count})
 
 
+def _sse(event, data, event_id=None):
+    """SSE 消息帧"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def _missed_notifications(user_uuid, cursor, limit=50):
+    """游标之后新建或被合并更新的个人通知（重连/长轮询时补发断开期间的通知）
+
+    cursor 为 realtime.parse_cursor 的结果，按 (created_at, id) 比较（命中 user_uuid+created_at 索引）；
+    旧客户端的纯数字游标只能按ID比较
+    """
+    created_at, since_id = cursor
+    if created_at is None:
+        notifications = Notification.objects.filter(user_uuid=user_uuid, id__gt=since_id).order_by('id')
+    else:
+        notifications = Notification.objects.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=since_id),
+            user_uuid=user_uuid
+        ).order_by('created_at', 'id')
+    notifications = notifications.select_related('payload')[:limit]
+    return [realtime.notification_event(notification) for notification in notifications]
+
+
+def _parse_int(value, default=None):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+class EventStreamRenderer(BaseRenderer):
+    """使 Accept: text/event-stream 的请求通过内容协商（错误响应仍以 JSON 输出）"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class NotificationStreamAPIView(GenericAPIView, MicroserviceBaseView):
+    """通知实时推送（Server-Sent Events）GET /api/notifications/stream/
+
+    - 连接建立时先推送当前未读数，携带 Last-Event-ID 重连时补发断开期间的个人通知
+    - 之后推送 notification（个人/广播）和 unread 事件；定期发送注释行保活
+    - 空闲超过 NOTIFICATION_PUSH_IDLE_TIMEOUT 秒或连接超过 NOTIFICATION_PUSH_MAX_SECONDS 秒时关闭，
+      由客户端（EventSource）自动重连
+    - 事件积压超过队列上限时丢弃最旧事件并推送 resync，客户端应重新拉取列表和未读数
+    """
+    # permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request):
+        user_uuid = self.get_user_uuid_from_request()
+        if not user_uuid:
+            return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
+        try:
+            channel = realtime.user_channel(user_uuid)
+        except ValueError:
+            return Response({'error': '用户UUID格式错误'}, status=status.HTTP_400_BAD_REQUEST)
+        if not realtime.acquire_connection():
+            return Response(
+                {'error': '推送连接数已满，请使用轮询接口'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '30'}
+            )
+
+        subscription = realtime.bus.subscribe(channel, realtime.BROADCAST_CHANNEL)
+        try:
+            # 先订阅再读取初始状态，避免丢失两者之间发布的事件
+            initial = [{'event': 'unread', 'data': {'unread_count': realtime.total_unread(user_uuid)}}]
+            last_event = realtime.parse_cursor(request.headers.get('Last-Event-ID'))
+            if last_event is not None:
+                initial = _missed_notifications(user_uuid, last_event) + initial
+        except Exception:
+            subscription.close()
+            realtime.release_connection()
+            raise
+        finally:
+            # 推送期间不再访问数据库，连接立即归还
+            connections.close_all()
+
+        response = StreamingHttpResponse(
+            self._stream(subscription, initial),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # 关闭 Nginx 缓冲
+        return response
+
+    def _stream(self, subscription, initial):
+        heartbeat = getattr(settings, 'NOTIFICATION_PUSH_HEARTBEAT', 15)
+        idle_timeout = getattr(settings, 'NOTIFICATION_PUSH_IDLE_TIMEOUT', 120)
+        deadline = time.monotonic() + getattr(settings, 'NOTIFICATION_PUSH_MAX_SECONDS', 300)
+        try:
+            yield f"retry: {getattr(settings, 'NOTIFICATION_PUSH_RETRY_MS', 3000)}\n\n"
+            for event in initial:
+                yield _sse(event['event'], event['data'], event.get('id'))
+            last_event_at = time.monotonic()
+            while True:
+                now = time.monotonic()
+                if now >= deadline or now - last_event_at >= idle_timeout:
+                    return
+                events = subscription.get(timeout=min(heartbeat, deadline - now))
+                if subscription.take_overflow():
+                    yield _sse('resync', {})
+                if not events:
+                    yield ': keepalive\n\n'
+                    continue
+                last_event_at = time.monotonic()
+                for event in events:
+                    yield _sse(event['event'], event['data'], event.get('id'))
+        finally:
+            subscription.close()
+            realtime.release_connection()
+
+
+class NotificationPollAPIView(GenericAPIView, MicroserviceBaseView):
+    """通知长轮询（SSE 不可用时的回退）GET /api/notifications/poll/?since=<游标>&timeout=25
+
+    since 之后已有新建或被合并更新的个人通知时立即返回；否则等待新通知/未读数变化，最长 timeout 秒。
+    返回 {notifications, unread_count, cursor}，客户端下一次请求原样携带 cursor 作为 since
+    （游标格式见 realtime.event_cursor，兼容旧的纯数字通知ID）
+    """
+    # permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user_uuid = self.get_user_uuid_from_request()
+        if not user_uuid:
+            return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
+        try:
+            channel = realtime.user_channel(user_uuid)
+        except ValueError:
+            return Response({'error': '用户UUID格式错误'}, status=status.HTTP_400_BAD_REQUEST)
+        since = request.query_params.get('since') or '0'
+        cursor = realtime.parse_cursor(since) if since != '0' else None
+        max_wait = getattr(settings, 'NOTIFICATION_PUSH_LONG_POLL_MAX', 25)
+        wait = min(max(_parse_int(request.query_params.get('timeout'), max_wait), 0), max_wait)
+
+        with realtime.bus.subscribe(channel, realtime.BROADCAST_CHANNEL) as subscription:
+            events = _missed_notifications(user_uuid, cursor) if cursor is not None else []
+            if not events and wait and realtime.acquire_connection():
+                connections.close_all()
+                try:
+                    events = subscription.get(timeout=wait)
+                finally:
+                    realtime.release_connection()
+
+        notifications = [event['data'] for event in events if event['event'] == 'notification']
+        cursors = [event['id'] for event in events if event['event'] == 'notification' and event.get('id')]
+        unread_count = next(
+            (event['data']['unread_count'] for event in reversed(events) if event['event'] == 'unread'),
+            None
+        )
+        if unread_count is None:
+            unread_count = realtime.total_unread(user_uuid)
+        return Response({
+            'notifications': notifications,
+            'unread_count': unread_count,
+            'cursor': max(cursors, key=realtime.parse_cursor) if cursors else since,
+        })
+
+
 class NotificationDetailAPIView(GenericAPIView, MicroserviceBaseView):
     """通知详情 - 兼容原有API GET/DELETE /api/notifications/{notification_id}/"""
     # permission_classes = [IsAuthenticated]
@@ -223,10 +579,10 @@ class NotificationDetailAPIView(GenericAPIView, MicroserviceBaseView):
             logger.warning(f"用户UUID获取失败 - notification_id: {notification_id}")
             return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        notification = get_object_or_404(
-            Notification,
-            id=notification_id,
-            user_uuid=user_uuid
+        # 在线表中不存在时查询归档通知
+        notification = (
+            Notification.objects.filter(id=notification_id, user_uuid=user_uuid).first()
+            or get_object_or_404(NotificationArchive, id=notification_id, user_uuid=user_uuid)
         )
 
         serializer = NotificationSerializer(notification)
@@ -243,13 +599,16 @@ class NotificationDetailAPIView(GenericAPIView, MicroserviceBaseView):
         if not user_uuid:
             return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        notification = get_object_or_404(
-            Notification,
-            id=notification_id,
-            user_uuid=user_uuid
+        notification = (
+            Notification.objects.filter(id=notification_id, user_uuid=user_uuid).first()
+            or get_object_or_404(NotificationArchive, id=notification_id, user_uuid=user_uuid)
         )
 
-        notification.delete()
+        with transaction.atomic():
+            notification.delete()
+            if not notification.read:
+                adjust_unread(user_uuid, -1)
+                realtime.publish_unread(user_uuid)
         return Response({
             'code': '200',
             'message': '通知已删除',
@@ -273,5 +632,9 @@ class NotificationDeleteAPIView(GenericAPIView, MicroserviceBaseView):
             user_uuid=user_uuid
         )
 
-        notification.delete()
+        with transaction.atomic():
+            notification.delete()
+            if not notification.read:
+                adjust_unread(user_uuid, -1)
+                realtime.publish_unread(user_uuid)
         return Response({'message': '通知已删除'})
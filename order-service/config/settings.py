@@ -25,6 +25,9 @@ if not COMMON_DIR.exists():
     )
 
 sys.path.insert(0, str(COMMON_DIR))
+# 同时加入 common 的上级目录，使 common 可以按包导入（common.xxx）
+if str(COMMON_DIR.parent) not in sys.path:
+    sys.path.insert(0, str(COMMON_DIR.parent))
 
 # 导入公共配置（避免与当前config包冲突）
 import importlib.util
@@ -46,6 +49,7 @@ try:
     common_config = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(common_config)
     DATABASE_CONFIG = common_config.DATABASE_CONFIG
+    DATABASE_REPLICA_CONFIG = common_config.DATABASE_REPLICA_CONFIG
     NACOS_CONFIG = common_config.NACOS_CONFIG
     SERVICES = common_config.SERVICES
 except Exception as e:
@@ -85,6 +89,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'common.db_router.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -112,6 +117,41 @@ DATABASES = {
     'default': DATABASE_CONFIG['ORDER_DB']
 }
 
+# 订单分片：Order/OrderItem/PayAttempt 按 buyer_uuid 分布到 ORDER_SHARDS 中的数据库
+# 分片 0 即 default 库（同时存放幂等记录、卖家订单索引等非分片表），其余分片为 order_shard_<n>
+# 默认只有一个分片，与未分片时完全一致；调整分片数前需先迁移历史订单
+ORDER_SHARD_COUNT = int(os.getenv('ORDER_SHARD_COUNT', 1))
+ORDER_SHARDS = ['default']
+for _shard in range(1, ORDER_SHARD_COUNT):
+    _alias = f'order_shard_{_shard}'
+    DATABASES[_alias] = {
+        **DATABASE_CONFIG['ORDER_DB'],
+        'NAME': os.getenv(f'ORDER_SHARD_{_shard}_DB_NAME', f"{DATABASE_CONFIG['ORDER_DB']['NAME']}_shard_{_shard}"),
+        'HOST': os.getenv(f'ORDER_SHARD_{_shard}_DB_HOST', DATABASE_CONFIG['ORDER_DB']['HOST']),
+        'PORT': os.getenv(f'ORDER_SHARD_{_shard}_DB_PORT', DATABASE_CONFIG['ORDER_DB']['PORT']),
+    }
+    ORDER_SHARDS.append(_alias)
+
+# 只读副本：ORDER_DB_REPLICA_HOSTS 配置后，标记 @replica_reads 的只读接口读副本（common/db_router.py）
+DATABASE_REPLICAS = {}
+_replicas = common_config.replica_databases('default', DATABASE_REPLICA_CONFIG['ORDER_DB'])
+DATABASES.update(_replicas)
+DATABASE_REPLICAS['default'] = list(_replicas)
+# 分片副本：ORDER_SHARD_<n>_DB_REPLICA_HOSTS
+for _shard in range(1, ORDER_SHARD_COUNT):
+    _alias = f'order_shard_{_shard}'
+    _replicas = common_config.replica_databases(
+        _alias, common_config.replica_configs(DATABASES[_alias], f'ORDER_SHARD_{_shard}_DB')
+    )
+    DATABASES.update(_replicas)
+    DATABASE_REPLICAS[_alias] = list(_replicas)
+DATABASE_REPLICA_MAX_LAG = int(os.getenv('DATABASE_REPLICA_MAX_LAG', 2))  # 秒，超过则回退主库
+DATABASE_REPLICA_CHECK_INTERVAL = int(os.getenv('DATABASE_REPLICA_CHECK_INTERVAL', 5))  # 延迟检查间隔（秒）
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DATABASE_REPLICA_PIN_SECONDS', 5))  # 写后读主库时长（秒）
+
+# 分片路由在前：分片模型的读写由分片路由决定（含各分片自己的副本），其余模型交给副本路由
+DATABASE_ROUTERS = ['order.sharding.OrderShardRouter', 'common.db_router.ReplicaRouter']
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -164,6 +204,27 @@ SERVICE_NAME = 'order-service'
 SERVICE_PORT = SERVICES['ORDER_SERVICE']['port']
 SERVICE_VERSION = SERVICES['ORDER_SERVICE']['version']
 
+# 异步支付配置
+ORDER_PAY_ASYNC_DEFAULT = os.getenv('ORDER_PAY_ASYNC_DEFAULT', 'False').lower() == 'true'
+ORDER_PAY_WORKERS = int(os.getenv('ORDER_PAY_WORKERS', 4))
+ORDER_PAY_QUEUE_SIZE = int(os.getenv('ORDER_PAY_QUEUE_SIZE', 1000))
+ORDER_PAY_LONG_POLL_MAX = int(os.getenv('ORDER_PAY_LONG_POLL_MAX', 30))
+ORDER_PAY_ATTEMPT_LEASE_SECONDS = int(os.getenv('ORDER_PAY_ATTEMPT_LEASE_SECONDS', 120))  # 排队/处理中的支付尝试租约（秒），超时由清理器标记失败
+
+# 内部批量查询单次最大条数
+ORDER_INTERNAL_BATCH_MAX = int(os.getenv('ORDER_INTERNAL_BATCH_MAX', 1000))
+
+# 超时未支付订单清理配置
+ORDER_PAYMENT_TIMEOUT_MINUTES = int(os.getenv('ORDER_PAYMENT_TIMEOUT_MINUTES', 60))  # 待支付订单超时时间（分钟）
+ORDER_EXPIRY_BATCH_SIZE = int(os.getenv('ORDER_EXPIRY_BATCH_SIZE', 500))  # 每批处理条数
+ORDER_EXPIRY_BATCH_PAUSE = float(os.getenv('ORDER_EXPIRY_BATCH_PAUSE', 0.2))  # 批次间暂停（秒），限制写入速率
+ORDER_EXPIRY_SWEEP_INTERVAL = int(os.getenv('ORDER_EXPIRY_SWEEP_INTERVAL', 0))  # 进程内定时清理间隔（秒），0 表示不启用
+
+# 订单归档（python manage.py archive_orders）
+ORDER_ARCHIVE_AFTER_DAYS = int(os.getenv('ORDER_ARCHIVE_AFTER_DAYS', 180))  # 已完成/已取消订单保留在线表的天数
+ORDER_ARCHIVE_BATCH_SIZE = int(os.getenv('ORDER_ARCHIVE_BATCH_SIZE', 500))  # 每批归档条数
+ORDER_ARCHIVE_BATCH_PAUSE = float(os.getenv('ORDER_ARCHIVE_BATCH_PAUSE', 0.5))  # 批次间暂停（秒）
+
 # Nacos配置
 NACOS_CONFIG = NACOS_CONFIG
 
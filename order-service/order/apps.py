@@ -20,6 +20,18 @@ class OrderConfig(AppConfig):
         if 'runserver' in sys.argv:
             # 延迟注册，确保服务完全启动并获取到实际端口
             threading.Timer(3.0, self._register_service).start()
+            self._start_expiry_sweeper()
+
+    def _start_expiry_sweeper(self):
+        """进程内定时清理超时未支付订单及租约失效的支付尝试（ORDER_EXPIRY_SWEEP_INTERVAL > 0 时启用）"""
+        from django.conf import settings
+        interval = getattr(settings, 'ORDER_EXPIRY_SWEEP_INTERVAL', 0)
+        # 开发服务器自动重载时只在实际工作进程中启动
+        if interval <= 0 or (os.environ.get('RUN_MAIN') != 'true' and '--noreload' not in sys.argv):
+            return
+        from .tasks import order_expiry_sweepers, pay_attempt_reapers
+        for sweeper in order_expiry_sweepers + pay_attempt_reapers:
+            sweeper.start(interval)
 
     def _register_service(self):
         """注册服务到Nacos"""
@@ -0,0 +1,38 @@
+"""
+归档已完成/已取消且超过保留期的订单
+用法: python manage.py archive_orders [--batch-size 500] [--max-batches N] [--pause 0.5] [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from common.archive import ensure_partitions
+from order.tasks import order_archivers
+
+
+class Command(BaseCommand):
+    help = '分批将超过保留期的订单移入归档表（ORDER_ARCHIVE_AFTER_DAYS），并补齐归档表的未来分区'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='每批归档条数')
+        parser.add_argument('--max-batches', type=int, default=None, help='每个分片最多归档批数')
+        parser.add_argument('--pause', type=float, default=None, help='批次间暂停秒数（限速）')
+        parser.add_argument('--dry-run', action='store_true', help='只输出可归档数量，不做修改')
+
+    def handle(self, *args, **options):
+        for archiver in order_archivers:
+            if options['dry_run']:
+                self.stdout.write(f'可归档订单 [{archiver.using}]: {archiver.backlog()} 条')
+                continue
+
+            connection = connections[archiver.using]
+            for table in ('order_archive', 'order_item_archive'):
+                ensure_partitions(connection, table)
+            stats = archiver.run_once(
+                batch_size=options['batch_size'],
+                max_batches=options['max_batches'],
+                pause=options['pause']
+            )
+            self.stdout.write(
+                f"订单归档完成 [{archiver.using}]: 归档 {stats['archived']} 条, 批次 {stats['batches']}, "
+                f"剩余 {stats['remaining']} 条, 耗时 {stats['duration']}s"
+            )
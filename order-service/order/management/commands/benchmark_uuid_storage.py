@@ -0,0 +1,86 @@
+"""
+UUID 存储方式基准测试：比较 char(32)+uuid4、BINARY(16)+uuid4、BINARY(16)+uuid7 的
+唯一索引插入速率和索引大小（索引大小仅 MySQL 输出）
+在临时表上运行，结束后删除
+用法: python manage.py benchmark_uuid_storage [--rows 100000] [--batch-size 1000] [--database default] [--keep]
+"""
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from common.fields import uuid7
+
+VARIANTS = (
+    # (名称, 列类型, 生成函数, 存储转换)
+    ('char32_uuid4', 'char(32)', uuid.uuid4, lambda value: value.hex),
+    ('binary16_uuid4', 'binary(16)', uuid.uuid4, lambda value: value.bytes),
+    ('binary16_uuid7', 'binary(16)', uuid7, lambda value: value.bytes),
+)
+
+
+class Command(BaseCommand):
+    help = '比较不同 UUID 存储方式的插入速率和索引大小'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help='每种方式插入行数')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批插入行数')
+        parser.add_argument('--database', default='default', help='使用的数据库别名')
+        parser.add_argument('--keep', action='store_true', help='保留临时表')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        is_mysql = connection.vendor == 'mysql'
+        self.stdout.write(f"数据库: {connection.vendor}, 每种方式 {options['rows']} 行")
+        self.stdout.write(f"{'方式':<16}{'插入速率(行/秒)':>18}{'索引大小(KB)':>16}{'叶子页数':>12}")
+
+        for name, column_type, generate, to_db in VARIANTS:
+            table = f"bench_uuid_{name}"
+            with connection.cursor() as cursor:
+                self._create_table(cursor, connection, table, column_type if is_mysql else 'blob')
+                try:
+                    rate = self._insert(cursor, connection, table, generate, to_db, options)
+                    size_kb, leaf_pages = self._index_size(cursor, table) if is_mysql else ('-', '-')
+                    self.stdout.write(f"{name:<16}{rate:>18.0f}{size_kb!s:>16}{leaf_pages!s:>12}")
+                finally:
+                    if not options['keep']:
+                        cursor.execute(f"DROP TABLE IF EXISTS {connection.ops.quote_name(table)}")
+
+    def _create_table(self, cursor, connection, table, column_type):
+        qn = connection.ops.quote_name
+        cursor.execute(f"DROP TABLE IF EXISTS {qn(table)}")
+        if connection.vendor == 'mysql':
+            pk_sql = 'id BIGINT AUTO_INCREMENT PRIMARY KEY'
+            suffix = ' ENGINE=InnoDB'
+        else:
+            pk_sql = 'id INTEGER PRIMARY KEY AUTOINCREMENT'
+            suffix = ''
+        cursor.execute(f"CREATE TABLE {qn(table)} ({pk_sql}, u {column_type} NOT NULL){suffix}")
+        cursor.execute(f"CREATE UNIQUE INDEX {qn(table + '_u')} ON {qn(table)} (u)")
+
+    def _insert(self, cursor, connection, table, generate, to_db, options):
+        sql = f"INSERT INTO {connection.ops.quote_name(table)} (u) VALUES (%s)"
+        remaining = options['rows']
+        started = time.perf_counter()
+        while remaining > 0:
+            size = min(options['batch_size'], remaining)
+            with transaction.atomic(using=connection.alias):
+                cursor.executemany(sql, [(to_db(generate()),) for _ in range(size)])
+            remaining -= size
+        elapsed = time.perf_counter() - started
+        return options['rows'] / elapsed if elapsed else 0
+
+    def _index_size(self, cursor, table):
+        """唯一索引大小和叶子页数（InnoDB 持久化统计）"""
+        cursor.execute(f"ANALYZE TABLE `{table}`")
+        cursor.fetchall()
+        cursor.execute(
+            "SELECT stat_name, stat_value * @@innodb_page_size, stat_value "
+            "FROM mysql.innodb_index_stats "
+            "WHERE database_name = DATABASE() AND table_name = %s AND index_name = %s "
+            "AND stat_name IN ('size', 'n_leaf_pages')",
+            [table, f"{table}_u"]
+        )
+        stats = {name: (size_bytes, pages) for name, size_bytes, pages in cursor.fetchall()}
+        size_kb = int(stats['size'][0] // 1024) if 'size' in stats else '-'
+        leaf_pages = int(stats['n_leaf_pages'][1]) if 'n_leaf_pages' in stats else '-'
+        return size_kb, leaf_pages
@@ -0,0 +1,46 @@
+"""
+取消超时未支付的订单，并将租约失效的异步支付尝试标记为失败
+用法: python manage.py expire_pending_orders [--batch-size 500] [--max-batches N] [--pause 0.2] [--dry-run] [--loop --interval 60]
+"""
+import time
+from django.core.management.base import BaseCommand
+from order.tasks import order_expiry_sweepers, pay_attempt_reapers
+
+
+class Command(BaseCommand):
+    help = '分批取消超时未支付的订单并通知买家'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='每批处理条数')
+        parser.add_argument('--max-batches', type=int, default=None, help='每轮最多处理批数')
+        parser.add_argument('--pause', type=float, default=None, help='批次间暂停秒数（限速）')
+        parser.add_argument('--dry-run', action='store_true', help='只输出积压数量，不做修改')
+        parser.add_argument('--loop', action='store_true', help='常驻运行')
+        parser.add_argument('--interval', type=int, default=60, help='常驻运行时的间隔（秒）')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            for sweeper in order_expiry_sweepers:
+                self.stdout.write(f'超时订单积压 [{sweeper.using}]: {sweeper.backlog()} 条')
+            for reaper in pay_attempt_reapers:
+                self.stdout.write(f'失效支付尝试积压 [{reaper.using}]: {reaper.backlog()} 条')
+            return
+
+        while True:
+            for sweeper in order_expiry_sweepers:
+                stats = sweeper.run_once(
+                    batch_size=options['batch_size'],
+                    max_batches=options['max_batches'],
+                    pause=options['pause']
+                )
+                self.stdout.write(
+                    f"超时订单清理完成 [{sweeper.using}]: 积压 {stats['backlog']} 条, 处理 {stats['expired']} 条, "
+                    f"批次 {stats['batches']}, 剩余 {stats['remaining']} 条, 耗时 {stats['duration']}s"
+                )
+            for reaper in pay_attempt_reapers:
+                stats = reaper.run_once(batch_size=options['batch_size'], pause=options['pause'])
+                if stats['expired']:
+                    self.stdout.write(f"失效支付尝试已标记失败 [{reaper.using}]: {stats['expired']} 条")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+"""
+清理过期的幂等键记录
+用法: python manage.py purge_idempotency_keys [--batch-size 1000]
+"""
+import os
+import sys
+from django.core.management.base import BaseCommand
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+PARENT_DIR = BASE_DIR if BASE_DIR.startswith('/app') else os.path.dirname(BASE_DIR)
+if PARENT_DIR not in sys.path:
+    sys.path.insert(0, PARENT_DIR)
+
+from common.idempotency import purge_expired
+from order.models import IdempotencyRecord
+
+
+class Command(BaseCommand):
+    help = '分批删除已过期的幂等键记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批删除条数')
+
+    def handle(self, *args, **options):
+        deleted = purge_expired(IdempotencyRecord, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'已删除 {deleted} 条过期幂等记录'))
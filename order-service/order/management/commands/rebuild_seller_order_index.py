@@ -0,0 +1,39 @@
+"""
+重建卖家订单索引
+按订单ID分块扫描每个分片，将卖家侧字段批量写入 default 库的 SellerOrderIndex，
+用于首次上线分片后回填，以及修复同步失败导致的索引缺失或状态滞后
+用法: python manage.py rebuild_seller_order_index [--chunk-size 1000] [--shard order_shard_1]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from order.models import Order
+from order.sharding import shard_aliases, sync_seller_index
+
+
+class Command(BaseCommand):
+    help = '从各订单分片重建卖家订单索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='每批读取订单数')
+        parser.add_argument('--shard', action='append', default=None, help='只处理指定分片（可重复）')
+
+    def handle(self, *args, **options):
+        aliases = options['shard'] or shard_aliases()
+        unknown = set(aliases) - set(shard_aliases())
+        if unknown:
+            raise CommandError(f"未知分片: {', '.join(sorted(unknown))}")
+
+        for alias in aliases:
+            total = 0
+            last_id = None
+            while True:
+                queryset = Order.objects.using(alias).exclude(seller_uuid=None).order_by('order_id')
+                if last_id is not None:
+                    queryset = queryset.filter(order_id__gt=last_id)
+                orders = list(queryset.only(
+                    'order_id', 'seller_uuid', 'status', 'total_amount', 'created_at'
+                )[:options['chunk_size']])
+                if not orders:
+                    break
+                total += sync_seller_index(orders, raise_errors=True)
+                last_id = orders[-1].order_id
+            self.stdout.write(self.style.SUCCESS(f'分片 {alias}: 已同步 {total} 条卖家订单索引'))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 15:57
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0002_order_seller_uuid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayAttempt',
+            fields=[
+                ('attempt_id', models.AutoField(primary_key=True, serialize=False)),
+                ('attempt_uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('buyer_uuid', models.UUIDField()),
+                ('payment_method', models.CharField(max_length=20)),
+                ('status', models.SmallIntegerField(choices=[(0, 'queued'), (1, 'processing'), (2, 'success'), (3, 'failed')], default=0)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('error', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pay_attempts', to='order.order')),
+            ],
+            options={
+                'db_table': 'order_pay_attempt',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
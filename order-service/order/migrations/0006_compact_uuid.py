@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-19 16:10
+
+import common.fields
+import common.uuid_migration
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # UUID 列在线转换为 BINARY(16)，分块回填逐块提交
+    atomic = False
+
+    dependencies = [
+        ('order', '0005_expiry_indexes'),
+    ]
+
+    operations = [
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='order',
+            name='buyer_uuid',
+            field=common.fields.CompactUUIDField(),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='order',
+            name='order_uuid',
+            field=common.fields.CompactUUIDField(default=common.fields.uuid7, editable=False, unique=True),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='order',
+            name='seller_uuid',
+            field=common.fields.CompactUUIDField(blank=True, null=True),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='orderitem',
+            name='product_uuid',
+            field=common.fields.CompactUUIDField(),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='payattempt',
+            name='attempt_uuid',
+            field=common.fields.CompactUUIDField(default=common.fields.uuid7, editable=False, unique=True),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='payattempt',
+            name='buyer_uuid',
+            field=common.fields.CompactUUIDField(),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2 on 2026-10-19 16:14
+
+import common.fields
+from django.db import migrations, models
+
+
+def backfill_seller_index(apps, schema_editor):
+    """分片前的订单都在 default 库，按订单ID分块回填卖家订单索引"""
+    Order = apps.get_model('order', 'Order')
+    SellerOrderIndex = apps.get_model('order', 'SellerOrderIndex')
+    alias = schema_editor.connection.alias
+    last_id = None
+    while True:
+        queryset = Order.objects.using(alias).exclude(seller_uuid=None).order_by('order_id')
+        if last_id is not None:
+            queryset = queryset.filter(order_id__gt=last_id)
+        orders = list(queryset.values('order_id', 'seller_uuid', 'status', 'total_amount', 'created_at')[:1000])
+        if not orders:
+            break
+        SellerOrderIndex.objects.using(alias).bulk_create(
+            [SellerOrderIndex(**order) for order in orders],
+            ignore_conflicts=True
+        )
+        last_id = orders[-1]['order_id']
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0006_compact_uuid'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='order_id',
+            field=models.BigIntegerField(editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='id',
+            field=models.BigIntegerField(editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.CreateModel(
+            name='SellerOrderIndex',
+            fields=[
+                ('order_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('seller_uuid', common.fields.CompactUUIDField()),
+                ('status', models.SmallIntegerField(choices=[(0, 'pending_payment'), (1, 'paid'), (2, 'completed'), (3, 'cancelled')])),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'order_seller_index',
+                'indexes': [models.Index(fields=['seller_uuid', 'created_at'], name='seller_index_created_idx'), models.Index(fields=['seller_uuid', 'status', 'created_at'], name='seller_index_status_idx')],
+            },
+        ),
+        # 只在 default 库执行（路由按 model_name 判断，索引表不在分片库）
+        migrations.RunPython(
+            backfill_seller_index,
+            migrations.RunPython.noop,
+            hints={'model_name': 'sellerorderindex'}
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2 on 2026-10-19 16:24
+
+import common.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+from common.archive import partition_by_month, remove_partitioning
+
+ARCHIVE_TABLES = [('order_archive', 'order_id'), ('order_item_archive', 'id')]
+
+
+def partition_archive_tables(apps, schema_editor):
+    """归档表按 created_at 月份分区（仅 MySQL）"""
+    for table, pk_column in ARCHIVE_TABLES:
+        partition_by_month(schema_editor.connection, table, pk_column)
+
+
+def unpartition_archive_tables(apps, schema_editor):
+    for table, pk_column in ARCHIVE_TABLES:
+        remove_partitioning(schema_editor.connection, table, pk_column)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0007_order_sharding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderArchive',
+            fields=[
+                ('order_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('order_uuid', common.fields.CompactUUIDField(db_index=True)),
+                ('buyer_uuid', common.fields.CompactUUIDField()),
+                ('seller_uuid', common.fields.CompactUUIDField(blank=True, null=True)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.SmallIntegerField(choices=[(0, 'pending_payment'), (1, 'paid'), (2, 'completed'), (3, 'cancelled')])),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('payment_method', models.SmallIntegerField(blank=True, choices=[(0, 'alipay'), (1, 'wechat_pay')], null=True)),
+                ('payment_time', models.DateTimeField(blank=True, null=True)),
+                ('remark', models.TextField(blank=True, null=True)),
+                ('cancel_reason', models.TextField(blank=True, null=True)),
+                ('shipping_name', models.CharField(blank=True, max_length=500, null=True)),
+                ('shipping_phone', models.CharField(blank=True, max_length=200, null=True)),
+                ('shipping_address', models.TextField(blank=True, null=True)),
+                ('shipping_postal_code', models.CharField(blank=True, max_length=20, null=True)),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'order_archive',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['buyer_uuid', 'created_at'], name='order_archive_buyer_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderItemArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('product_uuid', common.fields.CompactUUIDField()),
+                ('product_name', models.CharField(max_length=255)),
+                ('product_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('product_image', models.URLField(blank=True, null=True)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField()),
+                ('order', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='order_items', to='order.orderarchive')),
+            ],
+            options={
+                'db_table': 'order_item_archive',
+            },
+        ),
+        # 分片库上同样执行（路由按 model_name 判断）
+        migrations.RunPython(
+            partition_archive_tables,
+            unpartition_archive_tables,
+            hints={'model_name': 'orderarchive'}
+        ),
+    ]
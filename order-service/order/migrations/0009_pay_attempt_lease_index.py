@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-19 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0008_order_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payattempt',
+            index=models.Index(fields=['status', 'updated_at'], name='pay_attempt_lease_idx'),
+        ),
+    ]
@@ -2,8 +2,17 @@
 订单服务模型 - 解耦后的版本
 只包含订单相关的核心数据，移除了对User和Product的外键依赖
 """
-from django.db import models
-import uuid
+import logging
+
+from django.db import IntegrityError, models, router, transaction
+
+from common.fields import CompactUUIDField, uuid7
+from .sharding import next_id, sync_seller_index, tag_uuid
+
+logger = logging.getLogger(__name__)
+
+# 生成的主键碰撞（多进程同一毫秒同一序号）时的最大重试次数
+ID_COLLISION_RETRIES = 3
 
 
 # 订单状态常量
@@ -21,14 +30,45 @@ PAYMENT_METHOD_CHOICES = (
 )
 
 
-class Order(models.Model):
-    """订单模型 - 微服务版本"""
-    order_id = models.AutoField(primary_key=True)
-    order_uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+class ShardedModel(models.Model):
+    """分片模型：新记录写入前生成编码了分片号的全局唯一主键（见 sharding.next_id）"""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            return super().save(*args, **kwargs)
+
+        using = kwargs.pop('using', None) or router.db_for_write(type(self), instance=self)
+        kwargs['force_insert'] = True
+        self.before_insert(using)
+        for attempt in range(ID_COLLISION_RETRIES):
+            self.pk = next_id(using)
+            try:
+                with transaction.atomic(using=using):
+                    return super().save(*args, using=using, **kwargs)
+            except IntegrityError:
+                if attempt == ID_COLLISION_RETRIES - 1:
+                    raise
+                logger.warning(f"{type(self).__name__} 主键碰撞，重新生成: {self.pk}")
+
+    def before_insert(self, using):
+        """首次写入前的钩子"""
+        pass
+
+
+class Order(ShardedModel):
+    """订单模型 - 微服务版本
+
+    按 buyer_uuid 分片存储，卖家侧字段同步到 default 库的 SellerOrderIndex
+    """
+    order_id = models.BigIntegerField(primary_key=True, editable=False)
+    order_uuid = CompactUUIDField(default=uuid7, unique=True, editable=False)
 
     # 解耦改造：使用UUID替代外键
-    buyer_uuid = models.UUIDField()  # 用户UUID，通过API调用用户服务获取用户信息
-    seller_uuid = models.UUIDField(null=True, blank=True)  # 卖家UUID，通过API调用用户服务获取用户信息
+    buyer_uuid = CompactUUIDField()  # 用户UUID，通过API调用用户服务获取用户信息
+    seller_uuid = CompactUUIDField(null=True, blank=True)  # 卖家UUID，通过API调用用户服务获取用户信息
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.SmallIntegerField(choices=ORDER_STATUS_CHOICES, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -47,17 +87,36 @@ class Order(models.Model):
     def __str__(self):
         return f"Order {self.order_id}"
 
+    def before_insert(self, using):
+        # 订单UUID低位记录分片号，供只持有UUID的内部调用定位分片
+        self.order_uuid = tag_uuid(self.order_uuid, using)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        sync_seller_index([self])
+
+    def delete(self, *args, **kwargs):
+        order_id = self.order_id
+        result = super().delete(*args, **kwargs)
+        SellerOrderIndex.objects.using('default').filter(order_id=order_id).delete()
+        return result
+
     class Meta:
         db_table = "order"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['buyer_uuid', 'status'], name='order_buyer_status_idx'),
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),  # 超时未支付订单清理
+        ]
 
 
-class OrderItem(models.Model):
-    """订单商品项 - 微服务版本"""
+class OrderItem(ShardedModel):
+    """订单商品项 - 微服务版本，与所属订单位于同一分片"""
+    id = models.BigIntegerField(primary_key=True, editable=False)
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_items')
 
     # 解耦改造：使用UUID替代外键
-    product_uuid = models.UUIDField()  # 商品UUID，通过API调用商品服务获取商品信息
+    product_uuid = CompactUUIDField()  # 商品UUID，通过API调用商品服务获取商品信息
 
     # 冗余商品信息（下单时快照）
     product_name = models.CharField(max_length=255)
@@ -72,3 +131,141 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f"{self.product_name} x {self.quantity}"
+
+
+class SellerOrderIndex(models.Model):
+    """卖家订单索引 - 存放在 default 库
+
+    卖家侧列表先在索引上过滤、排序、分页，再按订单ID回到各分片读取当前页订单，避免遍历所有分片
+    """
+    order_id = models.BigIntegerField(primary_key=True)
+    seller_uuid = CompactUUIDField()
+    status = models.SmallIntegerField(choices=ORDER_STATUS_CHOICES)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"SellerOrderIndex {self.order_id}"
+
+    class Meta:
+        db_table = "order_seller_index"
+        indexes = [
+            models.Index(fields=['seller_uuid', 'created_at'], name='seller_index_created_idx'),
+            models.Index(fields=['seller_uuid', 'status', 'created_at'], name='seller_index_status_idx'),
+        ]
+
+
+# 异步支付尝试状态常量
+PAY_ATTEMPT_STATUS_CHOICES = (
+    (0, 'queued'),       # 已排队
+    (1, 'processing'),   # 处理中
+    (2, 'success'),      # 成功
+    (3, 'failed'),       # 失败
+)
+
+
+class PayAttempt(models.Model):
+    """异步支付尝试 - 记录一次排队中的支付请求及其结果"""
+    attempt_id = models.AutoField(primary_key=True)
+    attempt_uuid = CompactUUIDField(default=uuid7, unique=True, editable=False)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='pay_attempts')
+    buyer_uuid = CompactUUIDField()
+    payment_method = models.CharField(max_length=20)
+    status = models.SmallIntegerField(choices=PAY_ATTEMPT_STATUS_CHOICES, default=0)
+    result = models.JSONField(default=dict, blank=True)  # PaymentService 返回的支付数据
+    error = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"PayAttempt {self.attempt_uuid}"
+
+    class Meta:
+        db_table = "order_pay_attempt"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='pay_attempt_lease_idx'),  # 租约清理
+        ]
+
+
+# 幂等记录状态常量
+IDEMPOTENCY_STATUS_CHOICES = (
+    (0, 'processing'),   # 处理中
+    (1, 'completed'),    # 已完成
+)
+
+
+class IdempotencyRecord(models.Model):
+    """幂等键记录 - 缓存写接口响应，客户端重试时直接回放"""
+    key = models.CharField(max_length=64, primary_key=True)  # sha256(方法+路径+用户+幂等键)
+    request_hash = models.CharField(max_length=64)
+    status = models.SmallIntegerField(choices=IDEMPOTENCY_STATUS_CHOICES, default=0)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)  # 处理中记录的租约，过期后重试可接管
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"IdempotencyRecord {self.key}"
+
+    class Meta:
+        db_table = "order_idempotency_key"
+
+
+class OrderArchive(models.Model):
+    """已归档订单 - 已完成/已取消且超过保留期的订单（见 archive_orders 命令）
+
+    与订单位于同一分片；MySQL 上按 created_at 月份分区，主键为 (order_id, created_at)
+    """
+    order_id = models.BigIntegerField(primary_key=True)
+    order_uuid = CompactUUIDField(db_index=True)
+    buyer_uuid = CompactUUIDField()
+    seller_uuid = CompactUUIDField(null=True, blank=True)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.SmallIntegerField(choices=ORDER_STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    payment_method = models.SmallIntegerField(choices=PAYMENT_METHOD_CHOICES, null=True, blank=True)
+    payment_time = models.DateTimeField(null=True, blank=True)
+    remark = models.TextField(blank=True, null=True)
+    cancel_reason = models.TextField(blank=True, null=True)
+    shipping_name = models.CharField(max_length=500, null=True, blank=True)
+    shipping_phone = models.CharField(max_length=200, null=True, blank=True)
+    shipping_address = models.TextField(null=True, blank=True)
+    shipping_postal_code = models.CharField(max_length=20, null=True, blank=True)
+    archived_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"OrderArchive {self.order_id}"
+
+    class Meta:
+        db_table = "order_archive"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['buyer_uuid', 'created_at'], name='order_archive_buyer_idx'),
+        ]
+
+
+class OrderItemArchive(models.Model):
+    """已归档订单商品项，created_at 取所属订单的创建时间（分区列）"""
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(
+        OrderArchive,
+        on_delete=models.DO_NOTHING,
+        related_name='order_items',
+        db_constraint=False
+    )
+    product_uuid = CompactUUIDField()
+    product_name = models.CharField(max_length=255)
+    product_price = models.DecimalField(max_digits=10, decimal_places=2)
+    product_image = models.URLField(null=True, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "order_item_archive"
+
+    def __str__(self):
+        return f"{self.product_name} x {self.quantity}"
@@ -2,7 +2,7 @@
 订单服务序列化器 - 微服务版本
 """
 from rest_framework import serializers
-from .models import Order, OrderItem, PAYMENT_METHOD_CHOICES
+from .models import Order, OrderItem, PayAttempt, PAYMENT_METHOD_CHOICES
 import sys
 import os
 
@@ -29,6 +29,7 @@ if PARENT_DIR not in sys.path:
     sys.path.insert(0, PARENT_DIR)
 
 from common.service_client import service_client
+from .sharding import shard_for_buyer
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -226,8 +227,8 @@ class CreateOrderSerializer(serializers.Serializer):
             for product in products_data
         )
 
-        # 创建订单
-        order = Order.objects.create(
+        # 创建订单（写入买家所在分片，订单项随订单写入同一分片）
+        order = Order.objects.using(shard_for_buyer(buyer_uuid)).create(
             buyer_uuid=buyer_uuid,
             seller_uuid=seller_uuid,  # 使用传入的卖家UUID
             total_amount=total_amount,
@@ -264,8 +265,7 @@ class CreateOrderSerializer(serializers.Serializer):
                 if not product_image:
                     product_image = product_info.get('image') or product_info.get('thumbnail')
 
-            OrderItem.objects.create(
-                order=order,
+            order.order_items.create(
                 product_uuid=product_data['product_uuid'],
                 product_name=product_name or '商品',
                 product_price=product_data['price'],
@@ -275,3 +275,17 @@ class CreateOrderSerializer(serializers.Serializer):
             )
 
         return order
+
+
+class PayAttemptSerializer(serializers.ModelSerializer):
+    """异步支付尝试序列化器"""
+    order_id = serializers.IntegerField(read_only=True)
+    order_uuid = serializers.UUIDField(source='order.order_uuid', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+    class Meta:
+        model = PayAttempt
+        fields = [
+            'attempt_uuid', 'order_id', 'order_uuid', 'payment_method',
+            'status', 'status_display', 'result', 'error', 'created_at', 'updated_at'
+        ]
@@ -0,0 +1,281 @@
+"""
+订单分片
+Order/OrderItem/PayAttempt 按 buyer_uuid 分布到 settings.ORDER_SHARDS 中的数据库，同一买家的订单及其商品项、
+支付尝试（以及归档后的订单）位于同一分片。订单ID和订单UUID中编码了所在分片，只有ID时也能直接定位分片；
+卖家侧查询走 default 库中的 SellerOrderIndex，不需要遍历所有分片
+
+订单ID布局（53 位，JSON 中可被 JavaScript 精确表示）：
+    41 位毫秒时间戳（自 2024-01-01 起）| 5 位分片号 | 7 位序号
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+import zlib
+
+from django.conf import settings
+from django.db import connections
+
+from common.db_router import primary_of, read_db
+from common.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SHARDED_MODELS = {'order', 'orderitem', 'payattempt', 'orderarchive', 'orderitemarchive'}
+
+ID_EPOCH_MS = 1704067200000  # 2024-01-01 00:00:00 UTC
+SHARD_BITS = 5
+SEQUENCE_BITS = 7
+MAX_SHARDS = 1 << SHARD_BITS
+# 小于该值的订单ID为分片前的自增ID，无法从ID推断分片
+LEGACY_ID_LIMIT = 1 << 32
+
+_id_lock = threading.Lock()
+_id_state = {'timestamp': 0, 'sequence': 0, 'start': 0}
+
+
+def shard_aliases():
+    """所有分片的数据库别名，第一个为 default"""
+    return list(getattr(settings, 'ORDER_SHARDS', ['default']))
+
+
+def shard_index(alias):
+    return shard_aliases().index(alias)
+
+
+def shard_for_buyer(buyer_uuid):
+    """买家所在分片"""
+    aliases = shard_aliases()
+    if len(aliases) == 1:
+        return aliases[0]
+    value = buyer_uuid if isinstance(buyer_uuid, uuid.UUID) else uuid.UUID(str(buyer_uuid))
+    return aliases[zlib.crc32(value.bytes) % len(aliases)]
+
+
+def shard_hint_for_order_id(order_id):
+    """从订单ID解析分片，分片前的自增ID或无法解析时返回 None"""
+    try:
+        order_id = int(order_id)
+    except (TypeError, ValueError):
+        return None
+    if order_id < LEGACY_ID_LIMIT:
+        return None
+    aliases = shard_aliases()
+    index = (order_id >> SEQUENCE_BITS) & (MAX_SHARDS - 1)
+    return aliases[index] if index < len(aliases) else None
+
+
+def shard_hint_for_order_uuid(order_uuid):
+    """从订单UUID低位解析分片（分片前生成的UUID可能解析错误，调用方需回退到其他分片）"""
+    try:
+        value = order_uuid if isinstance(order_uuid, uuid.UUID) else uuid.UUID(str(order_uuid))
+    except (TypeError, ValueError):
+        return None
+    aliases = shard_aliases()
+    return aliases[(value.int & (MAX_SHARDS - 1)) % len(aliases)]
+
+
+def candidate_shards(hint=None):
+    """按优先级排列的待查分片：提示分片在前，其余在后"""
+    aliases = shard_aliases()
+    if hint in aliases:
+        aliases.remove(hint)
+        aliases.insert(0, hint)
+    return aliases
+
+
+def next_id(alias):
+    """生成编码了分片号的全局唯一ID
+
+    同一毫秒内序号递增，序号起点随机，降低多进程同时生成时的碰撞概率；碰撞时由插入方重试
+    """
+    index = shard_index(alias)
+    with _id_lock:
+        timestamp = int(time.time() * 1000) - ID_EPOCH_MS
+        if timestamp <= _id_state['timestamp']:
+            timestamp = _id_state['timestamp']
+            sequence = (_id_state['sequence'] + 1) & ((1 << SEQUENCE_BITS) - 1)
+            if sequence == _id_state['start']:
+                # 本毫秒序号用尽，借用下一毫秒
+                timestamp += 1
+                sequence = _random_sequence()
+                _id_state['start'] = sequence
+        else:
+            sequence = _random_sequence()
+            _id_state['start'] = sequence
+        _id_state['timestamp'] = timestamp
+        _id_state['sequence'] = sequence
+    return (timestamp << (SHARD_BITS + SEQUENCE_BITS)) | (index << SEQUENCE_BITS) | sequence
+
+
+def _random_sequence():
+    return int.from_bytes(os.urandom(1), 'big') & ((1 << SEQUENCE_BITS) - 1)
+
+
+def tag_uuid(value, alias):
+    """将分片号写入 UUID 低 5 位（属于随机位，不影响 uuid7 的时间有序性）"""
+    return uuid.UUID(int=(value.int & ~(MAX_SHARDS - 1)) | shard_index(alias))
+
+
+def orders_for_buyer(buyer_uuid):
+    """买家所在分片上该买家的订单查询集"""
+    from .models import Order
+    return Order.objects.using(read_db(shard_for_buyer(buyer_uuid))).filter(buyer_uuid=buyer_uuid)
+
+
+def find_order(hint=None, *conditions, prefetch=False, archived=False, **lookup):
+    """按分片提示查找订单，提示分片未命中时依次查询其余分片
+
+    单分片部署时只查询一次；archived=True 时查询归档订单；找不到时抛出 Order.DoesNotExist
+    """
+    from .models import Order, OrderArchive
+    model = OrderArchive if archived else Order
+    for alias in candidate_shards(hint):
+        queryset = model.objects.using(read_db(alias)).filter(*conditions, **lookup)
+        if prefetch:
+            queryset = queryset.prefetch_related('order_items')
+        order = queryset.first()
+        if order is not None:
+            return order
+    raise Order.DoesNotExist(f"订单不存在: {lookup}")
+
+
+def find_order_with_archive(hint=None, *conditions, prefetch=False, **lookup):
+    """先查在线订单，找不到时查归档订单（归档订单只读，只用于查询接口）"""
+    from .models import Order
+    try:
+        return find_order(hint, *conditions, prefetch=prefetch, **lookup)
+    except Order.DoesNotExist:
+        return find_order(hint, *conditions, prefetch=prefetch, archived=True, **lookup)
+
+
+def group_by_shard(values, hint_func):
+    """按分片提示对ID/UUID分组 {分片: [值]}"""
+    groups = {}
+    for value in values:
+        alias = hint_func(value) or shard_aliases()[0]
+        groups.setdefault(alias, []).append(value)
+    return groups
+
+
+def fetch_orders(values, field, hint_func, prefetch=False, only=None, archived=False):
+    """按ID/UUID批量读取订单 {值: 订单}
+
+    先按提示分片分组查询，未命中的值（分片前的数据）再到其余分片查询；archived=True 时读取归档订单
+    """
+    from .models import Order, OrderArchive
+    model = OrderArchive if archived else Order
+
+    def query(alias, chunk):
+        queryset = model.objects.using(read_db(alias)).filter(**{f"{field}__in": chunk})
+        if prefetch:
+            queryset = queryset.prefetch_related('order_items')
+        if only:
+            queryset = queryset.only(*only)
+        return {getattr(order, field): order for order in queryset}
+
+    found = {}
+    queried = {}
+    for alias, chunk in group_by_shard(values, hint_func).items():
+        found.update(query(alias, chunk))
+        queried.setdefault(alias, set()).update(chunk)
+    missing = [value for value in values if value not in found]
+    if missing:
+        for alias in shard_aliases():
+            chunk = [value for value in missing if value not in found and value not in queried.get(alias, ())]
+            if chunk:
+                found.update(query(alias, chunk))
+    return found
+
+
+def sync_seller_index(orders, raise_errors=False):
+    """将订单的卖家侧字段写入 SellerOrderIndex（default 库）
+
+    与分片写入不在同一事务中：失败时记录错误日志和 order.seller_index.sync_failures 指标，
+    由 rebuild_seller_order_index 命令修复；raise_errors=True 时抛出异常（重建命令使用）
+    """
+    from .models import SellerOrderIndex
+    rows = [
+        SellerOrderIndex(
+            order_id=order.order_id,
+            seller_uuid=order.seller_uuid,
+            status=order.status,
+            total_amount=order.total_amount,
+            created_at=order.created_at
+        )
+        for order in orders if order.seller_uuid
+    ]
+    if not rows:
+        return 0
+    options = {
+        'update_conflicts': True,
+        'update_fields': ['seller_uuid', 'status', 'total_amount', 'created_at'],
+    }
+    if connections['default'].features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['order_id']
+    # MySQL 不支持指定冲突目标（ON DUPLICATE KEY UPDATE 按主键/唯一键冲突），不传 unique_fields
+    try:
+        SellerOrderIndex.objects.using('default').bulk_create(rows, **options)
+    except Exception as e:
+        metrics.inc('order.seller_index.sync_failures', len(rows))
+        logger.error(f"更新卖家订单索引失败: {len(rows)} 条, {e}")
+        if raise_errors:
+            raise
+        return 0
+    return len(rows)
+
+
+def sync_seller_index_for_ids(order_ids, alias):
+    """按订单ID重新读取分片中的订单并同步卖家订单索引（用于批量 UPDATE 之后）"""
+    from .models import Order
+    orders = Order.objects.using(alias).filter(order_id__in=list(order_ids)).only(
+        'order_id', 'seller_uuid', 'status', 'total_amount', 'created_at'
+    )
+    return sync_seller_index(orders)
+
+
+class OrderShardRouter:
+    """订单分片路由，放在 DATABASE_ROUTERS 首位（ReplicaRouter 之前）
+
+    - 分片模型：实例已绑定数据库时沿用；新建订单按 buyer_uuid 路由；无提示时为 default（第一个分片）。
+      读查询经 read_db() 选择该分片自己的副本，不会落到 default 的副本上
+    - 查询需由调用方通过 .using() 指定分片；只读接口中经 read_db() 读对应分片的副本
+    - 非分片模型和其他应用只在 default 库，读查询交给 ReplicaRouter 决定是否读副本
+    """
+
+    def _is_sharded(self, model):
+        return model._meta.app_label == 'order' and model._meta.model_name in SHARDED_MODELS
+
+    def _db_for(self, model, hints, write=False):
+        if not self._is_sharded(model):
+            return 'default' if write else None
+        instance = hints.get('instance')
+        if instance is not None:
+            if instance._state.db:
+                # 从副本读出的实例写回其主库
+                return primary_of(instance._state.db) if write else instance._state.db
+            buyer_uuid = getattr(instance, 'buyer_uuid', None)
+            if buyer_uuid:
+                alias = shard_for_buyer(buyer_uuid)
+                return alias if write else read_db(alias)
+        return 'default' if write else read_db('default')
+
+    def db_for_read(self, model, **hints):
+        return self._db_for(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for(model, hints, write=True)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if self._is_sharded(type(obj1)) and self._is_sharded(type(obj2)):
+            return primary_of(obj1._state.db) == primary_of(obj2._state.db)
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == 'default':
+            return None
+        if db not in shard_aliases():
+            return None
+        # 其余分片只建分片表
+        return app_label == 'order' and model_name in SHARDED_MODELS
@@ -0,0 +1,269 @@
+"""
+订单服务后台任务
+1. 异步支付：请求线程只负责登记支付尝试并入队，PaymentService 调用在后台线程中完成；
+   队列只在进程内，进程重启后排队/处理中的尝试由租约清理器标记失败（每个分片一个）
+2. 超时未支付订单清理：分批取消超时的待支付订单并通知买家（每个分片一个清理器）
+3. 订单归档：已完成/已取消且超过保留期的订单分批移入归档表（每个分片一个归档器）
+"""
+import logging
+import sys
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .models import Order, PayAttempt, OrderArchive, OrderItemArchive, SellerOrderIndex
+from .sharding import shard_aliases, sync_seller_index, sync_seller_index_for_ids
+
+# 添加公共模块路径
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 检测环境：容器环境 vs 本地开发环境
+if BASE_DIR.startswith('/app'):
+    PARENT_DIR = BASE_DIR
+else:
+    PARENT_DIR = os.path.dirname(BASE_DIR)
+
+if PARENT_DIR not in sys.path:
+    sys.path.insert(0, PARENT_DIR)
+
+from common.service_client import service_client
+from common.order_token import sign_order_snapshot, order_token_enabled
+from common.task_queue import BackgroundTaskQueue
+from common.sweeper import ExpirySweeper
+from common.archive import Archiver, copy_to
+from common.metrics import metrics
+from common.notification_client import build_notification, send_notifications
+
+logger = logging.getLogger(__name__)
+
+# 异步支付任务队列（进程内）
+pay_queue = BackgroundTaskQueue(
+    'order-pay',
+    workers=getattr(settings, 'ORDER_PAY_WORKERS', 4),
+    maxsize=getattr(settings, 'ORDER_PAY_QUEUE_SIZE', 1000)
+)
+metrics.register_collector('order-pay-queue', pay_queue.stats)
+
+
+def request_payment(order, user_uuid, payment_method):
+    """调用PaymentService创建支付
+
+    微服务通信点：POST /api/payment/create/，透传用户UUID请求头；
+    配置了 ORDER_TOKEN_SECRET 时附带签名的订单快照令牌，PaymentService 验签后无需回调订单服务
+    """
+    data = {
+        'order_uuid': str(order.order_uuid),
+        'payment_method': payment_method,
+        'amount': str(order.total_amount),
+        'payment_subject': f'订单支付 - {order.order_id}',
+    }
+    if order_token_enabled():
+        data['order_token'] = sign_order_snapshot(
+            order.order_uuid,
+            order.total_amount,
+            order.status,
+            version=int(order.updated_at.timestamp() * 1000),
+            buyer_uuid=order.buyer_uuid,
+            order_id=order.order_id
+        )
+    return service_client.post('PaymentService', '/api/payment/create/', data, headers={'UUID': str(user_uuid)})
+
+
+def mark_order_paid(order):
+    """条件更新订单为已支付，仅对待支付订单生效"""
+    now = timezone.now()
+    updated = Order.objects.using(order._state.db).filter(order_id=order.order_id, status=0).update(
+        status=1,
+        payment_time=now,
+        updated_at=now
+    )
+    if updated:
+        order.status = 1
+        order.payment_time = now
+        sync_seller_index([order])
+    return bool(updated)
+
+
+def submit_pay_attempt(attempt):
+    """支付尝试入队，队列已满时直接标记失败"""
+    using = attempt._state.db
+    if pay_queue.submit(run_pay_attempt, attempt.attempt_id, using):
+        return True
+    PayAttempt.objects.using(using).filter(attempt_id=attempt.attempt_id, status=0).update(
+        status=3,
+        error='支付系统繁忙，请稍后重试',
+        updated_at=timezone.now()
+    )
+    return False
+
+
+def pay_attempt_lease():
+    """支付尝试租约：排队/处理中超过该时长未更新的尝试视为失效"""
+    return timedelta(seconds=getattr(settings, 'ORDER_PAY_ATTEMPT_LEASE_SECONDS', 120))
+
+
+def stale_pay_attempt_filter(now):
+    """失效的支付尝试：排队/处理中且更新时间早于租约（命中 status+updated_at 索引）"""
+    return Q(status__in=[0, 1], updated_at__lt=now - pay_attempt_lease())
+
+
+def active_pay_attempts(order):
+    """订单仍在租约内的排队/处理中支付尝试"""
+    return order.pay_attempts.filter(status__in=[0, 1]).exclude(stale_pay_attempt_filter(timezone.now()))
+
+
+def run_pay_attempt(attempt_id, using='default'):
+    """后台执行支付尝试（using 为支付尝试所在分片）"""
+    attempts = PayAttempt.objects.using(using)
+    now = timezone.now()
+    # 认领任务：只有排队中且未失效的尝试才会被处理，避免重复执行，
+    # 也避免与失效后新登记的尝试重复请求支付
+    claimed = attempts.filter(attempt_id=attempt_id, status=0, updated_at__gte=now - pay_attempt_lease()).update(
+        status=1,
+        updated_at=now
+    )
+    if not claimed:
+        return
+
+    attempt = attempts.select_related('order').get(attempt_id=attempt_id)
+    order = attempt.order
+    if order.status != 0:
+        _finish_attempt(attempts, attempt_id, 3, error='订单状态不允许支付')
+        return
+
+    try:
+        payment_result = request_payment(order, attempt.buyer_uuid, attempt.payment_method)
+    except Exception as e:
+        logger.error(f"调用支付服务失败: {e}")
+        _finish_attempt(attempts, attempt_id, 3, error='支付系统暂时不可用，请稍后重试')
+        return
+
+    if payment_result and payment_result.get('success'):
+        mark_order_paid(order)
+        # 支付服务调用超过租约时清理器可能已将尝试标记为失败，支付成功仍以成功结果覆盖
+        _finish_attempt(attempts, attempt_id, 2, result=payment_result.get('data') or {}, statuses=(1, 3))
+    else:
+        error = (payment_result or {}).get('error', '未知错误')
+        _finish_attempt(attempts, attempt_id, 3, error=str(error)[:255])
+
+
+def _finish_attempt(attempts, attempt_id, status, result=None, error=None, statuses=(1,)):
+    attempts.filter(attempt_id=attempt_id, status__in=statuses).update(
+        status=status,
+        result=result or {},
+        error=error,
+        updated_at=timezone.now()
+    )
+
+
+def _expired_order_filter(now):
+    """超时未支付订单：待支付且创建时间早于超时阈值（命中 status+created_at 索引）"""
+    timeout = timedelta(minutes=getattr(settings, 'ORDER_PAYMENT_TIMEOUT_MINUTES', 60))
+    return Q(status=0, created_at__lt=now - timeout)
+
+
+def _expired_order_updates(now):
+    return {
+        'status': 3,
+        'cancel_reason': '超时未支付，系统自动取消',
+        'updated_at': now,
+    }
+
+
+def notify_expired_orders(rows):
+    """超时取消通知，每批订单合并为一次批量请求"""
+    send_notifications([
+        build_notification(
+            row['buyer_uuid'],
+            '订单已取消',
+            f"您的订单 {row['order_id']} 超时未支付，已自动取消",
+            related_id=row['order_id'],
+            related_data={'action': 'expired'}
+        )
+        for row in rows
+    ])
+
+
+def _expiry_sweeper(alias):
+    def on_expired(rows):
+        # 批量 UPDATE 不经过 Order.save，需单独同步卖家订单索引
+        sync_seller_index_for_ids([row['order_id'] for row in rows], alias)
+        notify_expired_orders(rows)
+
+    return ExpirySweeper(
+        'order-expiry' if alias == 'default' else f'order-expiry-{alias}',
+        Order,
+        expired_filter=_expired_order_filter,
+        updates=_expired_order_updates,
+        fields=('buyer_uuid',),
+        on_expired=on_expired,
+        batch_size=getattr(settings, 'ORDER_EXPIRY_BATCH_SIZE', 500),
+        pause=getattr(settings, 'ORDER_EXPIRY_BATCH_PAUSE', 0.2),
+        using=alias
+    )
+
+
+order_expiry_sweepers = [_expiry_sweeper(alias) for alias in shard_aliases()]
+
+
+def _stale_pay_attempt_updates(now):
+    return {
+        'status': 3,
+        'error': '支付处理超时，请重新发起支付',
+        'updated_at': now,
+    }
+
+
+def _pay_attempt_reaper(alias):
+    # 处理中的尝试也只标记失败而不重新入队：PaymentService 可能已受理，重复请求会重复创建支付
+    return ExpirySweeper(
+        'order-pay-attempt-lease' if alias == 'default' else f'order-pay-attempt-lease-{alias}',
+        PayAttempt,
+        expired_filter=stale_pay_attempt_filter,
+        updates=_stale_pay_attempt_updates,
+        batch_size=getattr(settings, 'ORDER_EXPIRY_BATCH_SIZE', 500),
+        pause=getattr(settings, 'ORDER_EXPIRY_BATCH_PAUSE', 0.2),
+        using=alias
+    )
+
+
+pay_attempt_reapers = [_pay_attempt_reaper(alias) for alias in shard_aliases()]
+
+
+def _archivable_order_filter(now):
+    """可归档订单：已完成/已取消且创建时间早于保留期（命中 status+created_at 索引）"""
+    retention = timedelta(days=getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 180))
+    return Q(status__in=[2, 3], created_at__lt=now - retention)
+
+
+def _order_archive_rows(orders, now):
+    """订单及其商品项的归档实例；支付尝试随订单级联删除，不归档"""
+    for order in orders:
+        yield copy_to(OrderArchive, order, archived_at=now)
+        for item in order.order_items.all():
+            yield copy_to(OrderItemArchive, item, created_at=order.created_at)
+
+
+def _drop_seller_index(orders):
+    """归档后的订单不再出现在卖家订单列表中"""
+    SellerOrderIndex.objects.using('default').filter(
+        order_id__in=[order.order_id for order in orders]
+    ).delete()
+
+
+def _order_archiver(alias):
+    return Archiver(
+        'order-archive' if alias == 'default' else f'order-archive-{alias}',
+        Order,
+        eligible=_archivable_order_filter,
+        to_archive=_order_archive_rows,
+        after_archive=_drop_seller_index,
+        prefetch_related=('order_items',),
+        batch_size=getattr(settings, 'ORDER_ARCHIVE_BATCH_SIZE', 500),
+        pause=getattr(settings, 'ORDER_ARCHIVE_BATCH_PAUSE', 0.5),
+        using=alias
+    )
+
+
+order_archivers = [_order_archiver(alias) for alias in shard_aliases()]
@@ -0,0 +1,169 @@
+"""
+订单服务测试
+1. 分片路由：分片模型的读查询选择所在分片的副本，其余模型交给副本路由
+2. 异步支付尝试：支付服务调用超过租约被清理器标记失败后，支付成功仍记为成功
+3. 跨分片读写：ShardedModel.save 按买家写入分片并在主键碰撞时重试，find_order 提示未命中时查询其余分片
+   （需配置 ORDER_SHARD_COUNT > 1，单分片时跳过）
+"""
+import unittest
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .models import ID_COLLISION_RETRIES, IdempotencyRecord, Order, OrderItem, PayAttempt, SellerOrderIndex
+from .sharding import (
+    OrderShardRouter, find_order, next_id, shard_for_buyer, shard_hint_for_order_id, shard_hint_for_order_uuid
+)
+from . import tasks
+
+SHARDS = ['default', 'order_shard_1']
+
+
+def fake_read_db(alias):
+    return f'{alias}_replica_1'
+
+
+@override_settings(ORDER_SHARDS=SHARDS)
+@mock.patch('order.sharding.read_db', side_effect=fake_read_db)
+class OrderShardRouterTests(SimpleTestCase):
+    """OrderShardRouter 与 ReplicaRouter 的配合"""
+
+    def setUp(self):
+        self.router = OrderShardRouter()
+
+    def _buyer_on(self, alias):
+        while True:
+            buyer_uuid = uuid.uuid4()
+            if shard_for_buyer(buyer_uuid) == alias:
+                return buyer_uuid
+
+    def test_shard_router_runs_before_replica_router(self, read_db):
+        self.assertEqual(settings.DATABASE_ROUTERS[0], 'order.sharding.OrderShardRouter')
+
+    def test_sharded_read_uses_replica_of_buyer_shard(self, read_db):
+        order = Order(buyer_uuid=self._buyer_on('order_shard_1'))
+        self.assertEqual(self.router.db_for_read(Order, instance=order), 'order_shard_1_replica_1')
+        self.assertEqual(self.router.db_for_write(Order, instance=order), 'order_shard_1')
+
+    def test_sharded_read_keeps_bound_database(self, read_db):
+        order = Order(buyer_uuid=uuid.uuid4())
+        order._state.db = 'order_shard_1'
+        self.assertEqual(self.router.db_for_read(PayAttempt, instance=order), 'order_shard_1')
+        read_db.assert_not_called()
+
+    def test_sharded_read_without_hint_stays_on_default_shard(self, read_db):
+        self.assertEqual(self.router.db_for_read(Order), 'default_replica_1')
+        self.assertEqual(self.router.db_for_write(Order), 'default')
+
+    def test_unsharded_read_defers_to_replica_router(self, read_db):
+        self.assertIsNone(self.router.db_for_read(IdempotencyRecord))
+        self.assertEqual(self.router.db_for_write(IdempotencyRecord), 'default')
+
+
+class PayAttemptLeaseTests(TestCase):
+    """run_pay_attempt 与租约清理器"""
+
+    def setUp(self):
+        self.order = Order.objects.create(
+            buyer_uuid=uuid.uuid4(), seller_uuid=uuid.uuid4(), total_amount=Decimal('20.00'), status=0
+        )
+        self.attempt = self.order.pay_attempts.create(buyer_uuid=self.order.buyer_uuid, payment_method='alipay')
+
+    def _reap_during_call(self, *args):
+        """模拟支付服务调用超过租约：调用期间清理器将尝试标记为失败"""
+        PayAttempt.objects.filter(pk=self.attempt.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        tasks.pay_attempt_reapers[0].run_once(pause=0)
+        self.assertEqual(PayAttempt.objects.get(pk=self.attempt.pk).status, 3)
+        return {'success': True, 'data': {'payment_uuid': 'p1'}}
+
+    def test_success_after_reaped_attempt_is_recorded(self):
+        with mock.patch.object(tasks, 'request_payment', side_effect=self._reap_during_call):
+            tasks.run_pay_attempt(self.attempt.attempt_id)
+        self.attempt.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 1)
+        self.assertEqual(self.attempt.status, 2)
+        self.assertEqual(self.attempt.result, {'payment_uuid': 'p1'})
+
+    def test_failure_after_reaped_attempt_stays_failed(self):
+        def reap_and_fail(*args):
+            self._reap_during_call()
+            return {'success': False, 'error': '余额不足'}
+
+        with mock.patch.object(tasks, 'request_payment', side_effect=reap_and_fail):
+            tasks.run_pay_attempt(self.attempt.attempt_id)
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.status, 3)
+        self.assertEqual(self.attempt.error, '支付处理超时，请重新发起支付')
+
+
+def buyer_on(alias):
+    while True:
+        buyer_uuid = uuid.uuid4()
+        if shard_for_buyer(buyer_uuid) == alias:
+            return buyer_uuid
+
+
+@unittest.skipUnless(len(settings.ORDER_SHARDS) > 1, '需配置 ORDER_SHARD_COUNT > 1')
+class ShardedOrderTests(TestCase):
+    """分片模型的写入与跨分片查找"""
+    databases = set(settings.ORDER_SHARDS)
+
+    def _create(self, alias, **fields):
+        order = Order(buyer_uuid=buyer_on(alias), seller_uuid=uuid.uuid4(), total_amount=Decimal('20.00'), **fields)
+        order.save()
+        return order
+
+    def test_save_writes_to_buyer_shard(self):
+        for alias in settings.ORDER_SHARDS:
+            order = self._create(alias)
+            self.assertEqual(order._state.db, alias)
+            self.assertEqual(shard_hint_for_order_id(order.order_id), alias)
+            self.assertEqual(shard_hint_for_order_uuid(order.order_uuid), alias)
+            item = order.order_items.create(
+                product_uuid=uuid.uuid4(), product_name='商品', product_price=Decimal('20.00'), price=Decimal('20.00')
+            )
+            self.assertEqual(shard_hint_for_order_id(item.id), alias)
+            for other in settings.ORDER_SHARDS:
+                self.assertEqual(Order.objects.using(other).filter(pk=order.pk).exists(), other == alias)
+                self.assertEqual(OrderItem.objects.using(other).filter(pk=item.pk).exists(), other == alias)
+            # 卖家订单索引只在 default 库
+            self.assertTrue(SellerOrderIndex.objects.using('default').filter(order_id=order.order_id).exists())
+
+    def test_save_retries_on_id_collision(self):
+        alias = settings.ORDER_SHARDS[-1]
+        existing = self._create(alias)
+        new_id = next_id(alias)
+        with mock.patch('order.models.next_id', side_effect=[existing.order_id, new_id]):
+            order = self._create(alias)
+        self.assertEqual(order.order_id, new_id)
+        self.assertEqual(Order.objects.using(alias).count(), 2)
+
+        with mock.patch('order.models.next_id', return_value=existing.order_id) as colliding_id:
+            with self.assertRaises(IntegrityError):
+                self._create(alias)
+        self.assertEqual(colliding_id.call_count, ID_COLLISION_RETRIES)
+        self.assertEqual(Order.objects.using(alias).count(), 2)
+
+    def test_find_order_falls_back_to_other_shards(self):
+        first, last = settings.ORDER_SHARDS[0], settings.ORDER_SHARDS[-1]
+        order = self._create(last)
+
+        # 提示分片命中时只查询该分片
+        with self.assertNumQueries(0, using=first), self.assertNumQueries(1, using=last):
+            self.assertEqual(find_order(last, order_uuid=order.order_uuid).pk, order.pk)
+        # 提示错误（分片前的数据）时依次查询其余分片
+        with self.assertNumQueries(1, using=first), self.assertNumQueries(1, using=last):
+            self.assertEqual(find_order(first, order_uuid=order.order_uuid).pk, order.pk)
+        self.assertEqual(find_order(None, order_id=order.order_id).pk, order.pk)
+
+        with self.assertRaises(Order.DoesNotExist):
+            find_order(last, order_uuid=uuid.uuid4())
+        with self.assertRaises(Order.DoesNotExist):
+            find_order(last, archived=True, order_uuid=order.order_uuid)
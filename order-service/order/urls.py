@@ -10,10 +10,13 @@ urlpatterns = [
     path('sold/', views.OrderSoldListAPIView.as_view(), name='order-sold-list'),  # GET /api/orders/sold/
     path('<str:order_id>/', views.OrderDetailAPIView.as_view(), name='order-detail'),  # GET/PUT /api/orders/{order_id}/
     path('<str:order_id>/cancel/', views.OrderCancelAPIView.as_view(), name='order-cancel'),  # PUT /api/orders/{order_id}/cancel/
+    path('<str:order_id>/pay/', views.OrderPayAPIView.as_view(), name='order-pay'),  # POST /api/orders/{order_id}/pay/
+    path('pay-attempts/<uuid:attempt_uuid>/', views.PayAttemptStatusAPIView.as_view(), name='order-pay-attempt'),  # GET /api/orders/pay-attempts/{attempt_uuid}/
     path('<str:order_id>/complete/', views.OrderCompleteAPIView.as_view(), name='order-complete'),  # PUT /api/orders/{order_id}/complete/
     path('stats/', views.OrderStatsAPIView.as_view(), name='order-stats'),  # GET /api/orders/stats/
 
     # 微服务内部通信接口
+    path('internal/batch/', views.OrderInternalBatchAPIView.as_view(), name='order-internal-batch'),
     path('internal/<uuid:order_uuid>/', views.OrderDetailByUUIDAPIView.as_view(), name='order-detail-by-uuid'),
     path('internal/orders/<uuid:order_uuid>/', views.OrderInternalAPIView.as_view(), name='order-internal-api'),
 ]
@@ -15,9 +15,16 @@ from rest_framework.generics import (
 )
 from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Count, Sum, Q
-from .models import Order, OrderItem
+from django.conf import settings
+from .models import Order, OrderItem, PayAttempt, IdempotencyRecord, SellerOrderIndex
+from .sharding import (
+    shard_for_buyer, shard_hint_for_order_id, shard_hint_for_order_uuid,
+    orders_for_buyer, find_order, find_order_with_archive, fetch_orders
+)
 
 # 添加公共模块路径 - 必须在导入 serializers 之前
 import sys
@@ -45,11 +52,16 @@ if PARENT_DIR not in sys.path:
 
 # 现在可以安全地导入依赖 common 模块的 serializers
 from .serializers import (
-    OrderListSerializer, OrderDetailSerializer, CreateOrderSerializer
+    OrderListSerializer, OrderDetailSerializer, CreateOrderSerializer, PayAttemptSerializer
 )
+from .tasks import request_payment, mark_order_paid, submit_pay_attempt, active_pay_attempts
 from common.service_client import service_client
+from common.notification_client import notify
 from common.microservice_base import MicroserviceBaseView
+from common.idempotency import idempotent
+from common.db_router import replica_reads
 import uuid
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -76,7 +88,7 @@ class OrderListCreateAPIView(ListCreateAPIView, MicroserviceBaseView):
             return Order.objects.none()
 
         status_filter = getattr(self.request, 'query_params', {}).get('status')
-        queryset = Order.objects.filter(buyer_uuid=user_uuid).prefetch_related('order_items')
+        queryset = orders_for_buyer(user_uuid).prefetch_related('order_items')
 
         if status_filter and status_filter != 'all':
             status_map = {
@@ -101,6 +113,7 @@ class OrderListCreateAPIView(ListCreateAPIView, MicroserviceBaseView):
 
         return queryset
 
+    @replica_reads
     def list(self, request, *args, **kwargs):
         """返回订单列表 - 兼容原有API响应格式"""
         queryset = self.get_queryset()
@@ -126,12 +139,15 @@ class OrderListCreateAPIView(ListCreateAPIView, MicroserviceBaseView):
             return CreateOrderSerializer
         return OrderListSerializer
 
+    @idempotent(IdempotencyRecord)
     def create(self, request, *args, **kwargs):
         """创建订单
 
         微服务通信点：
         1. 调用ProductService验证商品信息和库存
         2. 创建订单后调用NotificationService发送通知
+
+        支持 Idempotency-Key 请求头：重试时直接回放首次响应，不重复下单
         """
     # 微服务通信：从Spring Cloud Gateway获取用户UUID
         user_uuid = self.get_user_uuid_from_request()
@@ -170,19 +186,13 @@ class OrderListCreateAPIView(ListCreateAPIView, MicroserviceBaseView):
         order = serializer.save()
 
         # 创建订单后发送通知（内部接口）
-        try:
-            service_client.post('NotificationService', '/api/internal/notifications/create/', {
-                'user_uuid': str(user_uuid),
-                'title': '订单创建成功',
-                'content': f'您的订单 {order.order_id} 已创建成功，等待支付',
-                'type': 'transaction',
-                'related_id': str(order.order_id),
-                'related_data': {
-                    'total_amount': str(order.total_amount)
-                }
-            })
-        except Exception as e:
-            logger.warning(f"发送订单创建通知失败: {e}")
+        notify(
+            user_uuid,
+            '订单创建成功',
+            f'您的订单 {order.order_id} 已创建成功，等待支付',
+            related_id=order.order_id,
+            related_data={'total_amount': str(order.total_amount)}
+        )
 
         response_serializer = OrderDetailSerializer(order)
         return Response({
@@ -199,18 +209,31 @@ class OrderDetailAPIView(RetrieveUpdateDestroyAPIView, MicroserviceBaseView):
     # permission_classes = [IsAuthenticated]
     lookup_field = 'order_id'
 
-    def get_queryset(self):
-        """只能访问自己的订单（作为买家或卖家）"""
+    def get_object(self, include_archived=False):
+        """只能访问自己的订单（作为买家或卖家），按订单ID中的分片号定位分片
+
+        include_archived=True 时在线订单不存在则返回归档订单（只读）
+        """
         user_uuid = self.get_user_uuid_from_request()
+        order_id = self.kwargs[self.lookup_field]
         if not user_uuid:
-            return Order.objects.none()
-        return Order.objects.filter(
-            Q(buyer_uuid=user_uuid) | Q(seller_uuid=user_uuid)
-        ).prefetch_related('order_items')
+            raise Http404
+        lookup = find_order_with_archive if include_archived else find_order
+        try:
+            order = lookup(
+                shard_hint_for_order_id(order_id),
+                Q(buyer_uuid=user_uuid) | Q(seller_uuid=user_uuid),
+                prefetch=True,
+                order_id=order_id
+            )
+        except (Order.DoesNotExist, TypeError, ValueError):
+            raise Http404
+        self.check_object_permissions(self.request, order)
+        return order
 
     def retrieve(self, request, *args, **kwargs):
         """获取订单详情 - 兼容原有API响应格式"""
-        instance = self.get_object()
+        instance = self.get_object(include_archived=True)
         serializer = self.get_serializer(instance)
         return Response({
             'code': '200',
@@ -233,20 +256,14 @@ class OrderDetailAPIView(RetrieveUpdateDestroyAPIView, MicroserviceBaseView):
 
         # 状态变更通知
         if old_status != updated_order.status:
-            try:
-                status_messages = {0: '等待支付', 1: '已支付', 2: '已完成', 3: '已取消'}
-                service_client.post('NotificationService', '/api/internal/notifications/create/', {
-                    'user_uuid': str(updated_order.buyer_uuid),
-                    'title': '订单状态更新',
-                    'content': f'您的订单 {updated_order.order_id} 状态已更新为：{status_messages.get(updated_order.status, "未知")}',
-                    'type': 'transaction',
-                    'related_id': str(updated_order.order_id),
-                    'related_data': {
-                        'status': updated_order.status
-                    }
-                })
-            except Exception as e:
-                logger.warning(f"发送订单状态变更通知失败: {e}")
+            status_messages = {0: '等待支付', 1: '已支付', 2: '已完成', 3: '已取消'}
+            notify(
+                updated_order.buyer_uuid,
+                '订单状态更新',
+                f'您的订单 {updated_order.order_id} 状态已更新为：{status_messages.get(updated_order.status, "未知")}',
+                related_id=updated_order.order_id,
+                related_data={'status': updated_order.status}
+            )
 
         return Response({
             'code': '200',
@@ -281,11 +298,7 @@ class OrderCancelAPIView(GenericAPIView, MicroserviceBaseView):
         if not user_uuid:
             return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        order = get_object_or_404(
-            Order,
-            order_id=order_id,
-            buyer_uuid=user_uuid
-        )
+        order = get_object_or_404(orders_for_buyer(user_uuid), order_id=order_id)
 
         # 只有未支付的订单才能取消
         if order.status != 0:
@@ -297,25 +310,23 @@ class OrderCancelAPIView(GenericAPIView, MicroserviceBaseView):
         order.save()
 
         # 取消订单通知
-        try:
-            service_client.post('NotificationService', '/api/internal/notifications/create/', {
-                'user_uuid': str(user_uuid),
-                'title': '订单已取消',
-                'content': f'您的订单 {order.order_id} 已成功取消',
-                'type': 'transaction',
-                'related_id': str(order.order_id),
-                'related_data': {
-                    'action': 'cancelled'
-                }
-            })
-        except Exception as e:
-            logger.warning(f"发送订单取消通知失败: {e}")
+        notify(
+            user_uuid,
+            '订单已取消',
+            f'您的订单 {order.order_id} 已成功取消',
+            related_id=order.order_id,
+            related_data={'action': 'cancelled'}
+        )
 
         return Response({'message': '订单已取消'})
 
 
 class OrderPayAPIView(GenericAPIView, MicroserviceBaseView):
-    """订单支付"""
+    """订单支付
+
+    默认同步调用PaymentService；请求携带 async=true 或 Prefer: respond-async 时
+    改为异步模式：登记支付尝试并入队，立即返回 202 及尝试ID，结果通过状态接口查询
+    """
     # permission_classes = [IsAuthenticated]
 
     def post(self, request, order_id):
@@ -323,11 +334,7 @@ class OrderPayAPIView(GenericAPIView, MicroserviceBaseView):
         if not user_uuid:
             return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        order = get_object_or_404(
-            Order,
-            order_id=order_id,
-            buyer_uuid=user_uuid
-        )
+        order = get_object_or_404(orders_for_buyer(user_uuid), order_id=order_id)
 
         # 只有未支付的订单才能支付
         if order.status != 0:
@@ -337,20 +344,16 @@ class OrderPayAPIView(GenericAPIView, MicroserviceBaseView):
 
         payment_method = request.data.get('payment_method', 'alipay')
 
+        if self._is_async_request(request):
+            return self._enqueue_payment(order, user_uuid, payment_method)
+
         # 调用PaymentService内部API创建并处理支付
         try:
-            payment_result = service_client.post('PaymentService', '/api/payment/create/', {
-                'order_uuid': str(order.order_uuid),
-                'payment_method': payment_method,
-                'amount': str(order.total_amount),
-                'payment_subject': f'订单支付 - {order.order_id}'
-            })
+            payment_result = request_payment(order, user_uuid, payment_method)
 
             if payment_result and payment_result.get('success'):
                 # 内部API会处理状态更新和回写，本服务可根据需要更新本地状态
-                order.status = 1
-                order.payment_time = timezone.now()
-                order.save()
+                mark_order_paid(order)
 
                 return Response({
                     'message': '支付成功',
@@ -368,6 +371,81 @@ class OrderPayAPIView(GenericAPIView, MicroserviceBaseView):
                 'error': '支付系统暂时不可用，请稍后重试'
             }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
 
+    def _is_async_request(self, request):
+        """判断是否请求异步支付"""
+        if 'respond-async' in request.headers.get('Prefer', ''):
+            return True
+        flag = request.data.get('async', request.query_params.get('async'))
+        if flag is None:
+            return getattr(settings, 'ORDER_PAY_ASYNC_DEFAULT', False)
+        return str(flag).lower() in ('1', 'true', 'yes')
+
+    def _enqueue_payment(self, order, user_uuid, payment_method):
+        """登记支付尝试并入队，同一订单已有租约内的进行中尝试时直接复用"""
+        using = order._state.db
+        with transaction.atomic(using=using):
+            # 锁定订单行，串行化同一订单的并发登记
+            list(Order.objects.using(using).select_for_update().filter(order_id=order.order_id).values_list('pk'))
+            attempt = active_pay_attempts(order).first()
+            created = attempt is None
+            if created:
+                # 通过关联管理器创建，与订单落在同一分片
+                attempt = order.pay_attempts.create(
+                    buyer_uuid=user_uuid,
+                    payment_method=payment_method
+                )
+        # 提交后再入队，确保后台线程能读到新登记的尝试
+        if created and not submit_pay_attempt(attempt):
+            return Response({
+                'error': '支付系统繁忙，请稍后重试'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        attempt.order = order  # 复用已加载的订单，避免序列化时再次查询
+        response = Response({
+            'code': '202',
+            'message': '支付请求已受理',
+            'data': PayAttemptSerializer(attempt).data
+        }, status=status.HTTP_202_ACCEPTED)
+        response['Location'] = f'/api/orders/pay-attempts/{attempt.attempt_uuid}/'
+        return response
+
+
+class PayAttemptStatusAPIView(GenericAPIView, MicroserviceBaseView):
+    """异步支付结果查询
+
+    支持长轮询：?wait=<秒> 时在结果落定前最多等待指定时长
+    """
+    # permission_classes = [IsAuthenticated]
+    poll_interval = 0.5
+
+    def get(self, request, attempt_uuid):
+        user_uuid = self.get_user_uuid_from_request()
+        if not user_uuid:
+            return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        attempt = get_object_or_404(
+            PayAttempt.objects.using(shard_for_buyer(user_uuid)).select_related('order'),
+            attempt_uuid=attempt_uuid,
+            buyer_uuid=user_uuid
+        )
+
+        try:
+            wait = float(request.query_params.get('wait', 0))
+        except (TypeError, ValueError):
+            wait = 0
+        wait = min(max(wait, 0), getattr(settings, 'ORDER_PAY_LONG_POLL_MAX', 30))
+
+        deadline = time.monotonic() + wait
+        while attempt.status in (0, 1) and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            attempt.refresh_from_db(fields=['status', 'result', 'error', 'updated_at'])
+
+        return Response({
+            'code': '200',
+            'message': 'success',
+            'data': PayAttemptSerializer(attempt).data
+        })
+
 
 class OrderCompleteAPIView(GenericAPIView, MicroserviceBaseView):
     """完成订单"""
@@ -378,11 +456,7 @@ class OrderCompleteAPIView(GenericAPIView, MicroserviceBaseView):
         if not user_uuid:
             return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        order = get_object_or_404(
-            Order,
-            order_id=order_id,
-            buyer_uuid=user_uuid
-        )
+        order = get_object_or_404(orders_for_buyer(user_uuid), order_id=order_id)
 
         # 只有已支付的订单才能完成
         if order.status != 1:
@@ -394,19 +468,13 @@ class OrderCompleteAPIView(GenericAPIView, MicroserviceBaseView):
         order.save()
 
         # 完成订单通知
-        try:
-            service_client.post('NotificationService', '/api/internal/notifications/create/', {
-                'user_uuid': str(user_uuid),
-                'title': '订单已完成',
-                'content': f'您的订单 {order.order_id} 已完成',
-                'type': 'transaction',
-                'related_id': str(order.order_id),
-                'related_data': {
-                    'action': 'completed'
-                }
-            })
-        except Exception as e:
-            logger.warning(f"发送订单完成通知失败: {e}")
+        notify(
+            user_uuid,
+            '订单已完成',
+            f'您的订单 {order.order_id} 已完成',
+            related_id=order.order_id,
+            related_data={'action': 'completed'}
+        )
 
         return Response({'message': '订单已完成'})
 
@@ -417,8 +485,12 @@ class OrderDetailByUUIDAPIView(RetrieveAPIView, MicroserviceBaseView):
     # permission_classes = [AllowAny]  # 内部API不需要用户认证
     lookup_field = 'order_uuid'
 
-    def get_queryset(self):
-        return Order.objects.all().prefetch_related('order_items')
+    def get_object(self):
+        order_uuid = self.kwargs[self.lookup_field]
+        try:
+            return find_order_with_archive(shard_hint_for_order_uuid(order_uuid), prefetch=True, order_uuid=order_uuid)
+        except (Order.DoesNotExist, ValueError):
+            raise Http404
 
     def retrieve(self, request, *args, **kwargs):
         """获取订单详情"""
@@ -434,13 +506,14 @@ class OrderStatsAPIView(GenericAPIView, MicroserviceBaseView):
     """订单统计"""
     # permission_classes = [IsAuthenticated]
 
+    @replica_reads
     def get(self, request):
         user_uuid = self.get_user_uuid_from_request()
         if not user_uuid:
             return Response({'error': '用户身份验证失败'}, status=status.HTTP_401_UNAUTHORIZED)
 
         # 统计用户订单数据
-        orders = Order.objects.filter(buyer_uuid=user_uuid)
+        orders = orders_for_buyer(user_uuid)
 
         stats = {
             'total_orders': orders.count(),
@@ -467,9 +540,9 @@ class OrderInternalAPIView(GenericAPIView):
     # permission_classes = [AllowAny]  # 内部API不需要用户认证
 
     def get(self, request, order_uuid):
-        """获取订单信息 - 供PaymentService等调用"""
+        """获取订单信息 - 供PaymentService等调用（含已归档订单）"""
         try:
-            order = Order.objects.get(order_uuid=order_uuid)
+            order = find_order_with_archive(shard_hint_for_order_uuid(order_uuid), order_uuid=order_uuid)
             serializer = OrderDetailSerializer(order)
             return Response({
                 'success': True,
@@ -484,7 +557,7 @@ class OrderInternalAPIView(GenericAPIView):
     def patch(self, request, order_uuid):
         """更新订单状态 - 供PaymentService调用"""
         try:
-            order = Order.objects.get(order_uuid=order_uuid)
+            order = find_order(shard_hint_for_order_uuid(order_uuid), order_uuid=order_uuid)
 
             # 只允许更新特定字段
             allowed_fields = ['status', 'payment_time']
@@ -498,19 +571,13 @@ class OrderInternalAPIView(GenericAPIView):
 
             # 发送状态变更通知（内部接口）
             if 'status' in update_data:
-                try:
-                    service_client.post('NotificationService', '/api/internal/notifications/create/', {
-                        'user_uuid': str(order.buyer_uuid),
-                        'title': '订单状态更新',
-                        'content': f'您的订单 {order.order_id} 状态已更新',
-                        'type': 'transaction',
-                        'related_id': str(order.order_id),
-                        'related_data': {
-                            'status': order.status
-                        }
-                    })
-                except Exception as e:
-                    logger.warning(f"发送订单状态变更通知失败: {e}")
+                notify(
+                    order.buyer_uuid,
+                    '订单状态更新',
+                    f'您的订单 {order.order_id} 状态已更新',
+                    related_id=order.order_id,
+                    related_data={'status': order.status}
+                )
 
             return Response({
                 'success': True,
@@ -523,6 +590,53 @@ class OrderInternalAPIView(GenericAPIView):
             }, status=status.HTTP_404_NOT_FOUND)
 
 
+class OrderInternalBatchAPIView(GenericAPIView):
+    """内部订单批量查询 - 供PaymentService对账等批处理调用
+
+    POST {"order_uuids": [...]}，只返回核对所需的轻量字段，单次最多查询 ORDER_INTERNAL_BATCH_MAX 条
+    """
+    # permission_classes = [AllowAny]  # 内部API不需要用户认证
+
+    @replica_reads
+    def post(self, request):
+        order_uuids = request.data.get('order_uuids') or []
+        max_size = getattr(settings, 'ORDER_INTERNAL_BATCH_MAX', 1000)
+        if not isinstance(order_uuids, list) or len(order_uuids) > max_size:
+            return Response({
+                'success': False,
+                'error': f'order_uuids 必须为列表且不超过 {max_size} 条'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            valid_uuids = [uuid.UUID(str(value)) for value in order_uuids]
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': '订单UUID格式错误'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        fields = ('order_id', 'order_uuid', 'buyer_uuid', 'status', 'total_amount', 'payment_time')
+        orders = fetch_orders(valid_uuids, 'order_uuid', shard_hint_for_order_uuid, only=fields)
+        missing = [value for value in valid_uuids if value not in orders]
+        if missing:
+            # 已归档订单（对账等批处理仍需核对）
+            orders.update(fetch_orders(missing, 'order_uuid', shard_hint_for_order_uuid, only=fields, archived=True))
+        data = {
+            str(order.order_uuid): {
+                'order_id': order.order_id,
+                'buyer_uuid': str(order.buyer_uuid),
+                'status': order.status,
+                'total_amount': str(order.total_amount),
+                'payment_time': order.payment_time.isoformat() if order.payment_time else None,
+            }
+            for order in orders.values()
+        }
+        return Response({
+            'success': True,
+            'data': data
+        })
+
+
 # 兼容性视图 - 保持与原有API的兼容性
 class OrderListAPIView(ListAPIView, MicroserviceBaseView):
     """订单列表 - 兼容原有API /api/orders/"""
@@ -535,8 +649,9 @@ class OrderListAPIView(ListAPIView, MicroserviceBaseView):
         if not user_uuid:
             return Order.objects.none()
 
-        return Order.objects.filter(buyer_uuid=user_uuid).order_by('-created_at')
+        return orders_for_buyer(user_uuid).order_by('-created_at')
 
+    @replica_reads
     def list(self, request, *args, **kwargs):
         """返回订单列表 - 兼容原有API响应格式"""
         queryset = self.get_queryset()
@@ -565,13 +680,13 @@ class OrderSoldListAPIView(ListAPIView, MicroserviceBaseView):
     # permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        """获取当前用户作为卖家的所有订单"""
+        """获取当前用户作为卖家的订单索引（default 库），订单本身在 list 中按分片读取"""
         user_uuid = self.get_user_uuid_from_request()
         if not user_uuid:
-            return Order.objects.none()
+            return SellerOrderIndex.objects.none()
 
         status_filter = getattr(self.request, 'query_params', {}).get('status')
-        queryset = Order.objects.filter(seller_uuid=user_uuid).prefetch_related('order_items')
+        queryset = SellerOrderIndex.objects.filter(seller_uuid=user_uuid)
 
         if status_filter and status_filter != 'all':
             status_map = {
@@ -596,22 +711,29 @@ class OrderSoldListAPIView(ListAPIView, MicroserviceBaseView):
 
         return queryset
 
+    @replica_reads
     def list(self, request, *args, **kwargs):
         """返回卖家订单列表 - 兼容原有API响应格式"""
         queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
 
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
+            serializer = self.get_serializer(self._load_orders(page), many=True)
             return self.get_paginated_response({
                 'code': '200',
                 'message': 'success',
                 'data': serializer.data
             })
 
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(self._load_orders(queryset), many=True)
         return Response({
             'code': '200',
             'message': 'success',
             'data': serializer.data
         })
+
+    def _load_orders(self, index_rows):
+        """按索引行从各分片读取订单，保持索引的排序"""
+        order_ids = [row.order_id for row in index_rows]
+        orders = fetch_orders(order_ids, 'order_id', shard_hint_for_order_id, prefetch=True)
+        return [orders[order_id] for order_id in order_ids if order_id in orders]
@@ -25,6 +25,9 @@ if not COMMON_DIR.exists():
     )
 
 sys.path.insert(0, str(COMMON_DIR))
+# 同时加入 common 的上级目录，使 common 可以按包导入（common.xxx）
+if str(COMMON_DIR.parent) not in sys.path:
+    sys.path.insert(0, str(COMMON_DIR.parent))
 
 # 导入公共配置（避免与当前config包冲突）
 import importlib.util
@@ -46,6 +49,7 @@ try:
     common_config = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(common_config)
     DATABASE_CONFIG = common_config.DATABASE_CONFIG
+    DATABASE_REPLICA_CONFIG = common_config.DATABASE_REPLICA_CONFIG
     NACOS_CONFIG = common_config.NACOS_CONFIG
     SERVICES = common_config.SERVICES
 except Exception as e:
@@ -85,6 +89,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'common.db_router.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -112,6 +117,17 @@ DATABASES = {
     'default': DATABASE_CONFIG['PAYMENT_DB']
 }
 
+# 只读副本：PAYMENT_DB_REPLICA_HOSTS 配置后，标记 @replica_reads 的只读接口读副本（common/db_router.py）
+DATABASE_REPLICAS = {}
+_replicas = common_config.replica_databases('default', DATABASE_REPLICA_CONFIG['PAYMENT_DB'])
+DATABASES.update(_replicas)
+DATABASE_REPLICAS['default'] = list(_replicas)
+DATABASE_REPLICA_MAX_LAG = int(os.getenv('DATABASE_REPLICA_MAX_LAG', 2))  # 秒，超过则回退主库
+DATABASE_REPLICA_CHECK_INTERVAL = int(os.getenv('DATABASE_REPLICA_CHECK_INTERVAL', 5))  # 延迟检查间隔（秒）
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DATABASE_REPLICA_PIN_SECONDS', 5))  # 写后读主库时长（秒）
+
+DATABASE_ROUTERS = ['common.db_router.ReplicaRouter']
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -164,6 +180,30 @@ SERVICE_NAME = 'payment-service'
 SERVICE_PORT = SERVICES['PAYMENT_SERVICE']['port']
 SERVICE_VERSION = SERVICES['PAYMENT_SERVICE']['version']
 
+# 支付配置
+PAYMENT_EXPIRE_MINUTES = int(os.getenv('PAYMENT_EXPIRE_MINUTES', 30))  # 待支付记录有效期（分钟）
+PAYMENT_CALLBACK_WORKERS = int(os.getenv('PAYMENT_CALLBACK_WORKERS', 4))  # 回调副作用处理线程数
+PAYMENT_CALLBACK_QUEUE_SIZE = int(os.getenv('PAYMENT_CALLBACK_QUEUE_SIZE', 5000))  # 回调副作用队列上限
+PAYMENT_CALLBACK_LEASE_SECONDS = int(os.getenv('PAYMENT_CALLBACK_LEASE_SECONDS', 60))  # 回调处理租约（秒），处理中断后到期可被重新认领
+
+# 过期待支付记录清理配置
+PAYMENT_EXPIRY_BATCH_SIZE = int(os.getenv('PAYMENT_EXPIRY_BATCH_SIZE', 500))  # 每批处理条数
+PAYMENT_EXPIRY_BATCH_PAUSE = float(os.getenv('PAYMENT_EXPIRY_BATCH_PAUSE', 0.2))  # 批次间暂停（秒），限制写入速率
+PAYMENT_EXPIRY_SWEEP_INTERVAL = int(os.getenv('PAYMENT_EXPIRY_SWEEP_INTERVAL', 0))  # 进程内定时清理间隔（秒），0 表示不启用
+
+# 退款批处理配置
+PAYMENT_REFUND_BATCH_SIZE = int(os.getenv('PAYMENT_REFUND_BATCH_SIZE', 100))  # 每批认领条数
+PAYMENT_REFUND_CONCURRENCY = int(os.getenv('PAYMENT_REFUND_CONCURRENCY', 8))  # 同时调用支付渠道的最大并发数
+PAYMENT_REFUND_MAX_ATTEMPTS = int(os.getenv('PAYMENT_REFUND_MAX_ATTEMPTS', 5))  # 渠道异常时的最大尝试次数
+# 模拟退款渠道：尚未对接支付宝/微信退款接口，开启后渠道调用直接返回成功，仅限开发/测试环境；
+# 未开启时 process_refunds 不认领退款，退款申请保持待处理
+PAYMENT_REFUND_PROVIDER_MOCK = os.getenv('PAYMENT_REFUND_PROVIDER_MOCK', 'False').lower() == 'true'
+
+# 支付归档（python manage.py archive_payments）
+PAYMENT_ARCHIVE_AFTER_DAYS = int(os.getenv('PAYMENT_ARCHIVE_AFTER_DAYS', 365))  # 终态支付记录保留在线表的天数
+PAYMENT_ARCHIVE_BATCH_SIZE = int(os.getenv('PAYMENT_ARCHIVE_BATCH_SIZE', 500))  # 每批归档条数
+PAYMENT_ARCHIVE_BATCH_PAUSE = float(os.getenv('PAYMENT_ARCHIVE_BATCH_PAUSE', 0.5))  # 批次间暂停（秒）
+
 # 日志配置
 LOGGING = {
     'version': 1,
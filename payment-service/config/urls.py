@@ -5,6 +5,7 @@ URL configuration for payment service project.
 from django.contrib import admin
 from django.urls import path, include
 from django.http import JsonResponse
+from common.metrics import metrics_view
 
 
 def health(_request):
@@ -13,6 +14,7 @@ def health(_request):
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('health/', health),
+    path('metrics/', metrics_view),
     # 支付接口 - 兼容原有 /api/payment/ 路径
     path('api/payment/', include('payment.urls')),
 ]
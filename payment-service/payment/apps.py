@@ -20,6 +20,17 @@ class PaymentConfig(AppConfig):
         if 'runserver' in sys.argv:
             # 延迟注册，确保服务完全启动并获取到实际端口
             threading.Timer(3.0, self._register_service).start()
+            self._start_expiry_sweeper()
+
+    def _start_expiry_sweeper(self):
+        """进程内定时清理过期待支付记录（PAYMENT_EXPIRY_SWEEP_INTERVAL > 0 时启用）"""
+        from django.conf import settings
+        interval = getattr(settings, 'PAYMENT_EXPIRY_SWEEP_INTERVAL', 0)
+        # 开发服务器自动重载时只在实际工作进程中启动
+        if interval <= 0 or (os.environ.get('RUN_MAIN') != 'true' and '--noreload' not in sys.argv):
+            return
+        from .tasks import payment_expiry_sweeper
+        payment_expiry_sweeper.start(interval)
 
     def _register_service(self):
         """注册服务到Nacos"""
@@ -0,0 +1,35 @@
+"""
+归档终态且超过保留期的支付记录
+用法: python manage.py archive_payments [--batch-size 500] [--max-batches N] [--pause 0.5] [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from common.archive import ensure_partitions
+from payment.tasks import payment_archiver
+
+
+class Command(BaseCommand):
+    help = '分批将超过保留期的支付记录移入归档表（PAYMENT_ARCHIVE_AFTER_DAYS），并补齐归档表的未来分区'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='每批归档条数')
+        parser.add_argument('--max-batches', type=int, default=None, help='最多归档批数')
+        parser.add_argument('--pause', type=float, default=None, help='批次间暂停秒数（限速）')
+        parser.add_argument('--dry-run', action='store_true', help='只输出可归档数量，不做修改')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f'可归档支付记录: {payment_archiver.backlog()} 条')
+            return
+
+        ensure_partitions(connection, 'payment_archive')
+        stats = payment_archiver.run_once(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            pause=options['pause']
+        )
+        self.stdout.write(
+            f"支付归档完成: 归档 {stats['archived']} 条, 批次 {stats['batches']}, "
+            f"剩余 {stats['remaining']} 条, 耗时 {stats['duration']}s"
+        )
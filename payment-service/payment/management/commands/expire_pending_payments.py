@@ -0,0 +1,38 @@
+"""
+将过期的待支付记录标记为已取消
+用法: python manage.py expire_pending_payments [--batch-size 500] [--max-batches N] [--pause 0.2] [--dry-run] [--loop --interval 60]
+"""
+import time
+from django.core.management.base import BaseCommand
+from payment.tasks import payment_expiry_sweeper
+
+
+class Command(BaseCommand):
+    help = '分批处理已过期的待支付记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='每批处理条数')
+        parser.add_argument('--max-batches', type=int, default=None, help='每轮最多处理批数')
+        parser.add_argument('--pause', type=float, default=None, help='批次间暂停秒数（限速）')
+        parser.add_argument('--dry-run', action='store_true', help='只输出积压数量，不做修改')
+        parser.add_argument('--loop', action='store_true', help='常驻运行')
+        parser.add_argument('--interval', type=int, default=60, help='常驻运行时的间隔（秒）')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f'过期支付积压: {payment_expiry_sweeper.backlog()} 条')
+            return
+
+        while True:
+            stats = payment_expiry_sweeper.run_once(
+                batch_size=options['batch_size'],
+                max_batches=options['max_batches'],
+                pause=options['pause']
+            )
+            self.stdout.write(
+                f"过期支付清理完成: 积压 {stats['backlog']} 条, 处理 {stats['expired']} 条, "
+                f"批次 {stats['batches']}, 剩余 {stats['remaining']} 条, 耗时 {stats['duration']}s"
+            )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
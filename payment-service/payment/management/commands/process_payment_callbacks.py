@@ -0,0 +1,55 @@
+"""
+补偿处理未完成的支付回调副作用（回写订单、发送通知）
+用法: python manage.py process_payment_callbacks [--batch-size 100] [--max-attempts 10] [--loop --interval 30]
+"""
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from payment.models import PaymentCallback
+from payment.tasks import process_callback
+
+
+class Command(BaseCommand):
+    help = '重试处理后台队列未完成的支付回调'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='每批处理条数')
+        parser.add_argument('--max-attempts', type=int, default=10, help='单条回调最大重试次数')
+        parser.add_argument('--min-age', type=int, default=30, help='只处理落库超过该秒数的回调，避免与后台队列抢占')
+        parser.add_argument('--loop', action='store_true', help='常驻运行')
+        parser.add_argument('--interval', type=int, default=30, help='常驻运行时的轮询间隔（秒）')
+
+    def handle(self, *args, **options):
+        while True:
+            processed, failed = self._drain(options)
+            self.stdout.write(f'回调补偿完成: 成功 {processed} 条, 失败 {failed} 条')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def _drain(self, options):
+        processed = failed = 0
+        last_id = 0
+        cutoff = timezone.now() - timedelta(seconds=options['min_age'])
+        while True:
+            # 跳过正被后台队列处理（租约未到期）的回调
+            ids = list(
+                PaymentCallback.objects.filter(
+                    Q(claimed_until__isnull=True) | Q(claimed_until__lte=timezone.now()),
+                    processed=False,
+                    late_capture=False,
+                    attempts__lt=options['max_attempts'],
+                    received_at__lte=cutoff,
+                    callback_id__gt=last_id
+                ).order_by('callback_id').values_list('callback_id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                return processed, failed
+            for callback_id in ids:
+                if process_callback(callback_id):
+                    processed += 1
+                else:
+                    failed += 1
+            last_id = ids[-1]
@@ -0,0 +1,55 @@
+"""
+退款批处理：分批认领待处理退款，限并发调用支付渠道，批量回写结果
+用法: python manage.py process_refunds [--batch-size 100] [--concurrency 8] [--max-batches N] [--loop --interval 10]
+"""
+import time
+from django.core.management.base import BaseCommand
+from payment.tasks import process_refund_batch, requeue_stale_refunds, refund_provider_enabled
+
+
+class Command(BaseCommand):
+    help = '批量处理待处理的退款申请'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='每批认领条数，默认 PAYMENT_REFUND_BATCH_SIZE')
+        parser.add_argument('--concurrency', type=int, default=None, help='渠道调用并发数，默认 PAYMENT_REFUND_CONCURRENCY')
+        parser.add_argument('--max-attempts', type=int, default=None, help='渠道异常时的最大尝试次数')
+        parser.add_argument('--max-batches', type=int, default=0, help='单轮最多处理批数，0 表示处理完为止')
+        parser.add_argument('--stale-minutes', type=int, default=10, help='处理中超过该分钟数的退款重新放回待处理')
+        parser.add_argument('--loop', action='store_true', help='常驻运行')
+        parser.add_argument('--interval', type=int, default=10, help='常驻运行时的轮询间隔（秒）')
+
+    def handle(self, *args, **options):
+        if not refund_provider_enabled():
+            self.stderr.write('未对接退款渠道：开发/测试环境可设置 PAYMENT_REFUND_PROVIDER_MOCK=True 使用模拟渠道')
+            return
+        while True:
+            requeued = requeue_stale_refunds(options['stale_minutes'])
+            if requeued:
+                self.stdout.write(f'重新放回待处理: {requeued} 条')
+            totals = self._drain(options)
+            self.stdout.write(
+                f"退款处理完成: 成功 {totals['succeeded']} 条, 失败 {totals['failed']} 条, "
+                f"待重试 {totals['retrying']} 条, 批次 {totals['batches']}"
+            )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def _drain(self, options):
+        totals = {'succeeded': 0, 'failed': 0, 'retrying': 0, 'batches': 0}
+        while not options['max_batches'] or totals['batches'] < options['max_batches']:
+            stats = process_refund_batch(
+                batch_size=options['batch_size'],
+                concurrency=options['concurrency'],
+                max_attempts=options['max_attempts']
+            )
+            if not stats['claimed']:
+                break
+            totals['batches'] += 1
+            for key in ('succeeded', 'failed', 'retrying'):
+                totals[key] += stats[key]
+            # 重试的退款已放回待处理，本轮不再重复认领
+            if stats['retrying'] == stats['claimed']:
+                break
+        return totals
@@ -0,0 +1,105 @@
+"""
+支付-订单对账
+核对每条支付成功（status=2）的记录在 OrderService 中对应订单是否已进入已支付及之后的状态（status>=1）
+
+- 按 payment_id 键集分页流式读取，内存占用与表大小无关
+- 每批调用订单服务批量接口核对
+- 每批完成后写入检查点，中断后可从检查点继续
+- --repair 时将仍处于待支付的订单回写为已支付
+
+用法: python manage.py reconcile_payments [--chunk-size 500] [--checkpoint PATH] [--reset] [--repair]
+"""
+import json
+import os
+import tempfile
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from payment.models import Payment
+from payment.orders import fetch_orders, service_client
+
+
+class Command(BaseCommand):
+    help = '核对支付成功记录与订单状态，可选修复'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='每批核对条数')
+        parser.add_argument('--checkpoint', default='logs/reconcile_payments.checkpoint', help='检查点文件路径')
+        parser.add_argument('--reset', action='store_true', help='忽略检查点，从头开始')
+        parser.add_argument('--repair', action='store_true', help='将仍为待支付的订单回写为已支付')
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint']
+        chunk_size = options['chunk_size']
+        last_id = 0 if options['reset'] else self._load_checkpoint(checkpoint)
+        if last_id:
+            self.stdout.write(f'从检查点继续: payment_id > {last_id}')
+
+        checked = mismatched = repaired = 0
+        while True:
+            payments = list(
+                Payment.objects.filter(status=2, payment_id__gt=last_id)
+                .order_by('payment_id')
+                .values_list('payment_id', 'order_uuid', 'amount', 'paid_at')[:chunk_size]
+            )
+            if not payments:
+                break
+
+            orders = fetch_orders(row[1] for row in payments)
+            if orders is None:
+                raise CommandError(f'订单服务不可用，已停止；检查点位于 payment_id={last_id}')
+
+            for payment_id, order_uuid, amount, paid_at in payments:
+                order = orders.get(str(order_uuid))
+                problem = self._check(order, amount)
+                if not problem:
+                    continue
+                mismatched += 1
+                self.stdout.write(f'[不一致] payment_id={payment_id} order_uuid={order_uuid}: {problem}')
+                if options['repair'] and order and order.get('status') == 0:
+                    if self._repair(order_uuid, paid_at):
+                        repaired += 1
+                        self.stdout.write(f'[已修复] order_uuid={order_uuid}')
+
+            checked += len(payments)
+            last_id = payments[-1][0]
+            self._save_checkpoint(checkpoint, last_id)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'对账完成: 核对 {checked} 条, 不一致 {mismatched} 条, 修复 {repaired} 条, 检查点 payment_id={last_id}'
+        ))
+
+    def _check(self, order, amount):
+        """返回不一致原因，一致时返回 None"""
+        if order is None:
+            return '订单不存在'
+        if order.get('status') == 0:
+            return '订单仍为待支付'
+        if order.get('status') == 3:
+            return '订单已取消但支付成功'
+        if order.get('total_amount') is not None and Decimal(str(order['total_amount'])) != amount:
+            return f"金额不一致: 订单 {order['total_amount']} / 支付 {amount}"
+        return None
+
+    def _repair(self, order_uuid, paid_at):
+        """回写订单为已支付（内部接口）"""
+        result = service_client.patch('OrderService', f'/api/orders/internal/orders/{order_uuid}/', {
+            'status': 1,
+            'payment_time': paid_at.isoformat() if paid_at else None
+        })
+        return bool(result and result.get('success'))
+
+    def _load_checkpoint(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return int(json.load(f).get('last_payment_id', 0))
+        except (OSError, ValueError):
+            return 0
+
+    def _save_checkpoint(self, path, last_id):
+        """先写临时文件再替换，避免中断时检查点损坏"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.reconcile-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'last_payment_id': last_id}, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2 on 2026-10-19 16:00
+
+from django.db import migrations, models
+
+
+def cancel_duplicate_pending_payments(apps, schema_editor):
+    """添加唯一约束前，每个订单只保留最新的一条待支付记录，其余标记为已取消"""
+    Payment = apps.get_model('payment', 'Payment')
+    duplicated = (
+        Payment.objects.filter(status=0)
+        .values('order_uuid')
+        .annotate(total=models.Count('payment_id'))
+        .filter(total__gt=1)
+        .values_list('order_uuid', flat=True)
+    )
+    for order_uuid in duplicated.iterator():
+        keep = (
+            Payment.objects.filter(order_uuid=order_uuid, status=0)
+            .order_by('-created_at', '-payment_id')
+            .values_list('payment_id', flat=True)
+            .first()
+        )
+        Payment.objects.filter(order_uuid=order_uuid, status=0).exclude(payment_id=keep).update(
+            status=4,
+            failure_reason='已被新的支付请求取代'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0002_idempotency_record'),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_duplicate_pending_payments, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['order_uuid', 'status'], name='payment_order_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(models.Case(models.When(status=0, then=models.F('order_uuid'))), name='uniq_pending_payment_per_order'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-19 16:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0003_one_pending_payment_per_order'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentCallback',
+            fields=[
+                ('callback_id', models.AutoField(primary_key=True, serialize=False)),
+                ('status', models.SmallIntegerField(choices=[(0, 'pending'), (1, 'processing'), (2, 'success'), (3, 'failed'), (4, 'cancelled')])),
+                ('payment_method', models.CharField(max_length=20)),
+                ('raw_data', models.JSONField(blank=True, default=dict)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed', models.BooleanField(default=False)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='callbacks', to='payment.payment')),
+            ],
+            options={
+                'db_table': 'payment_callback',
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(fields=['processed', 'received_at'], name='payment_callback_pending_idx')],
+                'constraints': [models.UniqueConstraint(fields=('payment', 'status'), name='uniq_payment_callback_status')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-19 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0004_payment_callback'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'expires_at'], name='payment_status_expires_idx'),
+        ),
+    ]
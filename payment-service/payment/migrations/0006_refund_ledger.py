@@ -0,0 +1,64 @@
+# Generated by Django 5.2 on 2026-10-19 16:06
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def migrate_legacy_refunds(apps, schema_editor):
+    """旧退款接口将已退款记录写为 status=3（失败），已付款（paid_at 非空）的失败记录即为历史全额退款"""
+    Payment = apps.get_model('payment', 'Payment')
+    Payment.objects.filter(status=3, paid_at__isnull=False).update(
+        status=5,
+        refunded_amount=models.F('amount')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0005_expiry_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='refunded_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='status',
+            field=models.SmallIntegerField(choices=[(0, 'pending'), (1, 'processing'), (2, 'success'), (3, 'failed'), (4, 'cancelled'), (5, 'refunded')], default=0),
+        ),
+        migrations.AlterField(
+            model_name='paymentcallback',
+            name='status',
+            field=models.SmallIntegerField(choices=[(0, 'pending'), (1, 'processing'), (2, 'success'), (3, 'failed'), (4, 'cancelled'), (5, 'refunded')]),
+        ),
+        migrations.CreateModel(
+            name='Refund',
+            fields=[
+                ('refund_id', models.AutoField(primary_key=True, serialize=False)),
+                ('refund_uuid', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('order_uuid', models.UUIDField()),
+                ('user_uuid', models.UUIDField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('reason', models.CharField(blank=True, default='', max_length=255)),
+                ('status', models.SmallIntegerField(choices=[(0, 'pending'), (1, 'processing'), (2, 'success'), (3, 'failed')], default=0)),
+                ('provider_refund_id', models.CharField(blank=True, max_length=64, null=True)),
+                ('failure_reason', models.CharField(blank=True, max_length=255, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='refunds', to='payment.payment')),
+            ],
+            options={
+                'db_table': 'payment_refund',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'refund_id'], name='payment_refund_status_idx'), models.Index(fields=['order_uuid'], name='payment_refund_order_idx')],
+            },
+        ),
+        migrations.RunPython(migrate_legacy_refunds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2 on 2026-10-19 16:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def backfill_payment_detail(apps, schema_editor):
+    """按主键分块将大字段复制到详情表；已存在的详情行跳过，中断后可重复执行"""
+    Payment = apps.get_model('payment', 'Payment')
+    PaymentDetail = apps.get_model('payment', 'PaymentDetail')
+    last_id = 0
+    while True:
+        rows = list(
+            Payment.objects.filter(payment_id__gt=last_id)
+            .order_by('payment_id')
+            .values_list('payment_id', 'payment_data', 'callback_data', 'failure_reason')[:BACKFILL_CHUNK_SIZE]
+        )
+        if not rows:
+            return
+        PaymentDetail.objects.bulk_create([
+            PaymentDetail(
+                payment_id=payment_id,
+                payment_data=payment_data or {},
+                callback_data=callback_data or {},
+                failure_reason=failure_reason
+            )
+            for payment_id, payment_data, callback_data, failure_reason in rows
+        ], ignore_conflicts=True)
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    # 分块回填逐块提交，避免大表回填时长事务
+    atomic = False
+
+    dependencies = [
+        ('payment', '0006_refund_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentDetail',
+            fields=[
+                ('payment', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='detail', serialize=False, to='payment.payment')),
+                ('payment_data', models.JSONField(blank=True, default=dict)),
+                ('callback_data', models.JSONField(blank=True, default=dict)),
+                ('failure_reason', models.CharField(blank=True, max_length=255, null=True)),
+            ],
+            options={
+                'db_table': 'payment_detail',
+            },
+        ),
+        migrations.RunPython(backfill_payment_detail, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='payment',
+            name='callback_data',
+        ),
+        migrations.RemoveField(
+            model_name='payment',
+            name='failure_reason',
+        ),
+        migrations.RemoveField(
+            model_name='payment',
+            name='payment_data',
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-19 16:10
+
+import common.fields
+import common.uuid_migration
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # UUID 列在线转换为 BINARY(16)，分块回填逐块提交
+    atomic = False
+
+    dependencies = [
+        ('payment', '0007_payment_detail'),
+    ]
+
+    operations = [
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='payment',
+            name='order_uuid',
+            field=common.fields.CompactUUIDField(),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='payment',
+            name='payment_uuid',
+            field=common.fields.CompactUUIDField(default=common.fields.uuid7, editable=False, unique=True),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='payment',
+            name='user_uuid',
+            field=common.fields.CompactUUIDField(),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='refund',
+            name='order_uuid',
+            field=common.fields.CompactUUIDField(),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='refund',
+            name='refund_uuid',
+            field=common.fields.CompactUUIDField(default=common.fields.uuid7, editable=False, unique=True),
+        ),
+        common.uuid_migration.ConvertUUIDToBinary(
+            model_name='refund',
+            name='user_uuid',
+            field=common.fields.CompactUUIDField(),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2 on 2026-10-19 16:25
+
+import common.fields
+from django.db import migrations, models
+
+from common.archive import partition_by_month, remove_partitioning
+
+
+def partition_archive_table(apps, schema_editor):
+    """归档表按 created_at 月份分区（仅 MySQL）"""
+    partition_by_month(schema_editor.connection, 'payment_archive', 'payment_id')
+
+
+def unpartition_archive_table(apps, schema_editor):
+    remove_partitioning(schema_editor.connection, 'payment_archive', 'payment_id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0008_compact_uuid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentArchive',
+            fields=[
+                ('payment_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('payment_uuid', common.fields.CompactUUIDField(db_index=True)),
+                ('order_uuid', common.fields.CompactUUIDField()),
+                ('user_uuid', common.fields.CompactUUIDField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('payment_method', models.SmallIntegerField(choices=[(0, 'alipay'), (1, 'wechat_pay')])),
+                ('status', models.SmallIntegerField(choices=[(0, 'pending'), (1, 'processing'), (2, 'success'), (3, 'failed'), (4, 'cancelled'), (5, 'refunded')])),
+                ('created_at', models.DateTimeField()),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('payment_subject', models.CharField(max_length=255)),
+                ('refunded_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('callback_received', models.BooleanField(default=False)),
+                ('callback_time', models.DateTimeField(blank=True, null=True)),
+                ('payment_data', models.JSONField(blank=True, default=dict)),
+                ('callback_data', models.JSONField(blank=True, default=dict)),
+                ('failure_reason', models.CharField(blank=True, max_length=255, null=True)),
+                ('refunds', models.JSONField(blank=True, default=list)),
+                ('archived_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'payment_archive',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentarchive',
+            index=models.Index(fields=['order_uuid'], name='payment_archive_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentarchive',
+            index=models.Index(fields=['user_uuid', 'created_at'], name='payment_archive_user_idx'),
+        ),
+        migrations.RunPython(partition_archive_table, unpartition_archive_table),
+    ]
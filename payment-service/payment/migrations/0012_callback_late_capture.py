@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-19 16:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0011_callback_claim'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentcallback',
+            name='late_capture',
+            field=models.BooleanField(default=False),
+        ),
+    ]
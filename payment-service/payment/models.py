@@ -2,7 +2,9 @@
 支付服务模型
 """
 from django.db import models
-import uuid
+from django.db.models import Case, F, When
+
+from common.fields import CompactUUIDField, uuid7
 
 
 # 支付方式常量
@@ -18,17 +20,26 @@ PAYMENT_STATUS_CHOICES = (
     (2, 'success'),      # 成功
     (3, 'failed'),       # 失败
     (4, 'cancelled'),    # 已取消
+    (5, 'refunded'),     # 已全额退款
 )
 
+# 回调允许的状态迁移：目标状态 -> 允许的当前状态（只能向前推进，终态不再变更）
+PAYMENT_STATUS_TRANSITIONS = {
+    1: (0,),       # 处理中 <- 待支付
+    2: (0, 1),     # 成功 <- 待支付/处理中
+    3: (0, 1),     # 失败 <- 待支付/处理中
+    4: (0,),       # 已取消 <- 待支付
+}
+
 
 class Payment(models.Model):
     """支付记录"""
     payment_id = models.AutoField(primary_key=True)
-    payment_uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    payment_uuid = CompactUUIDField(default=uuid7, unique=True, editable=False)
 
     # 解耦改造：使用UUID替代外键
-    order_uuid = models.UUIDField()  # 订单UUID
-    user_uuid = models.UUIDField()   # 用户UUID
+    order_uuid = CompactUUIDField()  # 订单UUID
+    user_uuid = CompactUUIDField()   # 用户UUID
 
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.SmallIntegerField(choices=PAYMENT_METHOD_CHOICES)
@@ -38,17 +49,204 @@ class Payment(models.Model):
     expires_at = models.DateTimeField(null=True, blank=True)
     # transaction_id = models.BigIntegerField(null=True, blank=True)  # 支付平台交易号 - 暂时不使用
     payment_subject = models.CharField(max_length=255)  # 支付标题
-    payment_data = models.JSONField(default=dict, blank=True)  # 支付数据（如支付URL、二维码等）
-    failure_reason = models.CharField(max_length=255, null=True, blank=True)
+    refunded_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # 累计已退款金额，由退款处理批量累加
 
     # 支付回调相关
     callback_received = models.BooleanField(default=False)
-    callback_data = models.JSONField(default=dict, blank=True)
     callback_time = models.DateTimeField(null=True, blank=True)
 
+    # 支付数据、回调数据、失败原因等大字段拆分到 PaymentDetail（related_name='detail'），
+    # 列表、统计和过期扫描只读取窄行
+
     def __str__(self):
         return f"Payment {self.payment_id}"
 
+    @property
+    def payment_data(self):
+        detail = self.get_detail()
+        return detail.payment_data if detail else {}
+
+    @property
+    def callback_data(self):
+        detail = self.get_detail()
+        return detail.callback_data if detail else {}
+
+    @property
+    def failure_reason(self):
+        detail = self.get_detail()
+        return detail.failure_reason if detail else None
+
+    def get_detail(self):
+        """支付详情（按需加载，列表查询可 select_related('detail') 预取）"""
+        try:
+            return self.detail
+        except PaymentDetail.DoesNotExist:
+            return None
+
     class Meta:
         db_table = "payment"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['order_uuid', 'status'], name='payment_order_status_idx'),
+            models.Index(fields=['status', 'expires_at'], name='payment_status_expires_idx'),  # 过期待支付记录清理
+            models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),  # 归档扫描
+        ]
+        constraints = [
+            # 每个订单最多一条待支付记录：函数索引只收录 status=0 的行，其余状态为 NULL 不参与唯一性判断
+            models.UniqueConstraint(
+                Case(When(status=0, then=F('order_uuid'))),
+                name='uniq_pending_payment_per_order'
+            ),
+        ]
+
+
+class PaymentDetail(models.Model):
+    """支付详情 - 从 payment 表垂直拆分出的低频大字段，按 payment_id 一对一"""
+    payment = models.OneToOneField(
+        Payment,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='detail',
+        db_constraint=False  # 与主表同时写入，不建外键约束
+    )
+    payment_data = models.JSONField(default=dict, blank=True)  # 支付数据（如支付URL、二维码等）
+    callback_data = models.JSONField(default=dict, blank=True)  # 最近一次状态迁移的回调数据
+    failure_reason = models.CharField(max_length=255, null=True, blank=True)
+
+    def __str__(self):
+        return f"PaymentDetail {self.payment_id}"
+
+    class Meta:
+        db_table = "payment_detail"
+
+
+class PaymentCallback(models.Model):
+    """支付回调记录 - 原始回调落库，按 (支付, 状态) 去重，副作用由后台任务处理"""
+    callback_id = models.AutoField(primary_key=True)
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='callbacks')
+    status = models.SmallIntegerField(choices=PAYMENT_STATUS_CHOICES)
+    payment_method = models.CharField(max_length=20)  # 回调来源的支付渠道
+    raw_data = models.JSONField(default=dict, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    # 副作用（回写订单、发送通知）处理状态
+    processed = models.BooleanField(default=False)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_until = models.DateTimeField(null=True, blank=True)  # 处理租约：认领后到期前其他工作线程/补偿命令不再处理
+    # 迟到的支付成功回调：支付记录已关闭（过期/被取代/失败），渠道已扣款但系统未记为成功，
+    # 保持未处理，不回写订单，留待对账退款
+    late_capture = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"PaymentCallback {self.callback_id}"
+
+    class Meta:
+        db_table = "payment_callback"
+        ordering = ['-received_at']
+        indexes = [
+            models.Index(fields=['processed', 'received_at'], name='payment_callback_pending_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['payment', 'status'], name='uniq_payment_callback_status'),
+        ]
+
+
+# 退款状态常量
+REFUND_STATUS_CHOICES = (
+    (0, 'pending'),      # 待处理
+    (1, 'processing'),   # 处理中（已被批处理认领）
+    (2, 'success'),      # 退款成功
+    (3, 'failed'),       # 退款失败
+)
+
+
+class Refund(models.Model):
+    """退款流水 - 每次退款申请一条，支持部分退款，由批处理调用支付渠道并累加到支付记录"""
+    refund_id = models.AutoField(primary_key=True)
+    refund_uuid = CompactUUIDField(default=uuid7, unique=True, editable=False)
+    payment = models.ForeignKey(Payment, on_delete=models.PROTECT, related_name='refunds')
+    order_uuid = CompactUUIDField()
+    user_uuid = CompactUUIDField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    reason = models.CharField(max_length=255, blank=True, default='')
+    status = models.SmallIntegerField(choices=REFUND_STATUS_CHOICES, default=0)
+    provider_refund_id = models.CharField(max_length=64, null=True, blank=True)  # 支付渠道退款单号
+    failure_reason = models.CharField(max_length=255, null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Refund {self.refund_id}"
+
+    class Meta:
+        db_table = "payment_refund"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'refund_id'], name='payment_refund_status_idx'),  # 批处理按状态认领
+            models.Index(fields=['order_uuid'], name='payment_refund_order_idx'),
+        ]
+
+
+# 幂等记录状态常量
+IDEMPOTENCY_STATUS_CHOICES = (
+    (0, 'processing'),   # 处理中
+    (1, 'completed'),    # 已完成
+)
+
+
+class IdempotencyRecord(models.Model):
+    """幂等键记录 - 缓存写接口响应，客户端重试时直接回放"""
+    key = models.CharField(max_length=64, primary_key=True)  # sha256(方法+路径+用户+幂等键)
+    request_hash = models.CharField(max_length=64)
+    status = models.SmallIntegerField(choices=IDEMPOTENCY_STATUS_CHOICES, default=0)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)  # 处理中记录的租约，过期后重试可接管
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"IdempotencyRecord {self.key}"
+
+    class Meta:
+        db_table = "payment_idempotency_key"
+
+
+class PaymentArchive(models.Model):
+    """已归档支付记录 - 终态且超过保留期的支付（见 archive_payments 命令）
+
+    支付详情内联，退款流水以 JSON 列表保存；MySQL 上按 created_at 月份分区，主键为 (payment_id, created_at)
+    """
+    payment_id = models.IntegerField(primary_key=True)
+    payment_uuid = CompactUUIDField(db_index=True)
+    order_uuid = CompactUUIDField()
+    user_uuid = CompactUUIDField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_method = models.SmallIntegerField(choices=PAYMENT_METHOD_CHOICES)
+    status = models.SmallIntegerField(choices=PAYMENT_STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    paid_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    payment_subject = models.CharField(max_length=255)
+    refunded_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    callback_received = models.BooleanField(default=False)
+    callback_time = models.DateTimeField(null=True, blank=True)
+    payment_data = models.JSONField(default=dict, blank=True)
+    callback_data = models.JSONField(default=dict, blank=True)
+    failure_reason = models.CharField(max_length=255, null=True, blank=True)
+    refunds = models.JSONField(default=list, blank=True)
+    archived_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"PaymentArchive {self.payment_id}"
+
+    class Meta:
+        db_table = "payment_archive"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['order_uuid'], name='payment_archive_order_idx'),
+            models.Index(fields=['user_uuid', 'created_at'], name='payment_archive_user_idx'),
+        ]
@@ -0,0 +1,46 @@
+"""
+订单服务批量查询
+对账、列表补充订单信息等场景按批调用 OrderService，避免逐条请求
+"""
+import logging
+import sys
+import os
+
+# 添加公共模块路径
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 检测环境：容器环境 vs 本地开发环境
+if BASE_DIR.startswith('/app'):
+    PARENT_DIR = BASE_DIR
+else:
+    PARENT_DIR = os.path.dirname(BASE_DIR)
+
+if PARENT_DIR not in sys.path:
+    sys.path.insert(0, PARENT_DIR)
+
+from common.service_client import service_client
+
+logger = logging.getLogger(__name__)
+
+# 与 OrderService 的 ORDER_INTERNAL_BATCH_MAX 保持一致
+ORDER_BATCH_SIZE = 500
+
+
+def fetch_orders(order_uuids):
+    """批量获取订单信息
+
+    微服务通信点：POST /api/orders/internal/batch/
+    返回 {order_uuid: 订单信息}，不存在的订单不在结果中；订单服务不可用时返回 None
+    """
+    unique_uuids = list(dict.fromkeys(str(value) for value in order_uuids))
+    orders = {}
+    for start in range(0, len(unique_uuids), ORDER_BATCH_SIZE):
+        chunk = unique_uuids[start:start + ORDER_BATCH_SIZE]
+        resp = service_client.post('OrderService', '/api/orders/internal/batch/', {
+            'order_uuids': chunk
+        })
+        if not resp or not resp.get('success'):
+            logger.warning(f"批量获取订单失败: {len(chunk)} 条")
+            return None
+        orders.update(resp.get('data') or {})
+    return orders
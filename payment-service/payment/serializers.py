@@ -1,8 +1,13 @@
 """
 支付服务序列化器
 """
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Payment, PAYMENT_METHOD_CHOICES, PAYMENT_STATUS_CHOICES
+from .models import Payment, PaymentDetail, PAYMENT_METHOD_CHOICES, PAYMENT_STATUS_CHOICES
 import sys
 import os
 
@@ -29,6 +34,7 @@ if PARENT_DIR not in sys.path:
     sys.path.insert(0, PARENT_DIR)
 
 from common.service_client import service_client
+from common.fields import uuid7
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -45,21 +51,23 @@ class PaymentSerializer(serializers.ModelSerializer):
             'amount', 'payment_method', 'payment_method_display',
             'status', 'status_display', 'created_at', 'paid_at',
             'expires_at', 'payment_subject',
-            'payment_data', 'failure_reason', 'order_info', 'user_info'
+            'payment_data', 'failure_reason', 'refunded_amount', 'order_info', 'user_info'
         ]
 
     def get_order_info(self, obj):
-        """获取订单信息"""
+        """获取订单信息
+
+        上下文 order_info_map 中已有该订单时直接使用（值为 None 表示已批量查询但未取到），避免逐条调用订单服务
+        """
+        order_info_map = self.context.get('order_info_map') or {}
+        key = str(obj.order_uuid)
+        if key in order_info_map:
+            return self._order_summary(order_info_map[key])
         try:
             # 调用订单服务内部接口获取订单详情
             resp = service_client.get('OrderService', f'/api/orders/internal/{obj.order_uuid}/')
             if resp and resp.get('success') and resp.get('data'):
-                data = resp.get('data') or {}
-                return {
-                    'order_id': data.get('order_id'),
-                    'total_amount': data.get('total_amount'),
-                    'status': data.get('status')
-                }
+                return self._order_summary(resp.get('data'))
         except Exception as e:
             print(f"获取订单信息失败: {e}")
         return None
@@ -67,20 +75,53 @@ class PaymentSerializer(serializers.ModelSerializer):
     def get_user_info(self, obj):
         """获取用户信息：调用 UserService API /api/v1/user/
 
-        兼容策略：失败时返回 None，调用方可忽略此字段。
+        上下文 user_info_map 中已有该用户时直接使用；兼容策略：失败时返回 None，调用方可忽略此字段。
         """
+        user_info_map = self.context.get('user_info_map') or {}
+        key = str(obj.user_uuid)
+        if key in user_info_map:
+            return self._user_summary(user_info_map[key], key)
         try:
             resp = service_client.get('UserService', f'/api/v1/user/{obj.user_uuid}/')
-            data = (resp or {}).get('data') or None
-            if data:
-                return {
-                    'user_id': data.get('user_id') or data.get('id') or str(obj.user_uuid),
-                    'username': data.get('username') or data.get('name') or '用户'
-                }
+            return self._user_summary((resp or {}).get('data'), key)
         except Exception as e:
             print(f"获取用户信息失败: {e}")
         return None
 
+    @staticmethod
+    def _order_summary(data):
+        if not data:
+            return None
+        return {
+            'order_id': data.get('order_id'),
+            'total_amount': data.get('total_amount'),
+            'status': data.get('status')
+        }
+
+    @staticmethod
+    def _user_summary(data, user_uuid):
+        if not data:
+            return None
+        return {
+            'user_id': data.get('user_id') or data.get('id') or user_uuid,
+            'username': data.get('username') or data.get('name') or '用户'
+        }
+
+
+def enrichment_context(payments, **context):
+    """列表序列化上下文：一页支付记录涉及的订单和用户各去重查询一次
+
+    订单走 OrderService 批量接口；订单服务不可用时所有订单记为 None，不再逐条重试
+    """
+    from .orders import fetch_orders
+    from .users import fetch_users
+    payments = list(payments)
+    order_uuids = list(dict.fromkeys(str(payment.order_uuid) for payment in payments))
+    orders = fetch_orders(order_uuids) if order_uuids else {}
+    context['order_info_map'] = {value: (orders or {}).get(value) for value in order_uuids}
+    context['user_info_map'] = fetch_users(payment.user_uuid for payment in payments)
+    return context
+
 
 class CreatePaymentSerializer(serializers.Serializer):
     """创建支付序列化器"""
@@ -100,53 +141,106 @@ class CreatePaymentSerializer(serializers.Serializer):
             raise serializers.ValidationError("不支持的支付方式")
         return method_map[value]
 
-    def validate_order_uuid(self, value):
-        """验证订单UUID"""
-        # 调用订单服务内部接口验证订单是否存在且状态为待支付
-        try:
-            print(f"[DEBUG] 开始验证订单UUID: {value}")
-            resp = service_client.get('OrderService', f'/api/orders/internal/{value}/')
-            print(f"[DEBUG] 订单服务响应: {resp}")
+    def validate(self, attrs):
+        """验证订单：存在、归属当前用户、待支付且金额一致
+
+        订单数据由视图加载后通过上下文传入（订单快照令牌或OrderService内部接口），
+        未传入时才调用订单服务获取
+        """
+        if 'order' in self.context:
+            order = self.context['order']
+        else:
+            order = self._fetch_order(attrs['order_uuid'])
+
+        if not order or str(order.get('order_uuid')) != str(attrs['order_uuid']):
+            raise serializers.ValidationError({'order_uuid': '订单不存在'})
 
-            if not resp or not resp.get('success'):
-                print(f"[DEBUG] 订单验证失败: resp={resp}")
-                raise serializers.ValidationError("订单不存在")
+        user_uuid = self.context.get('user_uuid')
+        if order.get('buyer_uuid') and user_uuid and str(order['buyer_uuid']) != str(user_uuid):
+            raise serializers.ValidationError({'order_uuid': '订单不属于当前用户'})
 
-            data = resp.get('data') or {}
-            print(f"[DEBUG] 订单数据: {data}")
+        if order.get('status') != 0:  # 待支付状态
+            raise serializers.ValidationError({'order_uuid': '订单状态不正确'})
 
-            if data.get('status') != 0:  # 待支付状态
-                print(f"[DEBUG] 订单状态不正确: {data.get('status')}")
-                raise serializers.ValidationError("订单状态不正确")
+        if order.get('total_amount') is not None and Decimal(str(order['total_amount'])) != attrs['amount']:
+            raise serializers.ValidationError({'amount': '支付金额与订单金额不一致'})
+        return attrs
 
-            print(f"[DEBUG] 订单验证成功")
-        except serializers.ValidationError:
-            raise
+    def _fetch_order(self, order_uuid):
+        """调用订单服务内部接口获取订单"""
+        try:
+            resp = service_client.get('OrderService', f'/api/orders/internal/{order_uuid}/')
         except Exception as e:
-            print(f"[DEBUG] 订单验证异常: {e}")
             # 无法联系订单服务时，返回验证失败
-            raise serializers.ValidationError("订单验证失败")
-        return value
+            raise serializers.ValidationError({'order_uuid': f'订单验证失败: {e}'})
+        if not resp or not resp.get('success'):
+            return None
+        return resp.get('data') or None
 
     def create(self, validated_data):
-        """创建支付记录"""
+        """创建支付记录
+
+        每个订单最多一条待支付记录：重复请求直接返回已有的待支付记录，不产生写入；
+        已过期或支付参数不同的待支付记录先条件更新为已取消，再创建新记录。
+        新记录预先生成支付UUID和支付数据，主表与详情表在同一事务中各一次 INSERT 写入
+        """
         user_uuid = self.context['user_uuid']
+        order_uuid = validated_data['order_uuid']
 
-        payment = Payment.objects.create(
-            user_uuid=user_uuid,
-            **validated_data
-        )
+        existing = Payment.objects.filter(order_uuid=order_uuid, status=0).first()
+        if existing is not None:
+            if self._is_reusable(existing, validated_data, user_uuid):
+                existing.reused = True
+                return existing
+            self._supersede(existing)
+
+        payment_uuid = uuid7()
 
         # TODO: 调用第三方支付接口生成支付数据
         # 这里模拟生成支付数据
-        payment.payment_data = {
-            'qr_code': f'https://payment.example.com/qr/{payment.payment_uuid}',
-            'payment_url': f'https://payment.example.com/pay/{payment.payment_uuid}'
+        payment_data = {
+            'qr_code': f'https://payment.example.com/qr/{payment_uuid}',
+            'payment_url': f'https://payment.example.com/pay/{payment_uuid}'
         }
-        payment.save()
 
+        try:
+            with transaction.atomic():
+                payment = Payment.objects.create(
+                    payment_uuid=payment_uuid,
+                    user_uuid=user_uuid,
+                    expires_at=timezone.now() + timedelta(minutes=getattr(settings, 'PAYMENT_EXPIRE_MINUTES', 30)),
+                    **validated_data
+                )
+                PaymentDetail.objects.create(payment=payment, payment_data=payment_data)
+        except IntegrityError:
+            # 并发请求已为该订单创建了待支付记录
+            existing = Payment.objects.filter(order_uuid=order_uuid, status=0).first()
+            if existing is not None and self._is_reusable(existing, validated_data, user_uuid):
+                existing.reused = True
+                return existing
+            raise serializers.ValidationError({'order_uuid': '该订单已有进行中的支付'})
+        payment.reused = False
         return payment
 
+    def _is_reusable(self, payment, validated_data, user_uuid):
+        """待支付记录未过期且支付参数一致时可直接复用"""
+        if payment.expires_at and payment.expires_at <= timezone.now():
+            return False
+        return (
+            str(payment.user_uuid) == str(user_uuid)
+            and payment.payment_method == validated_data['payment_method']
+            and payment.amount == validated_data['amount']
+        )
+
+    def _supersede(self, payment):
+        """条件更新旧的待支付记录为已取消，释放订单的待支付名额"""
+        expired = payment.expires_at and payment.expires_at <= timezone.now()
+        with transaction.atomic():
+            if Payment.objects.filter(payment_id=payment.payment_id, status=0).update(status=4):
+                PaymentDetail.objects.filter(payment_id=payment.payment_id).update(
+                    failure_reason='支付已过期' if expired else '已被新的支付请求取代'
+                )
+
 
 class PaymentCallbackSerializer(serializers.Serializer):
     """支付回调序列化器"""
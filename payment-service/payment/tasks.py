@@ -0,0 +1,344 @@
+"""
+支付服务后台任务
+1. 支付回调：请求线程只负责落库与状态迁移并立即应答，回写订单和发送通知在后台线程中完成
+2. 过期待支付记录清理：分批将超过 expires_at 的待支付记录标记为已取消
+3. 退款批处理：分批认领待处理退款，限并发调用支付渠道，批量回写退款流水和支付记录累计退款额
+4. 支付归档：终态且超过保留期的支付记录分批移入归档表
+"""
+import logging
+import sys
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from .models import Payment, PaymentDetail, PaymentCallback, Refund, PaymentArchive
+
+# 添加公共模块路径
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 检测环境：容器环境 vs 本地开发环境
+if BASE_DIR.startswith('/app'):
+    PARENT_DIR = BASE_DIR
+else:
+    PARENT_DIR = os.path.dirname(BASE_DIR)
+
+if PARENT_DIR not in sys.path:
+    sys.path.insert(0, PARENT_DIR)
+
+from common.service_client import service_client
+from common.task_queue import BackgroundTaskQueue
+from common.sweeper import ExpirySweeper
+from common.archive import Archiver, copy_to
+from common.metrics import metrics
+from common.notification_client import build_notification, notify, send_notifications
+
+logger = logging.getLogger(__name__)
+
+# 支付回调副作用任务队列（进程内）
+callback_queue = BackgroundTaskQueue(
+    'payment-callback',
+    workers=getattr(settings, 'PAYMENT_CALLBACK_WORKERS', 4),
+    maxsize=getattr(settings, 'PAYMENT_CALLBACK_QUEUE_SIZE', 5000)
+)
+metrics.register_collector('payment-callback-queue', callback_queue.stats)
+
+
+def submit_callback(callback_id):
+    """回调副作用入队；队列已满时保留未处理状态，由 process_payment_callbacks 命令补偿"""
+    return callback_queue.submit(process_callback, callback_id)
+
+
+def claim_callback(callback_id):
+    """认领一条未处理的回调，返回租约到期时间；已处理或正被其他线程/实例处理时返回 None
+
+    条件 UPDATE 只有一个调用方能成功，后台队列与补偿命令不会并发执行同一条回调的副作用
+    """
+    now = timezone.now()
+    claimed_until = now + timedelta(seconds=getattr(settings, 'PAYMENT_CALLBACK_LEASE_SECONDS', 60))
+    claimed = PaymentCallback.objects.filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lte=now),
+        callback_id=callback_id,
+        processed=False,
+        late_capture=False
+    ).update(claimed_until=claimed_until, attempts=F('attempts') + 1)
+    return claimed_until if claimed else None
+
+
+def process_callback(callback_id):
+    """处理单条回调的副作用
+
+    先认领再执行副作用，回写订单成功后才标记为已处理；失败时释放认领，保留给补偿命令重试
+    """
+    claimed_until = claim_callback(callback_id)
+    if claimed_until is None:
+        return False
+    owned = PaymentCallback.objects.filter(callback_id=callback_id, processed=False, claimed_until=claimed_until)
+    callback = PaymentCallback.objects.select_related('payment').get(callback_id=callback_id)
+    payment = callback.payment
+
+    if callback.status == 2:  # 支付成功 (2 = 'success')
+        # 更新订单状态（内部接口）
+        try:
+            result = service_client.patch('OrderService', f'/api/orders/internal/orders/{payment.order_uuid}/', {
+                'status': 1,
+                'payment_time': (payment.paid_at or timezone.now()).isoformat()
+            })
+        except Exception as e:
+            logger.warning(f"更新订单状态失败: {e}")
+            result = None
+        if not result:
+            logger.warning(f"回写订单失败，等待重试: callback={callback_id}, order={payment.order_uuid}")
+            owned.update(claimed_until=None)
+            return False
+
+        # 发送支付成功通知（合并到微批，不阻塞回调处理）
+        notify(
+            payment.user_uuid,
+            '支付成功',
+            f'订单 {payment.order_uuid} 支付成功，金额 ¥{payment.amount}',
+            related_id=payment.order_uuid,
+            related_data={
+                'payment_id': payment.payment_id,
+                'amount': str(payment.amount)
+            }
+        )
+
+    owned.update(
+        processed=True,
+        processed_at=timezone.now(),
+        claimed_until=None
+    )
+    return True
+
+
+def _expired_payment_filter(now):
+    """过期待支付记录（命中 status+expires_at 索引）"""
+    return Q(status=0, expires_at__lt=now)
+
+
+def _expired_payment_updates(now):
+    return {
+        'status': 4,
+    }
+
+
+def record_expired_payments(rows):
+    """每批过期记录提交后，在详情表中批量写入失败原因"""
+    PaymentDetail.objects.filter(payment_id__in=[row['payment_id'] for row in rows]).update(
+        failure_reason='支付已过期'
+    )
+
+
+payment_expiry_sweeper = ExpirySweeper(
+    'payment-expiry',
+    Payment,
+    expired_filter=_expired_payment_filter,
+    updates=_expired_payment_updates,
+    on_expired=record_expired_payments,
+    batch_size=getattr(settings, 'PAYMENT_EXPIRY_BATCH_SIZE', 500),
+    pause=getattr(settings, 'PAYMENT_EXPIRY_BATCH_PAUSE', 0.2)
+)
+
+
+def refund_provider_enabled():
+    """是否可以调用退款渠道：目前只有模拟渠道，需显式开启 PAYMENT_REFUND_PROVIDER_MOCK"""
+    return getattr(settings, 'PAYMENT_REFUND_PROVIDER_MOCK', False)
+
+
+def call_refund_provider(refund):
+    """调用支付渠道退款接口
+
+    TODO: 对接支付宝、微信支付退款接口，以 refund_uuid 作为渠道退款请求号，保证重试时不会重复退款
+    返回 {'success': bool, 'refund_id': 渠道退款单号, 'error': 失败原因, 'retryable': 是否可重试}
+
+    当前仅有模拟实现（直接返回成功），未开启 PAYMENT_REFUND_PROVIDER_MOCK 时拒绝调用
+    """
+    if not refund_provider_enabled():
+        raise ImproperlyConfigured('未对接退款渠道，模拟退款需开启 PAYMENT_REFUND_PROVIDER_MOCK')
+    return {
+        'success': True,
+        'refund_id': f"mock_refund_{refund.refund_uuid.hex[:16]}"
+    }
+
+
+def _call_refund_provider_safely(refund):
+    try:
+        return call_refund_provider(refund)
+    except Exception as e:
+        logger.warning(f"调用退款渠道异常: refund={refund.refund_id}, {e}")
+        return {'success': False, 'error': '退款渠道暂时不可用', 'retryable': True}
+
+
+def claim_refunds(batch_size):
+    """认领一批待处理退款（跳过其他实例已锁定的行），返回 refund_id 列表"""
+    with transaction.atomic():
+        ids = list(
+            Refund.objects.filter(status=0)
+            .select_for_update(skip_locked=True)
+            .order_by('refund_id')
+            .values_list('refund_id', flat=True)[:batch_size]
+        )
+        if ids:
+            Refund.objects.filter(refund_id__in=ids, status=0).update(
+                status=1,
+                attempts=F('attempts') + 1,
+                updated_at=timezone.now()
+            )
+    return ids
+
+
+def requeue_stale_refunds(stale_minutes):
+    """处理进程中断后遗留的处理中退款，重新放回待处理"""
+    cutoff = timezone.now() - timedelta(minutes=stale_minutes)
+    return Refund.objects.filter(status=1, updated_at__lt=cutoff).update(
+        status=0,
+        updated_at=timezone.now()
+    )
+
+
+def process_refund_batch(batch_size=None, concurrency=None, max_attempts=None):
+    """处理一批退款，返回本批统计
+
+    - 渠道调用在线程池中并发执行，并发数受 concurrency 限制
+    - 退款流水用一次 bulk_update 回写
+    - 支付记录累计退款额按增量分组，每种增量一条 UPDATE；退足全额的支付记录标记为已退款
+    """
+    batch_size = batch_size or getattr(settings, 'PAYMENT_REFUND_BATCH_SIZE', 100)
+    concurrency = concurrency or getattr(settings, 'PAYMENT_REFUND_CONCURRENCY', 8)
+    max_attempts = max_attempts or getattr(settings, 'PAYMENT_REFUND_MAX_ATTEMPTS', 5)
+
+    if not refund_provider_enabled():
+        # 未对接渠道时不认领，避免消耗重试次数或把退款误记为成功
+        logger.error("未配置退款渠道（PAYMENT_REFUND_PROVIDER_MOCK 未开启），跳过退款处理")
+        return {'claimed': 0, 'succeeded': 0, 'failed': 0, 'retrying': 0}
+
+    ids = claim_refunds(batch_size)
+    stats = {'claimed': len(ids), 'succeeded': 0, 'failed': 0, 'retrying': 0}
+    if not ids:
+        return stats
+
+    refunds = list(Refund.objects.filter(refund_id__in=ids).order_by('refund_id'))
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(refunds))) as pool:
+        results = list(pool.map(_call_refund_provider_safely, refunds))
+
+    now = timezone.now()
+    succeeded = []
+    payment_totals = defaultdict(Decimal)
+    for refund, result in zip(refunds, results):
+        refund.updated_at = now
+        if result.get('success'):
+            refund.status = 2
+            refund.provider_refund_id = result.get('refund_id')
+            refund.failure_reason = None
+            refund.processed_at = now
+            succeeded.append(refund)
+            payment_totals[refund.payment_id] += refund.amount
+        elif result.get('retryable') and refund.attempts < max_attempts:
+            refund.status = 0
+            refund.failure_reason = str(result.get('error') or '')[:255] or None
+            stats['retrying'] += 1
+        else:
+            refund.status = 3
+            refund.failure_reason = str(result.get('error') or '未知错误')[:255]
+            refund.processed_at = now
+            stats['failed'] += 1
+    stats['succeeded'] = len(succeeded)
+
+    # 相同增量的支付记录合并为一条 UPDATE
+    payments_by_total = defaultdict(list)
+    for payment_id, total in payment_totals.items():
+        payments_by_total[total].append(payment_id)
+
+    with transaction.atomic():
+        Refund.objects.bulk_update(
+            refunds, ['status', 'provider_refund_id', 'failure_reason', 'processed_at', 'updated_at']
+        )
+        for total, payment_ids in payments_by_total.items():
+            Payment.objects.filter(payment_id__in=payment_ids).update(
+                refunded_amount=F('refunded_amount') + total
+            )
+        if payment_totals:
+            Payment.objects.filter(
+                payment_id__in=list(payment_totals),
+                status=2,
+                refunded_amount__gte=F('amount')
+            ).update(status=5)
+
+    metrics.inc('payment-refund.succeeded', stats['succeeded'])
+    metrics.inc('payment-refund.failed', stats['failed'])
+    notify_refunds(succeeded)
+    return stats
+
+
+def notify_refunds(refunds):
+    """退款成功通知，每批退款合并为一次批量请求"""
+    send_notifications([
+        build_notification(
+            refund.user_uuid,
+            '退款成功',
+            f'订单 {refund.order_uuid} 退款成功，金额 ¥{refund.amount}',
+            related_id=refund.order_uuid,
+            related_data={
+                'payment_id': refund.payment_id,
+                'refund_id': str(refund.refund_uuid),
+                'refund_amount': str(refund.amount)
+            }
+        )
+        for refund in refunds
+    ])
+
+
+def _archivable_payment_filter(now):
+    """可归档支付：终态且创建时间早于保留期（命中 status+created_at 索引），
+    不含仍有进行中退款或未处理回调的记录"""
+    retention = timedelta(days=getattr(settings, 'PAYMENT_ARCHIVE_AFTER_DAYS', 365))
+    open_refunds = Refund.objects.filter(payment_id=OuterRef('pk'), status__in=[0, 1])
+    pending_callbacks = PaymentCallback.objects.filter(payment_id=OuterRef('pk'), processed=False)
+    return (
+        Q(status__in=[2, 3, 4, 5], created_at__lt=now - retention)
+        & ~Q(Exists(open_refunds))
+        & ~Q(Exists(pending_callbacks))
+    )
+
+
+def _payment_archive_rows(payments, now):
+    """支付详情内联，退款流水转为 JSON；回调记录随支付级联删除，不归档"""
+    for payment in payments:
+        refunds = [
+            {
+                'refund_uuid': str(refund.refund_uuid),
+                'amount': str(refund.amount),
+                'reason': refund.reason,
+                'status': refund.status,
+                'provider_refund_id': refund.provider_refund_id,
+                'failure_reason': refund.failure_reason,
+                'created_at': refund.created_at.isoformat(),
+                'processed_at': refund.processed_at.isoformat() if refund.processed_at else None,
+            }
+            for refund in payment.refunds.all()
+        ]
+        yield copy_to(PaymentArchive, payment, refunds=refunds, archived_at=now)
+
+
+def _delete_refunds(payment_ids, using):
+    """退款流水以 PROTECT 关联支付记录，需先删除"""
+    Refund.objects.using(using).filter(payment_id__in=payment_ids).delete()
+
+
+payment_archiver = Archiver(
+    'payment-archive',
+    Payment,
+    eligible=_archivable_payment_filter,
+    to_archive=_payment_archive_rows,
+    before_delete=_delete_refunds,
+    select_related=('detail',),
+    prefetch_related=('refunds',),
+    batch_size=getattr(settings, 'PAYMENT_ARCHIVE_BATCH_SIZE', 500),
+    pause=getattr(settings, 'PAYMENT_ARCHIVE_BATCH_PAUSE', 0.5)
+)
@@ -0,0 +1,248 @@
+"""
+支付服务测试
+1. 创建支付的查询次数：订单快照令牌与回调 OrderService 两条路径都只读一次待支付记录、各写一次主表和详情表
+2. 退款金额校验：非有限值拒绝，金额按两位小数规整后再校验；支付统计中的退款笔数
+3. 支付回调副作用：先认领再执行，已被认领的回调不重复处理；已关闭支付的成功回调登记为迟到扣款
+"""
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+
+from common.order_token import sign_order_snapshot
+from common.service_client import service_client
+from .models import Payment, PaymentCallback, Refund
+from .tasks import process_callback
+from .views import PaymentStatsAPIView
+
+CREATE_URL = '/api/payment/create/'
+
+# 读待支付记录 1 次 + 事务内写入主表、详情表（SAVEPOINT/RELEASE 各 1 次）
+CREATE_PAYMENT_QUERIES = 5
+
+
+class PaymentCreateQueryCountTests(TestCase):
+    """PaymentCreateAPIView 的数据库查询次数"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user_uuid = uuid.uuid4()
+        self.order_uuid = uuid.uuid4()
+        self.order = {
+            'order_id': 1001,
+            'order_uuid': str(self.order_uuid),
+            'total_amount': '99.90',
+            'status': 0,
+            'buyer_uuid': str(self.user_uuid),
+        }
+        self.user = {'success': True, 'data': {'id': str(self.user_uuid), 'username': 'buyer'}}
+
+    def _request_data(self, **extra):
+        return {
+            'order_uuid': str(self.order_uuid),
+            'payment_method': 'alipay',
+            'amount': '99.90',
+            'payment_subject': '订单支付 - 1001',
+            **extra
+        }
+
+    def _create(self, data):
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertNumQueries(CREATE_PAYMENT_QUERIES):
+                response = self.client.post(CREATE_URL, data, format='json', HTTP_UUID=str(self.user_uuid))
+        payment_inserts = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('INSERT INTO "payment"') or query['sql'].startswith('INSERT INTO `payment`')
+        ]
+        self.assertEqual(len(payment_inserts), 1)
+        return response
+
+    @mock.patch('common.order_token.ORDER_TOKEN_SECRET', 'test-order-token-secret')
+    def test_create_with_order_token(self):
+        token = sign_order_snapshot(
+            self.order_uuid, Decimal('99.90'), 0, version=1, buyer_uuid=self.user_uuid, order_id=1001
+        )
+        with mock.patch.object(service_client, 'get', return_value=self.user) as get:
+            response = self._create(self._request_data(order_token=token))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['data']['order_info']['order_id'], 1001)
+        # 令牌路径不回调 OrderService
+        self.assertNotIn('OrderService', [call.args[0] for call in get.call_args_list])
+        self.assertEqual(Payment.objects.filter(order_uuid=self.order_uuid, status=0).count(), 1)
+
+    def test_create_with_fetch_order(self):
+        def fake_get(service, path, *args, **kwargs):
+            if service == 'OrderService':
+                return {'success': True, 'data': self.order}
+            return self.user
+
+        with mock.patch.object(service_client, 'get', side_effect=fake_get) as get:
+            response = self._create(self._request_data())
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['data']['order_info']['order_id'], 1001)
+        order_calls = [call for call in get.call_args_list if call.args[0] == 'OrderService']
+        self.assertEqual(len(order_calls), 1)
+        self.assertEqual(Payment.objects.filter(order_uuid=self.order_uuid, status=0).count(), 1)
+
+    @mock.patch('common.order_token.ORDER_TOKEN_SECRET', '')
+    def test_order_token_ignored_without_secret(self):
+        """未配置密钥时不信任令牌（即使由其他密钥签发），回调 OrderService 确认订单"""
+        with mock.patch('common.order_token.ORDER_TOKEN_SECRET', 'other-secret'):
+            token = sign_order_snapshot(self.order_uuid, Decimal('99.90'), 0, version=1, buyer_uuid=self.user_uuid)
+
+        def fake_get(service, path, *args, **kwargs):
+            if service == 'OrderService':
+                return {'success': True, 'data': self.order}
+            return self.user
+
+        with mock.patch.object(service_client, 'get', side_effect=fake_get) as get:
+            response = self.client.post(
+                CREATE_URL, self._request_data(order_token=token), format='json', HTTP_UUID=str(self.user_uuid)
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('OrderService', [call.args[0] for call in get.call_args_list])
+
+
+class PaymentRefundAmountTests(TestCase):
+    """PaymentRefundAPIView 的退款金额校验"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user_uuid = uuid.uuid4()
+        self.payment = Payment.objects.create(
+            order_uuid=uuid.uuid4(),
+            user_uuid=self.user_uuid,
+            amount=Decimal('100.00'),
+            payment_method=0,
+            status=2,
+            payment_subject='订单支付'
+        )
+        self.url = f'/api/payment/{self.payment.order_uuid}/refund/'
+
+    def _refund(self, amount):
+        return self.client.post(self.url, {'refund_amount': amount}, format='json', HTTP_UUID=str(self.user_uuid))
+
+    def test_rejects_non_finite_amount(self):
+        for amount in ('NaN', 'sNaN', 'Infinity', '-Infinity', 'abc'):
+            response = self._refund(amount)
+            self.assertEqual(response.status_code, 400, amount)
+        self.assertFalse(Refund.objects.exists())
+
+    def test_quantizes_amount_before_validation(self):
+        response = self._refund('100.004')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Refund.objects.get().amount, Decimal('100.00'))
+        # 规整后为 0 的金额拒绝
+        self.assertEqual(self._refund('0.001').status_code, 400)
+
+    def test_stats_count_refunded_not_cancelled(self):
+        base = {'user_uuid': self.user_uuid, 'amount': Decimal('10.00'), 'payment_method': 0, 'payment_subject': 's'}
+        Payment.objects.create(order_uuid=uuid.uuid4(), status=4, **base)
+        Payment.objects.create(order_uuid=uuid.uuid4(), status=5, refunded_amount=Decimal('10.00'), **base)
+        Payment.objects.create(order_uuid=uuid.uuid4(), status=2, refunded_amount=Decimal('3.00'), **base)
+        # PaymentStatsAPIView 未挂载路由，直接调用视图
+        request = APIRequestFactory().get('/stats/', HTTP_UUID=str(self.user_uuid))
+        response = PaymentStatsAPIView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['refunded_payments'], 2)
+
+
+class PaymentCallbackClaimTests(TestCase):
+    """process_callback 的认领"""
+
+    def setUp(self):
+        payment = Payment.objects.create(
+            order_uuid=uuid.uuid4(),
+            user_uuid=uuid.uuid4(),
+            amount=Decimal('10.00'),
+            payment_method=0,
+            status=2,
+            payment_subject='订单支付'
+        )
+        self.callback = PaymentCallback.objects.create(payment=payment, status=2, payment_method='alipay')
+
+    @mock.patch('payment.tasks.notify')
+    def test_processes_and_marks_after_side_effects(self, notify):
+        with mock.patch.object(service_client, 'patch', return_value={'success': True}) as patch:
+            self.assertTrue(process_callback(self.callback.callback_id))
+        self.assertEqual(patch.call_count, 1)
+        notify.assert_called_once()
+        self.callback.refresh_from_db()
+        self.assertTrue(self.callback.processed)
+        self.assertIsNone(self.callback.claimed_until)
+        self.assertEqual(self.callback.attempts, 1)
+
+    @mock.patch('payment.tasks.notify')
+    def test_skips_callback_claimed_by_another_worker(self, notify):
+        PaymentCallback.objects.filter(pk=self.callback.pk).update(claimed_until=timezone.now() + timedelta(seconds=60))
+        with mock.patch.object(service_client, 'patch') as patch:
+            self.assertFalse(process_callback(self.callback.callback_id))
+        patch.assert_not_called()
+        notify.assert_not_called()
+
+    @mock.patch('payment.tasks.notify')
+    def test_failure_releases_claim_for_retry(self, notify):
+        with mock.patch.object(service_client, 'patch', return_value=None):
+            self.assertFalse(process_callback(self.callback.callback_id))
+        self.callback.refresh_from_db()
+        self.assertFalse(self.callback.processed)
+        self.assertIsNone(self.callback.claimed_until)
+        # 租约过期的认领可被接管
+        PaymentCallback.objects.filter(pk=self.callback.pk).update(claimed_until=timezone.now() - timedelta(seconds=1))
+        with mock.patch.object(service_client, 'patch', return_value={'success': True}):
+            self.assertTrue(process_callback(self.callback.callback_id))
+
+
+class PaymentLateCaptureTests(TestCase):
+    """支付记录已关闭后到达的支付成功回调"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.payment = Payment.objects.create(
+            order_uuid=uuid.uuid4(),
+            user_uuid=uuid.uuid4(),
+            amount=Decimal('10.00'),
+            payment_method=0,
+            status=4,  # 已过期/被新的支付请求取代
+            payment_subject='订单支付'
+        )
+
+    def _callback(self, status):
+        return self.client.post(
+            '/api/payment/callback/alipay/',
+            {'payment_uuid': str(self.payment.payment_uuid), 'status': status},
+            format='json'
+        )
+
+    @mock.patch('payment.views.submit_callback')
+    def test_success_on_cancelled_payment_is_flagged(self, submit):
+        response = self._callback(2)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['late_capture'])
+        submit.assert_not_called()
+        callback = PaymentCallback.objects.get(payment=self.payment)
+        self.assertTrue(callback.late_capture)
+        self.assertFalse(callback.processed)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 4)
+        # 补偿处理不会把迟到扣款回写为订单已支付
+        with mock.patch.object(service_client, 'patch') as patch:
+            self.assertFalse(process_callback(callback.callback_id))
+        patch.assert_not_called()
+
+    def test_failure_on_cancelled_payment_is_plain_noop(self):
+        response = self._callback(3)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('late_capture', response.data)
+        callback = PaymentCallback.objects.get(payment=self.payment)
+        self.assertTrue(callback.processed)
+        self.assertFalse(callback.late_capture)
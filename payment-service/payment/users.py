@@ -0,0 +1,40 @@
+"""
+用户服务查询
+列表补充用户信息时按页去重后查询 UserService，同一页中的同一用户只请求一次
+"""
+import logging
+import sys
+import os
+
+# 添加公共模块路径
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 检测环境：容器环境 vs 本地开发环境
+if BASE_DIR.startswith('/app'):
+    PARENT_DIR = BASE_DIR
+else:
+    PARENT_DIR = os.path.dirname(BASE_DIR)
+
+if PARENT_DIR not in sys.path:
+    sys.path.insert(0, PARENT_DIR)
+
+from common.service_client import service_client
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_users(user_uuids):
+    """批量获取用户信息
+
+    微服务通信点：GET /api/v1/user/<uuid>/（UserService 无批量接口，按去重后的用户逐个查询）
+    返回 {user_uuid: 用户数据}，查询失败的用户值为 None
+    """
+    users = {}
+    for user_uuid in dict.fromkeys(str(value) for value in user_uuids):
+        try:
+            resp = service_client.get('UserService', f'/api/v1/user/{user_uuid}/')
+        except Exception as e:
+            logger.warning(f"获取用户信息失败: {e}")
+            resp = None
+        users[user_uuid] = (resp or {}).get('data') or None
+    return users
@@ -4,6 +4,7 @@
 """
 import uuid
 import logging
+from decimal import Decimal, InvalidOperation
 import sys
 import os
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -13,7 +14,12 @@ from rest_framework.generics import ListAPIView, CreateAPIView, GenericAPIView
 from rest_framework.pagination import PageNumberPagination
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from .models import Payment
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from .models import (
+    Payment, PaymentDetail, PaymentCallback, Refund, IdempotencyRecord, PaymentArchive, PAYMENT_STATUS_TRANSITIONS
+)
 
 # 添加公共模块路径 - 必须在导入 serializers 之前
 import sys
@@ -40,9 +46,14 @@ if PARENT_DIR not in sys.path:
     sys.path.insert(0, PARENT_DIR)
 
 # 现在可以安全地导入依赖 common 模块的 serializers
-from .serializers import PaymentSerializer, CreatePaymentSerializer, PaymentCallbackSerializer
+from .serializers import PaymentSerializer, CreatePaymentSerializer, PaymentCallbackSerializer, enrichment_context
 from common.service_client import service_client
 from common.microservice_base import MicroserviceBaseView
+from common.order_token import verify_order_snapshot, order_token_enabled, OrderTokenError
+from common.idempotency import idempotent
+from common.db_router import replica_reads
+from common.metrics import metrics
+from .tasks import submit_callback
 
 logger = logging.getLogger(__name__)
 
@@ -58,51 +69,56 @@ class PaymentCreateAPIView(CreateAPIView, MicroserviceBaseView):
     """创建支付
 
     微服务通信点：
-    1. 验证订单信息：调用OrderService确认订单状态
+    1. 验证订单信息：校验OrderService签发的订单快照令牌，无令牌时调用OrderService确认订单状态
     2. 创建支付后：调用NotificationService发送支付通知
+
+    支持 Idempotency-Key 请求头：重试时直接回放首次响应，不重复创建支付
     """
     serializer_class = CreatePaymentSerializer
     # permission_classes = [IsAuthenticated]
 
+    @idempotent(IdempotencyRecord)
     def create(self, request, *args, **kwargs):
     # 微服务通信：从Spring Cloud Gateway获取用户UUID
         print(f"[DEBUG] 开始创建支付，请求数据: {request.data}")
         user_uuid = self.get_user_uuid_from_request()
-        print(f"[DEBUG] 获取到用户UUID: {user_uuid}")
         if not user_uuid:
             print(f"[DEBUG] 用户身份验证失败")
             return Response({'error': '用户身份验证失败'}, status=http_status.HTTP_401_UNAUTHORIZED)
 
-        # 调用OrderService验证订单信息（内部接口，免认证）
-        order_uuid = request.data.get('order_uuid')
-        print(f"[DEBUG] 订单UUID: {order_uuid}")
-        if order_uuid:
-            order_resp = service_client.get('OrderService', f'/api/orders/internal/{order_uuid}/')
-            print(f"[DEBUG] Views中订单验证响应: {order_resp}")
-            if not order_resp or not order_resp.get('success'):
-                print(f"[DEBUG] Views中订单验证失败")
-                return Response({'error': '订单不存在'}, status=http_status.HTTP_400_BAD_REQUEST)
-            order_data = order_resp.get('data') or {}
-            if order_data.get('status') != 0:  # 只能支付待支付的订单
-                print(f"[DEBUG] Views中订单状态不允许支付: {order_data.get('status')}")
-                return Response({'error': '订单状态不允许支付'}, status=http_status.HTTP_400_BAD_REQUEST)
-
-        print(f"[DEBUG] Views中订单验证通过，开始序列化器验证")
+        # 订单只加载一次，通过序列化器上下文传递并在序列化器中统一校验；
+        # 未配置令牌密钥时忽略令牌，回调 OrderService 确认订单
+        order_token = request.data.get('order_token')
+        if order_token and order_token_enabled():
+            try:
+                order_data = self._order_from_snapshot(verify_order_snapshot(order_token))
+            except OrderTokenError as e:
+                return Response({'error': f'订单令牌无效: {e}'}, status=http_status.HTTP_400_BAD_REQUEST)
+        else:
+            order_data = self._fetch_order(request.data.get('order_uuid'))
+
         # 创建支付记录
         serializer = self.get_serializer(
             data=request.data,
-            context={'user_uuid': user_uuid}
+            context={'user_uuid': user_uuid, 'order': order_data}
         )
-        print(f"[DEBUG] 开始调用序列化器is_valid")
         serializer.is_valid(raise_exception=True)
-        print(f"[DEBUG] 序列化器验证通过，开始保存")
         payment = serializer.save()
 
         # 调用第三方支付接口（模拟）
         payment_result = self._process_payment(payment)
 
         if payment_result.get('success'):
-            response_serializer = PaymentSerializer(payment)
+            response_serializer = PaymentSerializer(payment, context={
+                'order_info_map': {str(payment.order_uuid): order_data}
+            })
+            if payment.reused:
+                # 订单已有未过期的待支付记录，直接返回
+                return Response({
+                    'code': '200',
+                    'message': '已存在待支付记录',
+                    'data': response_serializer.data
+                }, status=http_status.HTTP_200_OK)
             return Response({
                 'code': '200',
                 'message': '支付创建成功',
@@ -114,24 +130,32 @@ class PaymentCreateAPIView(CreateAPIView, MicroserviceBaseView):
                 'details': payment_result.get('error', '未知错误')
             }, status=http_status.HTTP_400_BAD_REQUEST)
 
-    def _process_payment(self, payment):
-        """处理支付逻辑"""
-        # TODO: 实现具体的支付处理逻辑
-        # 这里应该调用支付宝、微信支付等第三方接口
-
-        # 模拟生成支付URL和二维码（不直接完成支付）
-        # payment_base_url = "https://payment.example.com"
-        # payment_uuid = str(payment.payment_uuid)
+    def _order_from_snapshot(self, snapshot):
+        """将订单快照令牌转换为与OrderService内部接口一致的订单数据"""
+        return {
+            'order_id': snapshot.get('id'),
+            'order_uuid': snapshot.get('uuid'),
+            'total_amount': snapshot.get('amount'),
+            'status': snapshot.get('status'),
+            'buyer_uuid': snapshot.get('buyer'),
+        }
 
-        # payment_data = {
-        #     'payment_url': f"{payment_base_url}/pay/{payment_uuid}",
-        #     'qr_code': f"{payment_base_url}/qr/{payment_uuid}"
-        # }
+    def _fetch_order(self, order_uuid):
+        """未携带令牌时调用OrderService获取订单信息（内部接口，免认证）"""
+        if not order_uuid:
+            return None
+        order_resp = service_client.get('OrderService', f'/api/orders/internal/{order_uuid}/')
+        if not order_resp or not order_resp.get('success'):
+            return None
+        return order_resp.get('data') or None
 
-        # # 更新支付记录的payment_data字段，但保持状态为待支付
-        # payment.payment_data = payment_data
-        payment.save()
+    def _process_payment(self, payment):
+        """处理支付逻辑
 
+        支付数据已在创建时随记录一次性写入，这里不再重复保存
+        """
+        # TODO: 实现具体的支付处理逻辑
+        # 这里应该调用支付宝、微信支付等第三方接口
         return {
             'success': True,
         }
@@ -149,22 +173,24 @@ class PaymentListAPIView(ListAPIView, MicroserviceBaseView):
         if not user_uuid:
             return Payment.objects.none()
 
-        return Payment.objects.filter(user_uuid=user_uuid).order_by('-created_at')
+        # 详情表只为当前页的记录关联读取
+        return Payment.objects.filter(user_uuid=user_uuid).select_related('detail').order_by('-created_at')
 
+    @replica_reads
     def list(self, request, *args, **kwargs):
         """返回支付列表 - 兼容原有API响应格式"""
         queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
 
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
+            serializer = self.get_serializer(page, many=True, context=enrichment_context(page, **self.get_serializer_context()))
             return self.get_paginated_response({
                 'code': '200',
                 'message': 'success',
                 'data': serializer.data
             })
 
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(queryset, many=True, context=enrichment_context(queryset, **self.get_serializer_context()))
         return Response({
             'code': '200',
             'message': 'success',
@@ -172,7 +198,11 @@ class PaymentListAPIView(ListAPIView, MicroserviceBaseView):
         })
 
 class PaymentCallbackAPIView(GenericAPIView):
-    """支付回调处理 - 第三方支付平台回调"""
+    """支付回调处理 - 第三方支付平台回调
+
+    快速应答：回调按 (支付, 状态) 去重落库，并以条件更新完成状态迁移，
+    回写订单与发送通知交由后台任务队列处理
+    """
     # permission_classes = [AllowAny]  # 支付回调不需要用户认证
 
     def post(self, request, payment_method):
@@ -181,63 +211,92 @@ class PaymentCallbackAPIView(GenericAPIView):
         payment_id = request.data.get('payment_id')
         payment_uuid = request.data.get('payment_uuid')
         # transaction_id = request.data.get('transaction_id')  # 暂时不使用
-        payment_status = request.data.get('status')
 
         try:
-            # 优先使用 payment_id 查找，如果没有则使用 payment_uuid
-            if payment_id:
-                payment = Payment.objects.get(payment_id=payment_id)
-            elif payment_uuid:
-                payment = Payment.objects.get(payment_uuid=payment_uuid)
-            else:
-                return Response({
-                    'success': False,
-                    'error': '缺少支付ID'
-                }, status=http_status.HTTP_400_BAD_REQUEST)
+            payment_status = int(request.data.get('status'))
+        except (TypeError, ValueError):
+            payment_status = None
+        if payment_status not in PAYMENT_STATUS_TRANSITIONS:
+            return Response({
+                'success': False,
+                'error': '无效的支付状态'
+            }, status=http_status.HTTP_400_BAD_REQUEST)
 
-            # 更新支付状态
-            # if transaction_id:  # 暂时不使用
-            #     payment.transaction_id = transaction_id
-            if payment_status is not None:
-                payment.status = payment_status
-            if payment_status == 2:  # 支付成功 (2 = 'success')
-                payment.paid_at = timezone.now()
-            payment.save()
-
-            if payment_status == 2:  # 支付成功 (2 = 'success')
-                # 更新订单状态（内部接口）
-                try:
-                    service_client.patch('OrderService', f'/api/orders/internal/orders/{payment.order_uuid}/', {
-                        'status': 1,
-                        'payment_time': timezone.now().isoformat()
-                    })
-                except Exception as e:
-                    logger.warning(f"更新订单状态失败: {e}")
-
-                # 发送支付成功通知
-                try:
-                    service_client.post('NotificationService', '/api/internal/notifications/create/', {
-                        'user_uuid': str(payment.user_uuid),
-                        'title': '支付成功',
-                        'content': f'订单 {payment.order_uuid} 支付成功，金额 ¥{payment.amount}',
-                        'type': 'transaction',
-                        'related_id': str(payment.order_uuid),
-                        'related_data': {
-                            'payment_id': payment.payment_id,
-                            'amount': str(payment.amount)
-                        }
-                    })
-                except Exception as e:
-                    logger.warning(f"发送支付成功通知失败: {e}")
-
-            return Response({'success': True, 'message': '回调处理成功'})
-
-        except Payment.DoesNotExist:
+        # 优先使用 payment_id 查找，如果没有则使用 payment_uuid
+        if payment_id:
+            lookup = {'payment_id': payment_id}
+        elif payment_uuid:
+            lookup = {'payment_uuid': payment_uuid}
+        else:
+            return Response({
+                'success': False,
+                'error': '缺少支付ID'
+            }, status=http_status.HTTP_400_BAD_REQUEST)
+
+        try:
+            pk = Payment.objects.filter(**lookup).values_list('payment_id', flat=True).first()
+        except (ValueError, ValidationError):
+            pk = None
+        if pk is None:
             return Response({
                 'success': False,
                 'error': '支付记录不存在'
             }, status=http_status.HTTP_404_NOT_FOUND)
 
+        now = timezone.now()
+        raw_data = request.data.dict() if hasattr(request.data, 'dict') else dict(request.data)
+        try:
+            with transaction.atomic():
+                # 原始回调落库，(支付, 状态) 唯一约束保证网关重试不会重复处理
+                callback = PaymentCallback.objects.create(
+                    payment_id=pk,
+                    status=payment_status,
+                    payment_method=payment_method,
+                    raw_data=raw_data
+                )
+                # 比较并设置：只允许从合法的前置状态迁移
+                update_fields = {
+                    'status': payment_status,
+                    'callback_received': True,
+                    'callback_time': now,
+                }
+                if payment_status == 2:  # 支付成功 (2 = 'success')
+                    update_fields['paid_at'] = now
+                transitioned = Payment.objects.filter(
+                    payment_id=pk,
+                    status__in=PAYMENT_STATUS_TRANSITIONS[payment_status]
+                ).update(**update_fields)
+                if transitioned:
+                    PaymentDetail.objects.filter(payment_id=pk).update(callback_data=raw_data)
+                    current_status = payment_status
+                else:
+                    current_status = Payment.objects.filter(payment_id=pk).values_list('status', flat=True).first()
+                late_capture = payment_status == 2 and current_status not in (2, 5)
+                if late_capture:
+                    # 渠道已扣款但支付记录已关闭：登记待对账，不作为普通的无变更回调
+                    PaymentCallback.objects.filter(callback_id=callback.callback_id).update(late_capture=True)
+        except IntegrityError:
+            return Response({'success': True, 'message': '回调已处理', 'duplicate': True})
+
+        if late_capture:
+            metrics.inc('payment.callback.late_capture')
+            logger.error(
+                f"迟到的支付成功回调：支付记录已关闭，渠道已扣款待对账退款: "
+                f"payment_id={pk}, 当前状态={current_status}, callback={callback.callback_id}"
+            )
+            return Response({'success': True, 'message': '支付记录已关闭，已登记待对账', 'late_capture': True})
+
+        if transitioned and payment_status == 2:
+            submit_callback(callback.callback_id)
+        else:
+            # 无副作用（或状态未变更）的回调直接标记为已处理
+            PaymentCallback.objects.filter(callback_id=callback.callback_id).update(
+                processed=True,
+                processed_at=now
+            )
+
+        return Response({'success': True, 'message': '回调处理成功'})
+
 
 class PaymentQueryByOrderAPIView(GenericAPIView, MicroserviceBaseView):
     """通过订单ID查询支付记录"""
@@ -252,7 +311,7 @@ class PaymentQueryByOrderAPIView(GenericAPIView, MicroserviceBaseView):
         try:
             # 尝试转换为UUID，如果成功则直接使用
             import uuid
-            uuid.UUID(order_uuid)
+            uuid.UUID(str(order_uuid))
             actual_order_uuid = order_uuid
         except (ValueError, TypeError):
             # 如果不是UUID，则认为是数字ID，需要通过OrderService获取UUID
@@ -272,9 +331,15 @@ class PaymentQueryByOrderAPIView(GenericAPIView, MicroserviceBaseView):
         payments = Payment.objects.filter(
             order_uuid=actual_order_uuid,
             user_uuid=user_uuid
-        ).order_by('-created_at')
-
-        serializer = PaymentSerializer(payments, many=True)
+        ).select_related('detail').order_by('-created_at')
+        if not payments:
+            # 已归档订单的支付记录
+            payments = PaymentArchive.objects.filter(
+                order_uuid=actual_order_uuid,
+                user_uuid=user_uuid
+            ).order_by('-created_at')
+
+        serializer = PaymentSerializer(payments, many=True, context=enrichment_context(payments))
         return Response({
             'code': '200',
             'message': 'success',
@@ -318,7 +383,10 @@ class PaymentCancelAPIView(GenericAPIView, MicroserviceBaseView):
 
 
 class PaymentRefundAPIView(GenericAPIView, MicroserviceBaseView):
-    """支付退款"""
+    """支付退款
+
+    只登记退款流水（支持部分退款），渠道调用由 process_refunds 批处理完成
+    """
     # permission_classes = [IsAuthenticated]
 
     def post(self, request, order_uuid):
@@ -327,71 +395,59 @@ class PaymentRefundAPIView(GenericAPIView, MicroserviceBaseView):
         if not user_uuid:
             return Response({'error': '用户身份验证失败'}, status=http_status.HTTP_401_UNAUTHORIZED)
 
-        # 根据订单UUID查找对应的支付记录
-        try:
-            payment = Payment.objects.get(
-                order_uuid=order_uuid,
-                user_uuid=user_uuid,
-                status=2  # 只查找支付成功的记录
-            )
-        except Payment.DoesNotExist:
-            return Response({
-                'error': '未找到对应的支付成功记录'
-            }, status=http_status.HTTP_404_NOT_FOUND)
-
-        refund_amount = request.data.get('refund_amount', payment.amount)
         refund_reason = request.data.get('refund_reason', '用户申请退款')
 
-    # 调用第三方支付接口进行退款（模拟）
-        refund_result = self._process_refund(payment, refund_amount, refund_reason)
-
-        if refund_result.get('success'):
-            # 更新支付状态
-            payment.status = 3  # 已退款
-            payment.save()
+        with transaction.atomic():
+            # 锁定支付记录，避免并发申请超额退款
+            payment = (
+                Payment.objects.select_for_update()
+                .filter(order_uuid=order_uuid, user_uuid=user_uuid, status=2)  # 只查找支付成功的记录
+                .first()
+            )
+            if payment is None:
+                return Response({
+                    'error': '未找到对应的支付成功记录'
+                }, status=http_status.HTTP_404_NOT_FOUND)
 
-            # 发送退款成功通知
+            # 可退金额 = 支付金额 - 已退款 - 处理中的退款；未指定退款金额时退还全部可退金额
+            in_flight = payment.refunds.filter(status__in=(0, 1)).aggregate(total=Sum('amount'))['total'] or 0
+            refundable = payment.amount - payment.refunded_amount - in_flight
             try:
-                service_client.post('NotificationService', '/api/internal/notifications/create/', {
-                    'user_uuid': str(user_uuid),
-                    'title': '退款成功',
-                    'content': f'订单 {payment.order_uuid} 退款成功，金额 ¥{refund_amount}',
-                    'type': 'transaction',
-                    'related_id': str(payment.order_uuid),
-                    'related_data': {
-                        'payment_id': payment.payment_id,
-                        'refund_amount': str(refund_amount)
-                    }
-                })
-            except Exception as e:
-                logger.warning(f"发送退款通知失败: {e}")
-
-            return Response({
-                'message': '退款申请提交成功',
-                'refund_id': refund_result.get('refund_id')
-            })
-        else:
-            return Response({
-                'error': '退款处理失败',
-                'details': refund_result.get('error', '未知错误')
-            }, status=http_status.HTTP_400_BAD_REQUEST)
+                refund_amount = Decimal(str(request.data.get('refund_amount', refundable)))
+                if not refund_amount.is_finite():
+                    raise ValueError(refund_amount)
+                # 与金额字段精度一致（两位小数），校验与入库使用同一金额
+                refund_amount = refund_amount.quantize(Decimal('0.01'))
+                out_of_range = refund_amount <= 0 or refund_amount > refundable
+            except (InvalidOperation, ValueError):
+                return Response({'error': '退款金额格式错误'}, status=http_status.HTTP_400_BAD_REQUEST)
+            if out_of_range:
+                return Response({
+                    'error': '退款处理失败',
+                    'details': f'退款金额超出可退金额 ¥{refundable}'
+                }, status=http_status.HTTP_400_BAD_REQUEST)
 
-    def _process_refund(self, payment, refund_amount, refund_reason):
-        """处理退款逻辑"""
-        # TODO: 实现具体的退款处理逻辑
-        # 这里应该调用支付宝、微信支付等第三方退款接口
+            refund = Refund.objects.create(
+                payment=payment,
+                order_uuid=payment.order_uuid,
+                user_uuid=payment.user_uuid,
+                amount=refund_amount,
+                reason=str(refund_reason)[:255]
+            )
 
-        # 模拟退款处理
-        return {
-            'success': True,
-            'refund_id': f"refund_{uuid.uuid4().hex[:16]}"
-        }
+        return Response({
+            'message': '退款申请提交成功',
+            'refund_id': str(refund.refund_uuid),
+            'refund_amount': str(refund_amount),
+            'refundable_amount': str(refundable - refund_amount)
+        })
 
 
 class PaymentStatsAPIView(GenericAPIView, MicroserviceBaseView):
     """支付统计"""
     # permission_classes = [IsAuthenticated]
 
+    @replica_reads
     def get(self, request):
     # 从Spring Cloud Gateway获取用户UUID
         user_uuid = self.get_user_uuid_from_request()
@@ -405,7 +461,7 @@ class PaymentStatsAPIView(GenericAPIView, MicroserviceBaseView):
             'total_payments': payments.count(),
             'successful_payments': payments.filter(status=2).count(),  # 2 = 'success'
             'failed_payments': payments.filter(status=3).count(),      # 3 = 'failed'
-            'refunded_payments': payments.filter(status=4).count(),    # 4 = 'cancelled'
+            'refunded_payments': payments.filter(refunded_amount__gt=0).count(),  # 有退款（含部分退款与 5 = 'refunded'）
             'total_amount': payments.filter(status=2).aggregate(Sum('amount'))['amount__sum'] or 0,  # 成功支付的总金额
         }
 